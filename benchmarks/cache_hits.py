@@ -0,0 +1,171 @@
+"""Cache hit cost of the real endpoint loaders.
+
+    python -m benchmarks.cache_hits [rows]
+
+Times `load_sessions` (an `all=true` page of `rows` sessions) and
+`load_session_details` (one series of `rows` records) on a cache hit, next
+to what a hit used to cost for the same list: `json.loads` of the Redis
+value, one model per item, `ResponseWithSource`, then FastAPI validating
+the response model and serializing it again.
+
+Redis is an in-process dict, so network time is left out; the L1 cache is
+off, so every hit decodes the stored value as a Redis hit does. A session
+list hit splices the cached JSON as stored; a detail hit decodes the
+requested columns and serializes them to JSON rows, which grows with the
+series length.
+"""
+
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from pydantic import TypeAdapter
+
+from src.cache import QueryCache, unwrap_stale
+from src.endpoints import ENDPOINTS
+from src.models import ResponseWithSource, SessionSummary
+from src.routers import details, sessions  # noqa: F401 (registers the loaders)
+
+START = datetime(2023, 1, 1, 10, 0, 0, tzinfo=timezone.utc)
+
+
+class MemoryRedis:
+    """The Redis commands the cache uses, on dicts."""
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def hset(self, key, mapping):
+        self.values.setdefault(key, {}).update(mapping)
+
+    async def hmget(self, key, fields):
+        stored = self.values.get(key, {})
+        return [stored.get(field) for field in fields]
+
+    async def delete(self, *keys):
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+    async def sadd(self, key, *members):
+        self.values.setdefault(key, set()).update(members)
+
+    async def expire(self, *args, **kwargs):
+        return True
+
+    def pipeline(self, transaction=False):
+        return MemoryPipeline(self)
+
+
+class MemoryPipeline:
+    def __init__(self, redis: MemoryRedis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeBigQuery:
+    """Answers the first (missing) load of each benchmark."""
+
+    def __init__(self, rows: int):
+        self.rows = rows
+
+    async def get_recent_sessions(self, **kwargs) -> List[SessionSummary]:
+        return [
+            SessionSummary(
+                file_hash=f"hash{i}",
+                filename=f"{i}.fit",
+                session_id=f"session_{i}",
+                start_time=START - timedelta(hours=i),
+                sport="Running",
+                total_distance=10000.0 + i,
+                avg_heart_rate=140,
+                created_at=START,
+            )
+            for i in range(self.rows)
+        ]
+
+    async def get_session_details(self, session_id: str, fields: List[str]) -> Dict[str, List[Any]]:
+        n = range(self.rows)
+        series = {
+            "session_id": ["session_1"] * self.rows,
+            "file_hash": ["hash123"] * self.rows,
+            "record_id": [f"hash123_{i}" for i in n],
+            "timestamp": [START + timedelta(seconds=i) for i in n],
+            "position_lat": [47.0 + i / 1e5 for i in n],
+            "position_long": [8.0 + i / 1e5 for i in n],
+            "altitude": [400.0 + i * 0.1 for i in n],
+            "distance": [i * 7.5 for i in n],
+            "heart_rate": [120 + i % 40 for i in n],
+            "power": [150 + i % 150 for i in n],
+            "speed": [7.5] * self.rows,
+            "temperature": [18] * self.rows,
+        }
+        return {field: series.get(field, [None] * self.rows) for field in fields}
+
+
+def model_round_trip(cached: bytes) -> bytes:
+    data = [SessionSummary(**item) for item in json.loads(cached)]
+    response = ResponseWithSource(data=data, source="cache")
+    adapter = TypeAdapter(ResponseWithSource[List[SessionSummary]])
+    return adapter.dump_json(adapter.validate_python(response.model_dump()))
+
+
+async def timed(call, repeat: int = 5) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        runs.append(time.perf_counter() - started)
+    return statistics.median(runs)
+
+
+async def run(rows: int) -> None:
+    redis = MemoryRedis()
+    cache = QueryCache(redis)
+    bq_client = FakeBigQuery(rows)
+
+    def list_page():
+        return ENDPOINTS["sessions"](
+            cache, bq_client, all=True, start_date=date(2020, 1, 1), end_date=date(2023, 1, 1)
+        )
+
+    def detail_series():
+        return ENDPOINTS["session_details"](cache, bq_client, session_id="session_1")
+
+    # First calls are misses and fill the cache
+    await list_page()
+    await detail_series()
+    stored = next(value for key, value in redis.values.items() if key.startswith("sessions_list_"))
+    cached_list = unwrap_stale(stored)[0]
+    assert json.loads(model_round_trip(cached_list))["data"] == json.loads((await list_page()).body)["data"]
+
+    async def old_list_hit():
+        model_round_trip(cached_list)
+
+    print(f"{rows} rows per response")
+    print(f"sessions list, model round-trip:       {await timed(old_list_hit) * 1000:8.2f} ms")
+    print(f"sessions list, load_sessions:          {await timed(list_page) * 1000:8.2f} ms")
+    print(f"session details, load_session_details: {await timed(detail_series) * 1000:8.2f} ms")
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    asyncio.run(run(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Rows/sec of turning BigQuery results into columns and models.
+
+    python -m benchmarks.row_mapping [rows]
+
+Uses in-memory results (no BigQuery): `Row` objects as the REST path yields
+them, and, when pyarrow is installed, an Arrow table as `to_arrow()` returns
+it. "before" is the per-row path the client used to take, "after" the
+current `result_columns` / `result_records` + bulk validation.
+"""
+
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+from google.cloud.bigquery.table import Row
+
+from src import bigquery_client
+from src.bigquery_client import SESSION_SCALAR_COLUMNS, result_columns, result_records, sessions_from_records
+from src.models import SessionDetail, SessionSummary
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class Results:
+    def __init__(self, names: List[str], rows: List[tuple]):
+        index = {name: i for i, name in enumerate(names)}
+        self.rows = [Row(values, index) for values in rows]
+        self.table = pyarrow.Table.from_pylist([dict(zip(names, r)) for r in rows]) if pyarrow else None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def to_arrow(self, create_bqstorage_client=False):
+        return self.table
+
+
+def detail_results(n: int) -> Results:
+    start = datetime(2023, 1, 1, 10, 0, 0, tzinfo=timezone.utc)
+    names = list(SessionDetail.model_fields)
+    rows = []
+    for i in range(n):
+        values = {
+            "session_id": "session_1", "file_hash": "hash123", "record_id": f"hash123_{i}",
+            "timestamp": start + timedelta(seconds=i), "position_lat": 47.0 + i / 1e5,
+            "position_long": 8.0 + i / 1e5, "altitude": 400.0 + i * 0.1, "distance": i * 7.5,
+            "heart_rate": 120 + i % 40, "power": 150 + i % 150, "speed": 7.5, "temperature": 18,
+        }
+        rows.append(tuple(values.get(name) for name in names))
+    return Results(names, rows)
+
+
+def session_results(n: int) -> Results:
+    start = datetime(2023, 1, 1, 10, 0, 0, tzinfo=timezone.utc)
+    names = SESSION_SCALAR_COLUMNS
+    rows = []
+    for i in range(n):
+        values = {
+            "file_hash": f"hash{i}", "filename": f"{i}.fit", "session_id": str(i),
+            "start_time": start + timedelta(hours=i), "created_at": start, "sport": "running",
+            "total_distance": 10000.0 + i, "avg_heart_rate": 140, "num_laps": 10,
+        }
+        rows.append(tuple(values.get(name) for name in names))
+    return Results(names, rows)
+
+
+def columns_per_row(results: Results) -> Dict[str, List[Any]]:
+    names = list(SessionDetail.model_fields)
+    rows = [row.values() for row in results]
+    return {name: list(values) for name, values in zip(names, zip(*rows))}
+
+
+def sessions_per_row(results: Results) -> List[SessionSummary]:
+    # One constructor call with every column as keyword argument per row
+    return [SessionSummary(**{name: getattr(row, name) for name in SESSION_SCALAR_COLUMNS}) for row in results]
+
+
+def rows_per_second(func: Callable[[], Any], rows: int, repeat: int = 5) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return rows / statistics.median(runs)
+
+
+def report(label: str, before: float, after: float) -> None:
+    print(f"{label:<28} before {before:>12,.0f} rows/s   after {after:>12,.0f} rows/s   ({after / before:.1f}x)")
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print(f"{rows} rows, columnar path: {'pyarrow ' + pyarrow.__version__ if pyarrow else 'pyarrow not installed, row fallback'}")
+    bigquery_client.pyarrow = pyarrow
+
+    details = detail_results(rows)
+    names = list(SessionDetail.model_fields)
+    assert result_columns(details, names) == columns_per_row(details)
+    report(
+        "get_session_details columns",
+        rows_per_second(lambda: columns_per_row(details), rows),
+        rows_per_second(lambda: result_columns(details, names), rows),
+    )
+
+    sessions = session_results(rows)
+    assert sessions_from_records(result_records(sessions)) == sessions_per_row(sessions)
+    report(
+        "SessionSummary models",
+        rows_per_second(lambda: sessions_per_row(sessions), rows, repeat=3),
+        rows_per_second(lambda: sessions_from_records(result_records(sessions)), rows, repeat=3),
+    )
+
+
+if __name__ == "__main__":
+    main()
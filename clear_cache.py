@@ -4,77 +4,111 @@ Cache Clear Script for FIT API
 
 Usage:
     python clear_cache.py                    # Clear all cache
+    python clear_cache.py --flush            # FLUSHDB: also drops warm-up hit counts and ingestion state
     python clear_cache.py --sessions         # Clear only sessions cache
     python clear_cache.py --summary          # Clear only summary cache
     python clear_cache.py --details          # Clear only details cache
-    python clear_cache.py --session-id <id>  # Clear specific session details
+    python clear_cache.py --session-id <id>  # Clear everything cached for one session
+    python clear_cache.py --tag sport:Running  # Clear all keys with a tag
+    python clear_cache.py --sport Running --day 2024-03-15
+                                             # Clear only entries new data on that day can change
+
+Keys are found through their tag sets (no keyspace scan). Entries cached
+before tagging was introduced expire with their TTL, or use --all.
+
+--all scans the keyspace and deletes everything except the warm-up hit
+counts (cache:hits) and the ingestion watermark (ingest:*), so the next
+warm-up still knows the popular queries and the ingestion watcher does not
+start over.
 """
 
 import asyncio
 import argparse
+from datetime import date
 import redis.asyncio as redis
 from src.config import settings
+from src.endpoints import HITS_KEY
+from src.ingestion import LOCK_KEY, STATE_KEY
+from src.local_cache import publish_invalidation
+from src.tags import UNLINK_BATCH, endpoint_tag, invalidate, session_tag
+
+# Not cache entries: kept by --all, only --flush drops them
+KEEP_KEYS = {HITS_KEY, STATE_KEY, LOCK_KEY}
 
 
 async def clear_all_cache(redis_client):
-    """Clear all cache keys"""
+    """Clear all cache keys, keeping hit counts and ingestion state"""
+    deleted, batch = 0, []
+    async for key in redis_client.scan_iter(count=UNLINK_BATCH):
+        if key in KEEP_KEYS:
+            continue
+        batch.append(key)
+        if len(batch) >= UNLINK_BATCH:
+            deleted += await redis_client.unlink(*batch)
+            batch = []
+    if batch:
+        deleted += await redis_client.unlink(*batch)
+    await publish_invalidation(redis_client, "*")
+    print(f"✅ All cache cleared ({deleted} keys)")
+
+
+async def flush_db(redis_client):
+    """FLUSHDB, including warm-up hit counts and ingestion state"""
     await redis_client.flushdb()
-    print("✅ All cache cleared")
+    await publish_invalidation(redis_client, "*")
+    print("✅ Redis database flushed")
 
 
-async def clear_sessions_cache(redis_client):
-    """Clear all sessions pagination cache"""
-    pattern = "sessions_list_page_*"
-    keys = []
-    async for key in redis_client.scan_iter(match=pattern):
-        keys.append(key)
-    
-    if keys:
-        await redis_client.delete(*keys)
-        print(f"✅ Cleared {len(keys)} sessions cache keys")
+async def clear_tags(redis_client, tags, label):
+    """Delete every key registered under the given tags"""
+    deleted = await invalidate(redis_client, tags=tags)
+    if deleted:
+        print(f"✅ Cleared {deleted} {label} cache keys")
     else:
-        print("ℹ️  No sessions cache found")
+        print(f"ℹ️  No {label} cache found")
+
+
+async def clear_sessions_cache(redis_client):
+    """Clear all sessions list pages"""
+    await clear_tags(redis_client, [endpoint_tag("sessions")], "sessions")
 
 
 async def clear_summary_cache(redis_client):
     """Clear global summary cache"""
-    key = "global_summary"
-    result = await redis_client.delete(key)
-    if result:
-        print(f"✅ Cleared summary cache")
-    else:
-        print("ℹ️  No summary cache found")
+    await clear_tags(redis_client, [endpoint_tag("summary")], "summary")
 
 
 async def clear_details_cache(redis_client, session_id=None):
     """Clear session details cache"""
     if session_id:
-        key = f"session_details:{session_id}"
-        result = await redis_client.delete(key)
-        if result:
-            print(f"✅ Cleared details cache for session: {session_id}")
-        else:
-            print(f"ℹ️  No cache found for session: {session_id}")
+        # Everything cached for this session: summary, details, downsampled series, maps
+        await clear_tags(redis_client, [session_tag(session_id)], f"session {session_id}")
     else:
-        pattern = "session_details:*"
-        keys = []
-        async for key in redis_client.scan_iter(match=pattern):
-            keys.append(key)
-        
-        if keys:
-            await redis_client.delete(*keys)
-            print(f"✅ Cleared {len(keys)} session details cache keys")
-        else:
-            print("ℹ️  No session details cache found")
+        await clear_tags(
+            redis_client,
+            [endpoint_tag("session_details"), endpoint_tag("session_details_downsampled")],
+            "session details",
+        )
+
+
+async def clear_changed(redis_client, sport=None, day=None, endpoints=()):
+    """Clear only the entries that may contain data for a sport and/or day"""
+    deleted = await invalidate(redis_client, sport=sport, day=day, endpoints=endpoints)
+    print(f"✅ Cleared {deleted} cache keys affected by the change")
 
 
 async def main():
     parser = argparse.ArgumentParser(description="Clear Redis cache for FIT API")
-    parser.add_argument("--all", action="store_true", help="Clear all cache (default)")
+    parser.add_argument("--all", action="store_true", help="Clear all cache (default), keeps hit counts and ingestion state")
+    parser.add_argument("--flush", action="store_true", help="FLUSHDB: clear everything incl. hit counts and ingestion state")
     parser.add_argument("--sessions", action="store_true", help="Clear sessions cache")
     parser.add_argument("--summary", action="store_true", help="Clear summary cache")
     parser.add_argument("--details", action="store_true", help="Clear all session details cache")
     parser.add_argument("--session-id", type=str, help="Clear cache for specific session ID")
+    parser.add_argument("--tag", action="append", default=[], help="Clear all keys with this tag, e.g. sport:Running (repeatable)")
+    parser.add_argument("--sport", type=str, help="Clear entries affected by new data for this sport")
+    parser.add_argument("--day", type=date.fromisoformat, help="Clear entries affected by new data on this day (YYYY-MM-DD)")
+    parser.add_argument("--endpoint", action="append", default=[], help="Limit --sport/--day to these endpoints (repeatable)")
     
     args = parser.parse_args()
     
@@ -108,9 +142,12 @@ async def main():
     
     try:
         # Check if any specific option is set
-        specific_option = args.sessions or args.summary or args.details or args.session_id
+        changed = args.sport or args.day or args.endpoint
+        specific_option = args.sessions or args.summary or args.details or args.session_id or args.tag or changed
         
-        if args.all or not specific_option:
+        if args.flush:
+            await flush_db(redis_client)
+        elif args.all or not specific_option:
             await clear_all_cache(redis_client)
         else:
             if args.sessions:
@@ -124,6 +161,12 @@ async def main():
             
             if args.session_id:
                 await clear_details_cache(redis_client, args.session_id)
+            
+            if args.tag:
+                await clear_tags(redis_client, args.tag, "tagged")
+            
+            if changed:
+                await clear_changed(redis_client, args.sport, args.day, args.endpoint)
     
     finally:
         await redis_client.aclose()
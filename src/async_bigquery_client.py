@@ -0,0 +1,60 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Optional
+
+from .config import settings
+
+# Dedicated pool for BigQuery calls. Its size is the concurrency cap: once all
+# workers are busy, further cache misses queue here instead of on the event loop.
+bq_executor = ThreadPoolExecutor(
+    max_workers=settings.BIGQUERY_MAX_CONCURRENCY,
+    thread_name_prefix="bigquery",
+)
+
+
+class AsyncBigQueryClient:
+    """Async facade over the synchronous BigQueryClient.
+
+    Every public method of the wrapped client is exposed as a coroutine that runs
+    on a bounded thread pool, so a slow `query_job.result()` only occupies a
+    worker thread while the event loop keeps serving cache hits.
+    """
+
+    def __init__(self, client: Any, executor: Optional[ThreadPoolExecutor] = None):
+        self._client = client
+        self._executor = executor or bq_executor
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        # In the caller's context, so job statistics reach the request they belong to
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(context.run, func, *args, **kwargs)
+        )
+
+    async def stream(self, name: str, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        """Iterates a generator method of the wrapped client, one item per executor call.
+
+        Used for result sets streamed page by page: only the page being fetched
+        occupies a worker thread, and the caller controls the pace.
+        """
+        iterator = await self.run(lambda: iter(getattr(self._client, name)(*args, **kwargs)))
+        done = object()
+        while True:
+            item = await self.run(next, iterator, done)
+            if item is done:
+                return
+            yield item
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self.run(attr, *args, **kwargs)
+
+        call.__name__ = name
+        return call
@@ -0,0 +1,108 @@
+"""Several cached endpoint calls answered in one request.
+
+The loaders run concurrently against one Redis proxy that merges the GET and
+MGET calls they make in the same event-loop tick into a single MGET, so a
+dashboard load costs one Redis round-trip when everything is cached. Misses
+run concurrently on the BigQuery executor; the finished response bodies are
+spliced into one JSON array.
+"""
+
+import asyncio
+import inspect
+import json
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from fastapi import HTTPException
+from google.api_core.exceptions import GoogleAPICallError
+from pydantic import ValidationError
+
+from .endpoints import ENDPOINTS, call_endpoint
+from .query_cost import QueryOverBudget
+
+
+class MGetBatcher:
+    """Redis proxy collecting GET/MGET keys until the loop comes around, then issuing one MGET.
+
+    Every other command goes straight to the wrapped client.
+    """
+
+    def __init__(self, redis):
+        self._redis = redis
+        self._pending: Dict[Any, List[asyncio.Future]] = {}
+        self._scheduled = False
+        self._flushes: Set[asyncio.Task] = set()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._redis, name)
+
+    def _enqueue(self, key) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(key, []).append(future)
+        if not self._scheduled:
+            self._scheduled = True
+            # Runs after every task that is already ready has issued its reads
+            loop.call_soon(self._start_flush)
+        return future
+
+    def _start_flush(self) -> None:
+        task = asyncio.ensure_future(self._flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def get(self, key) -> Optional[bytes]:
+        return await self._enqueue(key)
+
+    async def mget(self, keys: Sequence) -> List[Optional[bytes]]:
+        return list(await asyncio.gather(*(self._enqueue(key) for key in keys)))
+
+    async def _flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        self._scheduled = False
+        keys = list(pending)
+        try:
+            values = await self._redis.mget(keys)
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for key, value in zip(keys, values):
+            for future in pending[key]:
+                if not future.done():
+                    future.set_result(value)
+
+
+def _error(status: int, detail: Any) -> bytes:
+    return json.dumps({"error": {"status": status, "detail": detail}}, separators=(",", ":")).encode()
+
+
+async def run_query(cache, bq_client, endpoint: str, params: Dict[str, Any]) -> bytes:
+    """Response body of one sub-query, or an `{"error": ...}` object."""
+    func = ENDPOINTS.get(endpoint)
+    if func is None:
+        return _error(404, f"Unknown endpoint: {endpoint}")
+    unknown = set(params) - set(list(inspect.signature(func).parameters)[2:])
+    if unknown:
+        return _error(400, f"Unknown parameter(s): {', '.join(sorted(unknown))}")
+    try:
+        response = await call_endpoint(endpoint, cache, bq_client, params, tracked=True)
+    except HTTPException as e:
+        return _error(e.status_code, e.detail)
+    except ValidationError as e:
+        return _error(422, json.loads(e.json(include_url=False)))
+    except QueryOverBudget as e:
+        return _error(400, str(e))
+    except GoogleAPICallError as e:
+        # A failed BigQuery job fails its own entry, not the whole batch
+        return _error(502, f"BigQuery error: {e.message}")
+    return response.body
+
+
+async def run_batch(cache, bq_client, queries: Sequence[Any]) -> bytes:
+    """`{"results": [...]}` with one entry per query, in request order."""
+    bodies = await asyncio.gather(
+        *(run_query(cache, bq_client, query.endpoint, query.params) for query in queries)
+    )
+    return b'{"results":[' + b",".join(bodies) + b"]}"
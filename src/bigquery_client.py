@@ -1,190 +1,266 @@
+from google.api_core.exceptions import GoogleAPICallError
 from google.cloud import bigquery
-from typing import List, Optional
+from pydantic import TypeAdapter
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import itertools
+import logging
 import os
+import time
+
+try:
+    import pyarrow
+except ImportError:  # optional dependency, enables the columnar result path
+    pyarrow = None
+
+try:
+    from google.cloud import bigquery_storage
+except ImportError:  # optional dependency, enables Storage Read API downloads
+    bigquery_storage = None
+
+from . import metrics
+from .config import settings
+from .job_stats import record_job
+from .queries import TEMPLATES, limit_offset
+from .query_cost import DryRunEstimates, QueryOverBudget, budget_for
 from .models import SessionSummary, GlobalSummary, SessionDetail, DailyActivitySummary, WeeklyActivitySummary, MonthlyActivitySummary, DailyMetrics, MetricsSummary
 from datetime import datetime, date
 
+logger = logging.getLogger(__name__)
+
+# Base64 map images are large; list/summary queries only read them on request
+SESSION_MAP_COLUMNS = {
+    "map_preview": "map_mini_preview_base64",
+    "map_large": "map_large_base64",
+}
+SESSION_SCALAR_COLUMNS = [
+    name for name in SessionSummary.model_fields
+    if name not in SESSION_MAP_COLUMNS.values()
+]
+
+
+def session_columns(include: Optional[List[str]] = None) -> List[str]:
+    extra = [SESSION_MAP_COLUMNS[name] for name in include or [] if name in SESSION_MAP_COLUMNS]
+    return SESSION_SCALAR_COLUMNS + extra
+
+
+def detail_columns(fields: Optional[List[str]] = None) -> List[str]:
+    # Model order, whatever order the fields were requested in: one text per column set
+    return [name for name in SessionDetail.model_fields if fields is None or name in fields]
+
+
+def create_storage_client():
+    """BigQuery Storage Read API client, or None if disabled or not installed."""
+    if not settings.BIGQUERY_STORAGE_READ:
+        return None
+    if bigquery_storage is None or pyarrow is None:
+        logger.warning("BIGQUERY_STORAGE_READ needs google-cloud-bigquery-storage and pyarrow; using REST")
+        return None
+    try:
+        return bigquery_storage.BigQueryReadClient()
+    except Exception:
+        logger.warning("Could not create a Storage Read API client; using REST", exc_info=True)
+        return None
+
+
+def _use_storage(results, storage_client) -> bool:
+    # Small results come back faster over the REST pages already fetched with the job
+    return storage_client is not None and (results.total_rows or 0) >= settings.BIGQUERY_STORAGE_MIN_ROWS
+
+
+def _to_arrow(results, storage_client):
+    if _use_storage(results, storage_client):
+        try:
+            return results.to_arrow(bqstorage_client=storage_client)
+        except Exception:
+            logger.warning("Storage Read API download failed, falling back to REST", exc_info=True)
+    return results.to_arrow(create_bqstorage_client=False)
+
+
+def result_records(results, storage_client=None) -> List[Dict[str, Any]]:
+    """Query results as dicts; decoded column-wise through Arrow when pyarrow is installed.
+
+    Results of at least BIGQUERY_STORAGE_MIN_ROWS rows are downloaded over
+    the Storage Read API (parallel Arrow streams) when `storage_client` is set.
+    """
+    if pyarrow is not None:
+        return _to_arrow(results, storage_client).to_pylist()
+    return [dict(row.items()) for row in results]
+
+
+def result_columns(results, names: List[str], storage_client=None) -> Dict[str, List[Any]]:
+    """Query results as `{column: values}` without going through row objects if possible."""
+    if pyarrow is not None:
+        table = _to_arrow(results, storage_client)
+        return {name: table.column(name).to_pylist() for name in names}
+    rows = [row.values() for row in results]
+    if not rows:
+        return {name: [] for name in names}
+    return {name: list(values) for name, values in zip(names, zip(*rows))}
+
+
+def result_pages(results, storage_client=None) -> Iterator[List[Dict[str, Any]]]:
+    """`result_records` one result page (or Arrow record batch) at a time."""
+    if pyarrow is None:
+        for page in results.pages:
+            yield [dict(row.items()) for row in page]
+        return
+    batches = None
+    if _use_storage(results, storage_client):
+        try:
+            batches = results.to_arrow_iterable(bqstorage_client=storage_client)
+            # Failures show up on the first batch; later ones cannot be retried over REST
+            first = next(batches, None)
+            batches = itertools.chain([first] if first is not None else [], batches)
+        except Exception:
+            logger.warning("Storage Read API download failed, falling back to REST", exc_info=True)
+            batches = None
+    for batch in batches if batches is not None else results.to_arrow_iterable():
+        yield batch.to_pylist()
+
+
+# Validating a whole list runs in pydantic-core instead of one Python
+# constructor call with dozens of keyword arguments per row
+_session_summaries = TypeAdapter(List[SessionSummary])
+_daily_metrics = TypeAdapter(List[DailyMetrics])
+_daily_activity = TypeAdapter(List[DailyActivitySummary])
+_weekly_activity = TypeAdapter(List[WeeklyActivitySummary])
+_monthly_activity = TypeAdapter(List[MonthlyActivitySummary])
+
+
+def sessions_from_records(records: List[Dict[str, Any]]) -> List[SessionSummary]:
+    # Map columns are only present if selected
+    return _session_summaries.validate_python(records)
+
+
+def daily_metrics_from_records(records: List[Dict[str, Any]]) -> List[DailyMetrics]:
+    return _daily_metrics.validate_python(records)
+
+
 class BigQueryClient:
     def __init__(self):
         self.project_id = os.getenv("BIGQUERY_PROJECT_ID")
         self.dataset_id = os.getenv("BIGQUERY_DATASET")
         self.client = bigquery.Client(project=self.project_id)
+        self.storage_client = create_storage_client()
+        self.estimates = DryRunEstimates(settings.BIGQUERY_DRY_RUN_TTL)
+
+    def _run(self, name: str, columns: Sequence[str] = (), page_size: Optional[int] = None, **values: Any):
+        """Runs the query template `name` within its cost limits and returns the result rows.
+
+        `values` are the template parameters (missing ones are NULL),
+        `page_size` goes to `QueryJob.result()`. Raises QueryOverBudget when
+        the dry-run estimate exceeds the budget of `name`, or when BigQuery
+        cancels the job at BIGQUERY_MAX_BYTES_BILLED. The finished job's
+        statistics are recorded under `name` (see job_stats).
+        """
+        query, query_parameters = TEMPLATES[name].render(f"{self.project_id}.{self.dataset_id}", columns, **values)
+        budget = budget_for(name)
+        if budget:
+            estimate = self.estimates.get(query, lambda: self._dry_run(query, query_parameters))
+            if estimate > budget:
+                raise QueryOverBudget(name, estimate, budget)
+
+        # Result cache on explicitly: repeats of a template text within 24h are free
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters, use_query_cache=True)
+        if settings.BIGQUERY_MAX_BYTES_BILLED:
+            job_config.maximum_bytes_billed = settings.BIGQUERY_MAX_BYTES_BILLED
+        metrics.bigquery_queries.inc(shape=name)
+        started = time.perf_counter()
+        query_job = self.client.query(query, job_config=job_config)
+        try:
+            results = query_job.result(page_size=page_size)
+        except GoogleAPICallError as e:
+            if any(error.get("reason") == "bytesBilledLimitExceeded" for error in e.errors or []):
+                raise QueryOverBudget(name, None, settings.BIGQUERY_MAX_BYTES_BILLED) from e
+            raise
+        # result() returns once the job is done, so its statistics are final
+        record_job(name, query_job, time.perf_counter() - started)
+        return results
+
+    def _dry_run(self, query: str, query_parameters: list) -> int:
+        # Validates and plans the query without reading data; not billed
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=query_parameters, dry_run=True, use_query_cache=False
+        )
+        return self.client.query(query, job_config=job_config).total_bytes_processed or 0
 
-    def get_recent_sessions(
+    def get_recent_sessions(self, **filters) -> List[SessionSummary]:
+        # Filters: see _recent_sessions_results
+        results = self._recent_sessions_results(**filters)
+        return sessions_from_records(result_records(results, self.storage_client))
+
+    def iter_recent_sessions(self, page_size: int = 1000, **filters) -> Iterator[List[SessionSummary]]:
+        # Same query as get_recent_sessions, yielded one result page at a time
+        results = self._recent_sessions_results(page_size=page_size, **filters)
+        for records in result_pages(results, self.storage_client):
+            yield sessions_from_records(records)
+
+    def _recent_sessions_results(
         self, 
+        page_size: Optional[int] = None,
         limit: Optional[int] = 10, 
         offset: int = 0,
         sport: Optional[str] = None,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
         min_distance: Optional[float] = None,
-        max_distance: Optional[float] = None
-    ) -> List[SessionSummary]:
-        # Select all columns defined in the SessionSummary model
-        # Using * for simplicity, but explicit selection matches the model definition better
-        # For this specific case, we'll explicitly map the query to the model fields
-        query = f"""
-            SELECT *
-            FROM `{self.project_id}.{self.dataset_id}.sessions`
-            WHERE 1=1
-        """
-        
-        query_parameters = []
-
-        if sport:
-            query += " AND sport = @sport"
-            query_parameters.append(bigquery.ScalarQueryParameter("sport", "STRING", sport))
-        
-        if start_date:
-            query += " AND DATE(start_time) >= @start_date"
-            query_parameters.append(bigquery.ScalarQueryParameter("start_date", "DATE", start_date))
-            
-        if end_date:
-            query += " AND DATE(start_time) <= @end_date"
-            query_parameters.append(bigquery.ScalarQueryParameter("end_date", "DATE", end_date))
-
-        if min_distance is not None:
-            query += " AND total_distance >= @min_distance"
-            query_parameters.append(bigquery.ScalarQueryParameter("min_distance", "FLOAT64", min_distance))
-
-        if max_distance is not None:
-            query += " AND total_distance <= @max_distance"
-            query_parameters.append(bigquery.ScalarQueryParameter("max_distance", "FLOAT64", max_distance))
-
-        query += "\n            ORDER BY start_time DESC"
-        
-        if limit is not None:
-            query += "\n            LIMIT @limit OFFSET @offset"
-            query_parameters.append(bigquery.ScalarQueryParameter("limit", "INT64", limit))
-            query_parameters.append(bigquery.ScalarQueryParameter("offset", "INT64", offset))
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=query_parameters
-        )
-        query_job = self.client.query(query, job_config=job_config)
-        results = query_job.result()
-        
-        sessions = []
-        for row in results:
-            # Map BigQuery row to SessionSummary model
-            # Assuming row has attributes matching the model fields since we select *
-            # and the model is based on the schema
-            sessions.append(SessionSummary(
-                file_hash=row.file_hash,
-                filename=row.filename,
-                session_id=row.session_id,
-                timestamp=row.timestamp,
-                start_time=row.start_time,
-                manufacturer=row.manufacturer,
-                product=row.product,
-                serial_number=row.serial_number,
-                sport=row.sport,
-                sub_sport=row.sub_sport,
-                total_elapsed_time=row.total_elapsed_time,
-                total_timer_time=row.total_timer_time,
-                total_distance=row.total_distance,
-                avg_speed=row.avg_speed,
-                max_speed=row.max_speed,
-                avg_cadence=row.avg_cadence,
-                max_cadence=row.max_cadence,
-                min_heart_rate=row.min_heart_rate,
-                avg_heart_rate=row.avg_heart_rate,
-                max_heart_rate=row.max_heart_rate,
-                avg_power=row.avg_power,
-                max_power=row.max_power,
-                normalized_power=row.normalized_power,
-                threshold_power=row.threshold_power,
-                total_work=row.total_work,
-                total_calories=row.total_calories,
-                min_altitude=row.min_altitude,
-                avg_altitude=row.avg_altitude,
-                max_altitude=row.max_altitude,
-                total_ascent=row.total_ascent,
-                total_descent=row.total_descent,
-                avg_grade=row.avg_grade,
-                max_pos_grade=row.max_pos_grade,
-                max_neg_grade=row.max_neg_grade,
-                avg_temperature=row.avg_temperature,
-                max_temperature=row.max_temperature,
-                training_stress_score=row.training_stress_score,
-                intensity_factor=row.intensity_factor,
-                num_laps=row.num_laps,
-                created_at=row.created_at,
-                map_mini_preview_base64=row.map_mini_preview_base64,
-                map_large_base64=row.map_large_base64
-            ))
-        return sessions
-
-    def get_session_by_id(self, session_id: str) -> Optional[SessionSummary]:
-        query = f"""
-            SELECT *
-            FROM `{self.project_id}.{self.dataset_id}.sessions`
-            WHERE session_id = @session_id
-        """
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("session_id", "STRING", session_id)
-            ]
+        max_distance: Optional[float] = None,
+        include: Optional[List[str]] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ):
+        # Select the scalar SessionSummary columns; map images only if included.
+        # Keyset pagination continues strictly after the last (start_time, session_id) seen
+        return self._run(
+            "sessions",
+            session_columns(include),
+            page_size=page_size,
+            sport=sport or None,
+            start_date=start_date,
+            end_date=end_date,
+            min_distance=min_distance,
+            max_distance=max_distance,
+            after_start_time=after[0] if after else None,
+            after_session_id=after[1] if after else None,
+            **limit_offset(limit, offset),
         )
-        query_job = self.client.query(query, job_config=job_config)
-        results = query_job.result()
+
+    def get_session_by_id(
+        self,
+        session_id: str,
+        include: Optional[List[str]] = None,
+    ) -> Optional[SessionSummary]:
+        results = self._run("session", session_columns(include), session_id=session_id)
         
+        sessions = sessions_from_records(result_records(results))
+        return sessions[0] if sessions else None
+
+    def get_sessions_by_ids(self, session_ids: List[str]) -> List[SessionSummary]:
+        # One job for many ids; ids without a session are simply absent
+        results = self._run("sessions_by_ids", session_columns(), session_ids=session_ids)
+        return sessions_from_records(result_records(results))
+
+    def get_session_map(self, session_id: str, size: str) -> Optional[str]:
+        # Reads a single base64 map column for one session
+        column = SESSION_MAP_COLUMNS[size]
+        results = self._run("session_map", [column], session_id=session_id)
+
         for row in results:
-            return SessionSummary(
-                file_hash=row.file_hash,
-                filename=row.filename,
-                session_id=row.session_id,
-                timestamp=row.timestamp,
-                start_time=row.start_time,
-                manufacturer=row.manufacturer,
-                product=row.product,
-                serial_number=row.serial_number,
-                sport=row.sport,
-                sub_sport=row.sub_sport,
-                total_elapsed_time=row.total_elapsed_time,
-                total_timer_time=row.total_timer_time,
-                total_distance=row.total_distance,
-                avg_speed=row.avg_speed,
-                max_speed=row.max_speed,
-                avg_cadence=row.avg_cadence,
-                max_cadence=row.max_cadence,
-                min_heart_rate=row.min_heart_rate,
-                avg_heart_rate=row.avg_heart_rate,
-                max_heart_rate=row.max_heart_rate,
-                avg_power=row.avg_power,
-                max_power=row.max_power,
-                normalized_power=row.normalized_power,
-                threshold_power=row.threshold_power,
-                total_work=row.total_work,
-                total_calories=row.total_calories,
-                min_altitude=row.min_altitude,
-                avg_altitude=row.avg_altitude,
-                max_altitude=row.max_altitude,
-                total_ascent=row.total_ascent,
-                total_descent=row.total_descent,
-                avg_grade=row.avg_grade,
-                max_pos_grade=row.max_pos_grade,
-                max_neg_grade=row.max_neg_grade,
-                avg_temperature=row.avg_temperature,
-                max_temperature=row.max_temperature,
-                training_stress_score=row.training_stress_score,
-                intensity_factor=row.intensity_factor,
-                num_laps=row.num_laps,
-                created_at=row.created_at,
-                map_mini_preview_base64=row.map_mini_preview_base64,
-                map_large_base64=row.map_large_base64
-            )
+            return row[column]
         return None
 
+    def get_table_modified(self, table: str) -> Optional[datetime]:
+        # Metadata lookup only, no query job and nothing billed
+        return self.client.get_table(f"{self.project_id}.{self.dataset_id}.{table}").modified
+
+    def get_sessions_created_since(self, since: datetime) -> List[Dict[str, Any]]:
+        # Which sessions (and so which sports/days) arrived after the watermark
+        return result_records(self._run("sessions_created_since", since=since))
+
+    def get_metrics_created_since(self, since: datetime) -> List[Dict[str, Any]]:
+        return result_records(self._run("metrics_created_since", since=since))
+
     def get_global_summary(self) -> GlobalSummary:
-        query = f"""
-            SELECT
-                COUNT(*) as total_sessions,
-                SUM(total_distance) / 1000 as total_distance_km,
-                SUM(total_timer_time) / 3600 as total_duration_hours
-            FROM `{self.project_id}.{self.dataset_id}.sessions`
-        """
-        query_job = self.client.query(query)
-        result = next(query_job.result())
+        result = next(self._run("summary"))
         
         return GlobalSummary(
             total_sessions=result.total_sessions,
@@ -193,45 +269,36 @@ class BigQueryClient:
             last_updated=datetime.now()
         )
 
-    def get_session_details(self, session_id: str) -> List[SessionDetail]:
-        query = f"""
-            SELECT *
-            FROM `{self.project_id}.{self.dataset_id}.details`
-            WHERE session_id = @session_id
-            ORDER BY timestamp ASC
-        """
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("session_id", "STRING", session_id)
-            ]
-        )
-        query_job = self.client.query(query, job_config=job_config)
-        results = query_job.result()
-        
-        details = []
-        for row in results:
-            details.append(SessionDetail(
-                session_id=row.session_id,
-                file_hash=row.file_hash,
-                record_id=row.record_id,
-                timestamp=row.timestamp,
-                position_lat=row.position_lat,
-                position_long=row.position_long,
-                gps_accuracy=row.gps_accuracy,
-                altitude=row.altitude,
-                enhanced_altitude=row.enhanced_altitude,
-                grade=row.grade,
-                distance=row.distance,
-                heart_rate=row.heart_rate,
-                cadence=row.cadence,
-                power=row.power,
-                speed=row.speed,
-                enhanced_speed=row.enhanced_speed,
-                temperature=row.temperature,
-                calories=row.calories,
-                battery_soc=row.battery_soc
-            ))
-        return details
+    def get_session_details(
+        self,
+        session_id: str,
+        fields: Optional[List[str]] = None,
+    ) -> Dict[str, List[Any]]:
+        # Returns the series column-wise ({field: values}) and only reads the
+        # requested columns, which is what BigQuery bills for
+        columns = detail_columns(fields)
+        results = self._run("session_details", columns, session_id=session_id)
+        return result_columns(results, columns, self.storage_client)
+
+    def get_sessions_details(
+        self,
+        session_ids: List[str],
+        fields: Optional[List[str]] = None,
+    ) -> Dict[str, Dict[str, List[Any]]]:
+        # Several series in one job, split by session while reading the rows;
+        # sessions without records map to empty columns
+        columns = detail_columns(fields)
+        results = self._run("sessions_details", columns, session_ids=session_ids)
+        data = result_columns(results, ["_session_id"] + columns, self.storage_client)
+        series = {session_id: {name: [] for name in columns} for session_id in session_ids}
+        # Rows are ordered by session: slice each column at the session boundaries
+        owners = data["_session_id"]
+        start = 0
+        for end in range(1, len(owners) + 1):
+            if end == len(owners) or owners[end] != owners[start]:
+                series[owners[start]] = {name: data[name][start:end] for name in columns}
+                start = end
+        return series
 
     def get_daily_activity_summary(
         self,
@@ -241,61 +308,15 @@ class BigQueryClient:
         limit: Optional[int] = None,
         offset: Optional[int] = None,
     ) -> List[DailyActivitySummary]:
-        base_query = f"""
-            SELECT
-                activity_date,
-                sport,
-                session_count,
-                total_distance_m,
-                total_elapsed_time
-            FROM `{self.project_id}.{self.dataset_id}.daily_activity_summary_mv`
-            WHERE 1=1
-        """
-
-        query_parameters = []
-
-        if start_date is not None:
-            base_query += " AND activity_date >= @start_date"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("start_date", "DATE", start_date)
-            )
-
-        if end_date is not None:
-            base_query += " AND activity_date <= @end_date"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("end_date", "DATE", end_date)
-            )
-
-        if sport is not None:
-            base_query += " AND sport = @sport"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("sport", "STRING", sport)
-            )
-
-        base_query += "\n ORDER BY activity_date DESC, sport ASC"
-
-        if limit is not None:
-            base_query += f"\n LIMIT {int(limit)}"
-            if offset is not None and offset != 0:
-                base_query += f" OFFSET {int(offset)}"
-
-        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
-        query_job = self.client.query(base_query, job_config=job_config)
-        results = query_job.result()
+        results = self._run(
+            "daily_activity",
+            start_date=start_date,
+            end_date=end_date,
+            sport=sport,
+            **limit_offset(limit, offset),
+        )
 
-        summaries: List[DailyActivitySummary] = []
-        for row in results:
-            summaries.append(
-                DailyActivitySummary(
-                    activity_date=row.activity_date,
-                    sport=row.sport,
-                    session_count=row.session_count,
-                    total_distance_m=row.total_distance_m,
-                    total_elapsed_time=row.total_elapsed_time,
-                )
-            )
-
-        return summaries
+        return _daily_activity.validate_python(result_records(results))
 
     def get_weekly_activity_summary(
         self,
@@ -305,65 +326,15 @@ class BigQueryClient:
         limit: Optional[int] = None,
         offset: Optional[int] = None,
     ) -> List[WeeklyActivitySummary]:
-        base_query = f"""
-            SELECT
-                week_start_date,
-                iso_year,
-                iso_week,
-                sport,
-                session_count,
-                total_distance_m,
-                total_elapsed_time
-            FROM `{self.project_id}.{self.dataset_id}.weekly_activity_summary_v`
-            WHERE 1=1
-        """
-
-        query_parameters = []
-
-        if start_date is not None:
-            base_query += " AND week_start_date >= @start_date"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("start_date", "DATE", start_date)
-            )
-
-        if end_date is not None:
-            base_query += " AND week_start_date <= @end_date"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("end_date", "DATE", end_date)
-            )
-
-        if sport is not None:
-            base_query += " AND sport = @sport"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("sport", "STRING", sport)
-            )
-
-        base_query += "\n ORDER BY week_start_date DESC, sport ASC"
-
-        if limit is not None:
-            base_query += f"\n LIMIT {int(limit)}"
-            if offset is not None and offset != 0:
-                base_query += f" OFFSET {int(offset)}"
-
-        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
-        query_job = self.client.query(base_query, job_config=job_config)
-        results = query_job.result()
+        results = self._run(
+            "weekly_activity",
+            start_date=start_date,
+            end_date=end_date,
+            sport=sport,
+            **limit_offset(limit, offset),
+        )
 
-        summaries: List[WeeklyActivitySummary] = []
-        for row in results:
-            summaries.append(
-                WeeklyActivitySummary(
-                    week_start_date=row.week_start_date,
-                    iso_year=row.iso_year,
-                    iso_week=row.iso_week,
-                    sport=row.sport,
-                    session_count=row.session_count,
-                    total_distance_m=row.total_distance_m,
-                    total_elapsed_time=row.total_elapsed_time,
-                )
-            )
-
-        return summaries
+        return _weekly_activity.validate_python(result_records(results))
 
     def get_monthly_activity_summary(
         self,
@@ -373,164 +344,41 @@ class BigQueryClient:
         limit: Optional[int] = None,
         offset: Optional[int] = None,
     ) -> List[MonthlyActivitySummary]:
-        base_query = f"""
-            SELECT
-                month_start_date,
-                year,
-                month,
-                sport,
-                session_count,
-                total_distance_m,
-                total_elapsed_time
-            FROM `{self.project_id}.{self.dataset_id}.monthly_activity_summary_v`
-            WHERE 1=1
-        """
-
-        query_parameters = []
-
-        if start_date is not None:
-            base_query += " AND month_start_date >= @start_date"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("start_date", "DATE", start_date)
-            )
-
-        if end_date is not None:
-            base_query += " AND month_start_date <= @end_date"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("end_date", "DATE", end_date)
-            )
-
-        if sport is not None:
-            base_query += " AND sport = @sport"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("sport", "STRING", sport)
-            )
-
-        base_query += "\n ORDER BY month_start_date DESC, sport ASC"
-
-        if limit is not None:
-            base_query += f"\n LIMIT {int(limit)}"
-            if offset is not None and offset != 0:
-                base_query += f" OFFSET {int(offset)}"
-
-        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
-        query_job = self.client.query(base_query, job_config=job_config)
-        results = query_job.result()
+        results = self._run(
+            "monthly_activity",
+            start_date=start_date,
+            end_date=end_date,
+            sport=sport,
+            **limit_offset(limit, offset),
+        )
 
-        summaries: List[MonthlyActivitySummary] = []
-        for row in results:
-            summaries.append(
-                MonthlyActivitySummary(
-                    month_start_date=row.month_start_date,
-                    year=row.year,
-                    month=row.month,
-                    sport=row.sport,
-                    session_count=row.session_count,
-                    total_distance_m=row.total_distance_m,
-                    total_elapsed_time=row.total_elapsed_time,
-                )
-            )
-
-        return summaries
+        return _monthly_activity.validate_python(result_records(results))
 
     def get_daily_metrics(
         self,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
     ) -> List[DailyMetrics]:
-        base_query = f"""
-            SELECT *
-            FROM `{self.project_id}.{self.dataset_id}.metrics`
-            WHERE 1=1
-        """
+        results = self._run("daily_metrics", start_date=start_date, end_date=end_date)
+        return daily_metrics_from_records(result_records(results, self.storage_client))
 
-        query_parameters = []
-
-        if start_date is not None:
-            base_query += " AND DATE(timestamp) >= @start_date"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("start_date", "DATE", start_date)
-            )
-
-        if end_date is not None:
-            base_query += " AND DATE(timestamp) <= @end_date"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("end_date", "DATE", end_date)
-            )
-
-        base_query += "\n ORDER BY timestamp DESC"
-
-        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
-        query_job = self.client.query(base_query, job_config=job_config)
-        results = query_job.result()
+    def iter_daily_metrics(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        page_size: int = 1000,
+    ) -> Iterator[List[DailyMetrics]]:
+        # Same query as get_daily_metrics, yielded one result page at a time
+        results = self._run("daily_metrics", page_size=page_size, start_date=start_date, end_date=end_date)
+        for records in result_pages(results, self.storage_client):
+            yield daily_metrics_from_records(records)
 
-        metrics: List[DailyMetrics] = []
-        for row in results:
-            metrics.append(
-                DailyMetrics(
-                    file_hash=row.file_hash,
-                    filename=row.filename,
-                    timestamp=row.timestamp,
-                    body_battery_min=row.body_battery_min,
-                    body_battery_max=row.body_battery_max,
-                    body_battery_avg=row.body_battery_avg,
-                    pulse=row.pulse,
-                    sleep_hours=row.sleep_hours,
-                    stress_level_max=row.stress_level_max,
-                    stress_level_avg=row.stress_level_avg,
-                    time_awake=row.time_awake,
-                    time_in_deep_sleep=row.time_in_deep_sleep,
-                    time_in_light_sleep=row.time_in_light_sleep,
-                    time_in_rem_sleep=row.time_in_rem_sleep,
-                    weight_kilograms=row.weight_kilograms,
-                    resting_heart_rate=row.resting_heart_rate,
-                    max_heart_rate=row.max_heart_rate,
-                    min_heart_rate=row.min_heart_rate,
-                    avg_heart_rate=row.avg_heart_rate,
-                    hrv_avg=row.hrv_avg,
-                    created_at=row.created_at,
-                )
-            )
-
-        return metrics
     def get_metrics_summary(
         self,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
     ) -> MetricsSummary:
-        query = f"""
-            SELECT
-                AVG(NULLIF(body_battery_avg, 0)) as avg_body_battery_avg,
-                AVG(COALESCE(NULLIF(pulse, 0), NULLIF(resting_heart_rate, 0))) as avg_pulse,
-                AVG(NULLIF(sleep_hours, 0)) as avg_sleep_hours,
-                AVG(NULLIF(stress_level_avg, 0)) as avg_stress_level_avg,
-                AVG(NULLIF(weight_kilograms, 0)) as avg_weight_kilograms,
-                MAX(body_battery_max) as max_body_battery,
-                MIN(NULLIF(body_battery_min, 0)) as min_body_battery,
-                MAX(stress_level_max) as max_stress_level,
-                MIN(NULLIF(stress_level_avg, 0)) as min_stress_level,
-                COUNT(*) as total_days_with_data
-            FROM `{self.project_id}.{self.dataset_id}.metrics`
-            WHERE 1=1
-        """
-
-        query_parameters = []
-
-        if start_date is not None:
-            query += " AND DATE(timestamp) >= @start_date"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("start_date", "DATE", start_date)
-            )
-
-        if end_date is not None:
-            query += " AND DATE(timestamp) <= @end_date"
-            query_parameters.append(
-                bigquery.ScalarQueryParameter("end_date", "DATE", end_date)
-            )
-
-        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
-        query_job = self.client.query(query, job_config=job_config)
-        results = query_job.result()
+        results = self._run("metrics_summary", start_date=start_date, end_date=end_date)
 
         # result() always returns a RowIterator, so we take the first row
         row = next(results)
@@ -0,0 +1,112 @@
+"""Month buckets for date-range endpoints.
+
+A bounded range is answered from one cache entry per calendar month it
+touches, so overlapping and sliding ranges (last 30 vs. last 31 days) share
+their months. Months not cached yet are fetched with a single query over
+their span and stored separately; only the edge months are trimmed to the
+requested range, the others are spliced into the response as stored.
+Months that are not over yet are cached for CACHE_TTL_OPEN_MONTH only, so
+rolling "last N days" ranges pick up new days quickly.
+"""
+
+import json
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from .config import settings
+from .tags import query_tags
+
+Fetch = Callable[[date, date], Awaitable[List[Any]]]
+
+
+def month_starts(start_date: date, end_date: date) -> List[date]:
+    months = []
+    month = start_date.replace(day=1)
+    while month <= end_date:
+        months.append(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+    return months
+
+
+def month_end(month: date) -> date:
+    return (month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def bucket_key(name: str, month: date, *parts: Optional[str]) -> str:
+    return ":".join([name, "month", f"{month:%Y-%m}", *(part or "none" for part in parts)])
+
+
+def use_buckets(start_date: Optional[date], end_date: Optional[date]) -> bool:
+    """Open or very long ranges keep a single cache entry."""
+    if start_date is None or end_date is None:
+        return False
+    return len(month_starts(start_date, end_date)) <= settings.CACHE_BUCKET_MAX_MONTHS
+
+
+def _day_of(value: Any) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+async def get_or_fetch_months(
+    cache,
+    name: str,
+    fetch: Fetch,
+    *,
+    start_date: date,
+    end_date: date,
+    date_field: str,
+    response_type: Any,
+    ttl: int,
+    hard_ttl: Optional[int] = None,
+    endpoint: str = "other",
+    sport: Optional[str] = None,
+    key_parts: Sequence[Optional[str]] = (),
+) -> Tuple[bytes, str]:
+    """Returns `(JSON array for start_date..end_date, source)` assembled from month buckets.
+
+    `fetch(first_day, last_day)` must return the rows in response order
+    (newest first); `date_field` names the date each row is bucketed and
+    filtered by.
+    """
+    months = month_starts(start_date, end_date)
+    today = date.today()
+
+    async def fetch_missing(indexes: List[int]) -> List[Optional[List[Any]]]:
+        rows = await fetch(months[indexes[0]], month_end(months[indexes[-1]]))
+        by_month = defaultdict(list)
+        for row in rows:
+            by_month[_day_of(getattr(row, date_field)).replace(day=1)].append(row)
+        # An empty month that is not over yet may still get data: don't store it
+        return [
+            by_month.get(months[i]) or ([] if month_end(months[i]) < today else None)
+            for i in indexes
+        ]
+
+    # A month that is not over yet still gets rows: keep it only briefly
+    ttls = [settings.CACHE_TTL_OPEN_MONTH if month_end(month) >= today else None for month in months]
+
+    buckets, source = await cache.get_or_fetch_buckets(
+        [bucket_key(name, month, *key_parts) for month in months],
+        fetch_missing,
+        response_type=response_type,
+        ttl=ttl,
+        hard_ttl=hard_ttl,
+        endpoint=endpoint,
+        tags=[query_tags(sport, month, month_end(month)) for month in months],
+        ttls=ttls,
+    )
+
+    first, last = start_date.isoformat(), end_date.isoformat()
+    parts = []
+    for month, raw in reversed(list(zip(months, buckets))):
+        if raw is None:
+            continue
+        if month >= start_date and month_end(month) <= end_date:
+            body = raw[1:-1]
+        else:
+            rows = [row for row in json.loads(raw) if first <= row[date_field][:10] <= last]
+            body = json.dumps(rows, separators=(",", ":"), ensure_ascii=False).encode()[1:-1]
+        if body:
+            parts.append(body)
+    return b"[" + b",".join(parts) + b"]", source
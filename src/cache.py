@@ -0,0 +1,480 @@
+import asyncio
+import logging
+import math
+import struct
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from pydantic import TypeAdapter
+from redis.exceptions import ResponseError
+
+from .columnar import CODEC_ZLIB, decode_column, encode_column
+from .config import settings
+from .local_cache import LocalCache
+from .metrics import cache_lookups, cache_refreshes
+from .tags import endpoint_tag, register_tags
+from .singleflight import RedisSingleFlight, SingleFlight, single_flight
+
+
+logger = logging.getLogger(__name__)
+
+# Soft-TTL envelope: marker + soft deadline (unix seconds) in front of the value.
+# Values written without it (or before it existed) count as fresh.
+STALE_MARKER = b"\x00SWR"
+_DEADLINE = struct.Struct(">d")
+
+# Strong references to running background refreshes
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def wrap_stale(raw: bytes, ttl: int) -> bytes:
+    return STALE_MARKER + _DEADLINE.pack(time.time() + ttl) + raw
+
+
+def unwrap_stale(data: Union[bytes, str]) -> Tuple[bytes, float]:
+    """Returns `(value, seconds until the soft TTL passes)`."""
+    # Connections opened with decode_responses=True hand back str
+    if isinstance(data, str):
+        data = data.encode()
+    if not data.startswith(STALE_MARKER):
+        return data, math.inf
+    offset = len(STALE_MARKER)
+    (deadline,) = _DEADLINE.unpack_from(data, offset)
+    return data[offset + _DEADLINE.size:], deadline - time.time()
+
+
+@lru_cache(maxsize=None)
+def type_adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+class QueryCache:
+    """Redis read-through cache for BigQuery results.
+
+    On a miss the fetch is coalesced per cache key: concurrent requests in this
+    process share one in-flight query, and with CACHE_COALESCE_DISTRIBUTED
+    enabled a Redis lock extends that to all workers and replicas. An optional
+    per-worker L1 (`local`) answers repeated hits without a Redis round-trip.
+    """
+
+    def __init__(
+        self,
+        redis,
+        coalescer: Optional[SingleFlight] = None,
+        local: Optional[LocalCache] = None,
+    ):
+        self.redis = redis
+        self.local = local
+        self.coalescer = coalescer or single_flight
+        self.distributed = (
+            RedisSingleFlight(redis, lock_ttl_ms=settings.CACHE_LOCK_TTL_MS)
+            if settings.CACHE_COALESCE_DISTRIBUTED
+            else None
+        )
+
+    async def get_or_fetch(
+        self,
+        cache_key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        *,
+        response_type: Any,
+        ttl: int,
+        hard_ttl: Optional[int] = None,
+        endpoint: str = "other",
+        tags: Sequence[str] = (),
+        cache_empty: bool = True,
+        encode: Optional[Callable[[Any], bytes]] = None,
+        decode: Optional[Callable[[bytes], Any]] = None,
+    ) -> Tuple[Any, str]:
+        """Returns `(data, source)` where source is "cache" or "bigquery".
+
+        Values are stored as JSON of `response_type` unless `encode`/`decode`
+        supply a different storage format.
+        """
+        decode = decode or type_adapter(response_type).validate_json
+        raw, source = await self.get_or_fetch_raw(
+            cache_key, fetch, response_type=response_type, ttl=ttl, hard_ttl=hard_ttl,
+            endpoint=endpoint, tags=tags, cache_empty=cache_empty, encode=encode,
+        )
+        return (None if raw is None else decode(raw)), source
+
+    async def get_or_fetch_raw(
+        self,
+        cache_key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        *,
+        response_type: Any,
+        ttl: int,
+        hard_ttl: Optional[int] = None,
+        endpoint: str = "other",
+        tags: Sequence[str] = (),
+        cache_empty: bool = True,
+        encode: Optional[Callable[[Any], bytes]] = None,
+    ) -> Tuple[Optional[bytes], str]:
+        """Like `get_or_fetch` but returns the stored bytes, `(None, source)` if nothing was found.
+
+        Hits skip validation entirely, so routers can splice the cached JSON
+        into the response body as is.
+
+        With `hard_ttl` set, `ttl` is a soft TTL: entries older than that are
+        still served until `hard_ttl` while a background task refreshes them.
+
+        Stored keys are added to the `endpoint` tag and to `tags` (see
+        `src.tags`) so they can be invalidated selectively.
+        """
+        encode = encode or type_adapter(response_type).dump_json
+
+        if self.local is not None:
+            cached_data = self.local.get(cache_key)
+            if cached_data is not None:
+                cache_lookups.inc(endpoint=endpoint, result="hit")
+                return cached_data, "cache"
+
+        async def load() -> Optional[bytes]:
+            data = await fetch()
+            if data is None:
+                return None
+            raw = encode(data)
+            if cache_empty or data:
+                expires = ttl if hard_ttl is None else max(ttl, hard_ttl)
+                await self._register(cache_key, endpoint, tags, expires)
+                if hard_ttl is None:
+                    await self.redis.set(cache_key, raw, ex=ttl)
+                else:
+                    await self.redis.set(cache_key, wrap_stale(raw, ttl), ex=expires)
+                if self.local is not None:
+                    self.local.set(cache_key, raw, ttl)
+            return raw
+
+        cached_data = await self.redis.get(cache_key)
+        if cached_data:
+            raw, fresh_for = unwrap_stale(cached_data)
+            if fresh_for > 0:
+                cache_lookups.inc(endpoint=endpoint, result="hit")
+                if self.local is not None:
+                    self.local.set(cache_key, raw, int(min(ttl, fresh_for)))
+            else:
+                cache_lookups.inc(endpoint=endpoint, result="stale")
+                await self._refresh_in_background(cache_key, load, endpoint)
+            return raw, "cache"
+
+        cache_lookups.inc(endpoint=endpoint, result="miss")
+
+        async def reload() -> Optional[bytes]:
+            cached_data = await self.redis.get(cache_key)
+            return unwrap_stale(cached_data)[0] if cached_data else None
+
+        return await self._coalesce(cache_key, load, reload), "bigquery"
+
+    async def _register(self, cache_key: str, endpoint: str, tags: Sequence[str], ttl: int) -> None:
+        # Before the value is written, so an invalidation can never miss it
+        pipe = self.redis.pipeline(transaction=False)
+        register_tags(pipe, cache_key, [endpoint_tag(endpoint), *tags], ttl)
+        await pipe.execute()
+
+    async def _refresh_in_background(
+        self, cache_key: str, load: Callable[[], Awaitable[Any]], endpoint: str
+    ) -> None:
+        if self.coalescer.in_flight(cache_key):
+            return
+        # One refresh per key across all workers; the lock simply expires
+        lock_key = f"refresh:{cache_key}"
+        if not await self.redis.set(lock_key, b"1", nx=True, px=settings.CACHE_LOCK_TTL_MS):
+            return
+
+        async def refresh() -> None:
+            try:
+                await self.coalescer.do(cache_key, load)
+            except Exception:
+                cache_refreshes.inc(endpoint=endpoint, outcome="error")
+                logger.warning("Background refresh of %s failed", cache_key, exc_info=True)
+            else:
+                cache_refreshes.inc(endpoint=endpoint, outcome="ok")
+
+        task = asyncio.create_task(refresh())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    async def _coalesce(
+        self,
+        flight_key: str,
+        load: Callable[[], Awaitable[Any]],
+        reload: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        if self.distributed is None:
+            return await self.coalescer.do(flight_key, load)
+        distributed = self.distributed
+        return await self.coalescer.do(
+            flight_key, lambda: distributed.do(flight_key, load, reload)
+        )
+
+    async def peek(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Cached values (stale ones included) without fetching or counting lookups."""
+        values = [self.local.get(key) if self.local is not None else None for key in keys]
+        pending = [i for i, value in enumerate(values) if value is None]
+        if pending:
+            cached = await self.redis.mget([keys[i] for i in pending])
+            for i, cached_data in zip(pending, cached):
+                if cached_data:
+                    values[i] = unwrap_stale(cached_data)[0]
+        return values
+
+    async def get_or_fetch_buckets(
+        self,
+        keys: Sequence[str],
+        fetch: Callable[[List[int]], Awaitable[List[Any]]],
+        *,
+        response_type: Any,
+        ttl: int,
+        hard_ttl: Optional[int] = None,
+        endpoint: str = "other",
+        tags: Sequence[Sequence[str]] = (),
+        ttls: Sequence[Optional[int]] = (),
+    ) -> Tuple[List[Optional[bytes]], str]:
+        """Cache for a result split into independent buckets, e.g. calendar months.
+
+        `keys` holds one cache key per bucket and `tags` the extra tags of each.
+        All buckets are read with one MGET; `fetch` gets the indexes of the
+        buckets that are not cached and returns their values in that order,
+        from one query. A None value is passed on but not stored.
+        `ttls` can give single buckets a shorter TTL than `ttl` (e.g. a month
+        that is still running, None keeps `ttl`); those expire outright,
+        without the stale-while-revalidate grace of `hard_ttl`.
+        Returns `([stored bytes or None per bucket], source)`.
+        """
+        encode = type_adapter(response_type).dump_json
+        tags = list(tags) or [()] * len(keys)
+        ttls = list(ttls) or [None] * len(keys)
+        values: List[Optional[bytes]] = [None] * len(keys)
+
+        pending = list(range(len(keys)))
+        if self.local is not None:
+            for i in list(pending):
+                values[i] = self.local.get(keys[i])
+            pending = [i for i in pending if values[i] is None]
+
+        missing: List[int] = []
+        stale: List[int] = []
+        if pending:
+            cached = await self.redis.mget([keys[i] for i in pending])
+            for i, cached_data in zip(pending, cached):
+                if not cached_data:
+                    missing.append(i)
+                    continue
+                values[i], fresh_for = unwrap_stale(cached_data)
+                if fresh_for > 0:
+                    if self.local is not None:
+                        self.local.set(keys[i], values[i], int(min(ttls[i] or ttl, fresh_for)))
+                else:
+                    stale.append(i)
+        hits = len(keys) - len(missing) - len(stale)
+        for result, count in (("hit", hits), ("stale", len(stale)), ("miss", len(missing))):
+            if count:
+                cache_lookups.inc(count, endpoint=endpoint, result=result)
+
+        async def load(indexes: List[int]) -> List[Optional[bytes]]:
+            fetched = [None if value is None else encode(value) for value in await fetch(indexes)]
+            stored = [(i, raw) for i, raw in zip(indexes, fetched) if raw is not None]
+            for bucket_ttl in {ttls[i] for i, _ in stored}:
+                await self._store_many(
+                    [(keys[i], raw, tags[i]) for i, raw in stored if ttls[i] == bucket_ttl],
+                    ttl=ttl if bucket_ttl is None else min(bucket_ttl, ttl),
+                    hard_ttl=hard_ttl if bucket_ttl is None else None,
+                    endpoint=endpoint,
+                )
+            return fetched
+
+        if not missing:
+            if stale:
+                await self._refresh_in_background(
+                    "|".join(keys[i] for i in stale), lambda: load(stale), endpoint
+                )
+            return values, "cache"
+
+        # Stale buckets ride along with the query that has to run anyway
+        missing = sorted(missing + stale)
+
+        async def reload() -> Optional[List[Optional[bytes]]]:
+            cached = await self.redis.mget([keys[i] for i in missing])
+            if not all(cached):
+                return None
+            return [unwrap_stale(cached_data)[0] for cached_data in cached]
+
+        fetched = await self._coalesce("|".join(keys[i] for i in missing), lambda: load(missing), reload)
+        for i, raw in zip(missing, fetched):
+            values[i] = raw
+        return values, "bigquery"
+
+    async def store_many(
+        self,
+        entries: Dict[str, Any],
+        *,
+        response_type: Any,
+        ttl: int,
+        hard_ttl: Optional[int] = None,
+        endpoint: str = "other",
+        tags: Optional[Dict[str, Sequence[str]]] = None,
+    ) -> None:
+        """Writes `{cache_key: value}` in one pipeline, as `get_or_fetch_raw` would have stored them."""
+        encode = type_adapter(response_type).dump_json
+        tags = tags or {}
+        await self._store_many(
+            [(key, encode(value), tags.get(key, ())) for key, value in entries.items()],
+            ttl=ttl, hard_ttl=hard_ttl, endpoint=endpoint,
+        )
+
+    async def _store_many(
+        self,
+        items: List[Tuple[str, bytes, Sequence[str]]],
+        *,
+        ttl: int,
+        hard_ttl: Optional[int],
+        endpoint: str,
+    ) -> None:
+        if not items:
+            return
+        expires = ttl if hard_ttl is None else max(ttl, hard_ttl)
+        pipe = self.redis.pipeline(transaction=False)
+        # Tags first, so an invalidation can never miss an entry
+        for key, _, key_tags in items:
+            register_tags(pipe, key, [endpoint_tag(endpoint), *key_tags], expires)
+        for key, raw, _ in items:
+            pipe.set(key, raw if hard_ttl is None else wrap_stale(raw, ttl), ex=expires)
+        await pipe.execute()
+        if self.local is not None:
+            for key, raw, _ in items:
+                self.local.set(key, raw, ttl)
+
+    async def get_or_fetch_columns(
+        self,
+        cache_key: str,
+        fields: List[str],
+        fetch: Callable[[List[str]], Awaitable[Dict[str, List[Any]]]],
+        *,
+        kinds: Dict[str, int],
+        ttl: int,
+        codec: int = CODEC_ZLIB,
+        endpoint: str = "other",
+        tags: Sequence[str] = (),
+    ) -> Tuple[Dict[str, List[Any]], str]:
+        """Per-column cache for series data stored as a Redis hash.
+
+        Each hash field holds one encoded column, so a request only reads the
+        columns it asks for and a miss only fetches the columns not cached yet.
+        Returns `({field: values}, source)`.
+        """
+        columns = await self._read_columns(cache_key, fields)
+        missing = [f for f in fields if f not in columns]
+        if not missing:
+            cache_lookups.inc(endpoint=endpoint, result="hit")
+            return columns, "cache"
+        cache_lookups.inc(endpoint=endpoint, result="miss")
+
+        async def load(needed: List[str]) -> Dict[str, List[Any]]:
+            fetched = await fetch(needed)
+            if any(fetched.values()):
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.hset(
+                    cache_key,
+                    mapping={f: encode_column(kinds[f], values, codec) for f, values in fetched.items()},
+                )
+                pipe.expire(cache_key, ttl)
+                register_tags(pipe, cache_key, [endpoint_tag(endpoint), *tags], ttl)
+                await pipe.execute()
+            return fetched
+
+        async def reload():
+            cached = await self._read_columns(cache_key, missing)
+            return cached if len(cached) == len(missing) else None
+
+        flight_key = f"{cache_key}|{','.join(missing)}"
+        fetched = await self._coalesce(flight_key, lambda: load(missing), reload)
+
+        columns.update(fetched)
+        if len({len(values) for values in columns.values()}) > 1:
+            # The series changed since the cached columns were written; start over
+            await self.redis.delete(cache_key)
+            columns = await load(fields)
+        return {f: columns[f] for f in fields}, "bigquery"
+
+    async def _read_columns(self, cache_key: str, fields: List[str]) -> Dict[str, List[Any]]:
+        try:
+            blobs = await self.redis.hmget(cache_key, fields)
+        except ResponseError:
+            # Whole-series string value from before per-column storage
+            await self.redis.delete(cache_key)
+            return {}
+        return {f: decode_column(blob) for f, blob in zip(fields, blobs) if blob is not None}
+
+    async def get_or_fetch_columns_many(
+        self,
+        cache_keys: Sequence[str],
+        fields: List[str],
+        fetch: Callable[[List[int]], Awaitable[List[Dict[str, List[Any]]]]],
+        *,
+        kinds: Dict[str, int],
+        ttl: int,
+        codec: int = CODEC_ZLIB,
+        endpoint: str = "other",
+        tags: Sequence[Sequence[str]] = (),
+    ) -> Tuple[List[Dict[str, List[Any]]], str]:
+        """`get_or_fetch_columns` for several series at once.
+
+        All hashes are read in one pipeline; `fetch` gets the indexes of the
+        series missing any of `fields` and returns their columns from one
+        query, which are written back in one pipeline.
+        Returns `([{field: values} per key], source)`.
+        """
+        tags = list(tags) or [()] * len(cache_keys)
+        series, broken = await self._read_many_columns(cache_keys, fields)
+        missing = [i for i, columns in enumerate(series) if len(columns) < len(fields)]
+        if len(missing) < len(cache_keys):
+            cache_lookups.inc(len(cache_keys) - len(missing), endpoint=endpoint, result="hit")
+        if not missing:
+            return series, "cache"
+        cache_lookups.inc(len(missing), endpoint=endpoint, result="miss")
+
+        async def load() -> List[Dict[str, List[Any]]]:
+            fetched = await fetch(missing)
+            pipe = self.redis.pipeline(transaction=False)
+            for i, columns in zip(missing, fetched):
+                if not any(columns.values()):
+                    continue
+                if i in broken:
+                    pipe.delete(cache_keys[i])
+                pipe.hset(
+                    cache_keys[i],
+                    mapping={f: encode_column(kinds[f], values, codec) for f, values in columns.items()},
+                )
+                pipe.expire(cache_keys[i], ttl)
+                register_tags(pipe, cache_keys[i], [endpoint_tag(endpoint), *tags[i]], ttl)
+            await pipe.execute()
+            return fetched
+
+        async def reload():
+            cached, _ = await self._read_many_columns([cache_keys[i] for i in missing], fields)
+            return cached if all(len(columns) == len(fields) for columns in cached) else None
+
+        flight_key = "|".join(cache_keys[i] for i in missing) + f"|{','.join(fields)}"
+        fetched = await self._coalesce(flight_key, load, reload)
+        for i, columns in zip(missing, fetched):
+            series[i] = {f: columns[f] for f in fields}
+        return series, "bigquery"
+
+    async def _read_many_columns(
+        self, cache_keys: Sequence[str], fields: List[str]
+    ) -> Tuple[List[Dict[str, List[Any]]], Set[int]]:
+        """Cached columns per key, plus the indexes of keys holding a non-hash value."""
+        pipe = self.redis.pipeline(transaction=False)
+        for cache_key in cache_keys:
+            pipe.hmget(cache_key, fields)
+        results = await pipe.execute(raise_on_error=False)
+        series: List[Dict[str, List[Any]]] = []
+        broken: Set[int] = set()
+        for i, blobs in enumerate(results):
+            if isinstance(blobs, ResponseError):
+                broken.add(i)
+                blobs = [None] * len(fields)
+            series.append({f: decode_column(blob) for f, blob in zip(fields, blobs) if blob is not None})
+        return series, broken
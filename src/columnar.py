@@ -0,0 +1,214 @@
+"""Compact columnar encoding for cached session detail series.
+
+Each model field is stored as one typed column blob (one Redis hash field per
+column) instead of a JSON object per record:
+
+    blob      := kind:u8 | codec:u8 | flags:u8 | rows:u32 | compressed(body)
+    body      := [null bitmap] values
+
+Timestamps are delta-encoded int64 microseconds, ints and floats are int64 /
+float64 arrays, strings are dictionary encoded. Each column is compressed on
+its own (zstd or lz4 when installed, zlib otherwise) so a subset of columns can
+be decoded without touching the rest.
+"""
+
+import logging
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Any, Dict, List, Sequence, get_args
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # optional dependency
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+KIND_TIMESTAMP = 1
+KIND_INT = 2
+KIND_FLOAT = 3
+KIND_STRING = 4
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_LZ4 = 3
+
+FLAG_HAS_NULLS = 0x01
+FLAG_TZ_AWARE = 0x02
+
+_CODECS = {"none": CODEC_NONE, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD, "lz4": CODEC_LZ4}
+_COLUMN_HEADER = struct.Struct("<BBBI")
+
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def resolve_codec(name: str) -> int:
+    """Maps a codec name to its id, falling back to zlib (with a warning) if it is unknown or not installed."""
+    codec = _CODECS.get(name.lower())
+    if codec is None:
+        logger.warning("Unknown compression codec %r; using zlib", name)
+        return CODEC_ZLIB
+    if codec == CODEC_ZSTD and zstandard is None:
+        logger.warning("Compression codec zstd needs the zstandard package; using zlib")
+        return CODEC_ZLIB
+    if codec == CODEC_LZ4 and lz4_frame is None:
+        logger.warning("Compression codec lz4 needs the lz4 package; using zlib")
+        return CODEC_ZLIB
+    return codec
+
+
+def _compress(data: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, 6)
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == CODEC_LZ4:
+        return lz4_frame.compress(data)
+    return data
+
+
+def _decompress(data: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("zstd-compressed column but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == CODEC_LZ4:
+        if lz4_frame is None:
+            raise ValueError("lz4-compressed column but lz4 is not installed")
+        return lz4_frame.decompress(data)
+    return data
+
+
+def _to_le_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le_bytes(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _pack_bitmap(nulls: Sequence[bool]) -> bytes:
+    bitmap = bytearray((len(nulls) + 7) // 8)
+    for i, is_null in enumerate(nulls):
+        if is_null:
+            bitmap[i >> 3] |= 1 << (i & 7)
+    return bytes(bitmap)
+
+
+def _unpack_bitmap(bitmap: bytes, rows: int) -> List[bool]:
+    return [bool(bitmap[i >> 3] & (1 << (i & 7))) for i in range(rows)]
+
+
+def _kind_for(annotation: Any) -> int:
+    types = [t for t in (get_args(annotation) or (annotation,)) if t is not type(None)]
+    base = types[0]
+    if base is datetime:
+        return KIND_TIMESTAMP
+    if base is int:
+        return KIND_INT
+    if base is float:
+        return KIND_FLOAT
+    return KIND_STRING
+
+
+def column_kinds(model: type) -> Dict[str, int]:
+    """Column kinds for every field of a Pydantic model, in field order."""
+    return {name: _kind_for(field.annotation) for name, field in model.model_fields.items()}
+
+
+def encode_column(kind: int, values: Sequence[Any], codec: int = CODEC_ZLIB) -> bytes:
+    rows = len(values)
+    nulls = [v is None for v in values]
+    has_nulls = any(nulls)
+    flags = FLAG_HAS_NULLS if has_nulls else 0
+    body = bytearray(_pack_bitmap(nulls) if has_nulls else b"")
+
+    if kind == KIND_TIMESTAMP:
+        micros = []
+        previous = 0
+        for v in values:
+            if v is None:
+                micros.append(previous)
+                continue
+            if v.tzinfo is not None:
+                flags |= FLAG_TZ_AWARE
+                previous = (v - _EPOCH_UTC) // _MICROSECOND
+            else:
+                previous = (v - _EPOCH_NAIVE) // _MICROSECOND
+            micros.append(previous)
+        deltas = array("q", (b - a for a, b in zip([0] + micros, micros)))
+        body += _to_le_bytes(deltas)
+    elif kind == KIND_INT:
+        body += _to_le_bytes(array("q", (0 if v is None else int(v) for v in values)))
+    elif kind == KIND_FLOAT:
+        body += _to_le_bytes(array("d", (0.0 if v is None else float(v) for v in values)))
+    else:
+        dictionary: Dict[str, int] = {}
+        indices = array("I", (dictionary.setdefault("" if v is None else str(v), len(dictionary)) for v in values))
+        encoded = [s.encode("utf-8") for s in dictionary]
+        body += struct.pack("<I", len(encoded))
+        body += _to_le_bytes(array("I", (len(s) for s in encoded)))
+        body += b"".join(encoded)
+        body += _to_le_bytes(indices)
+
+    return _COLUMN_HEADER.pack(kind, codec, flags, rows) + _compress(bytes(body), codec)
+
+
+def decode_column(blob: bytes) -> List[Any]:
+    kind, codec, flags, rows = _COLUMN_HEADER.unpack_from(blob)
+    body = _decompress(blob[_COLUMN_HEADER.size:], codec)
+    offset = 0
+    nulls = None
+    if flags & FLAG_HAS_NULLS:
+        bitmap_len = (rows + 7) // 8
+        nulls = _unpack_bitmap(body[:bitmap_len], rows)
+        offset = bitmap_len
+
+    if kind == KIND_TIMESTAMP:
+        epoch = _EPOCH_UTC if flags & FLAG_TZ_AWARE else _EPOCH_NAIVE
+        micros = accumulate(_from_le_bytes("q", body[offset:]))
+        values = [epoch + timedelta(microseconds=m) for m in micros]
+    elif kind == KIND_INT:
+        values = _from_le_bytes("q", body[offset:]).tolist()
+    elif kind == KIND_FLOAT:
+        values = _from_le_bytes("d", body[offset:]).tolist()
+    else:
+        (count,) = struct.unpack_from("<I", body, offset)
+        offset += 4
+        lengths = _from_le_bytes("I", body[offset:offset + 4 * count])
+        offset += 4 * count
+        dictionary = []
+        for length in lengths:
+            dictionary.append(body[offset:offset + length].decode("utf-8"))
+            offset += length
+        values = [dictionary[i] for i in _from_le_bytes("I", body[offset:])]
+
+    if nulls is not None:
+        values = [None if is_null else v for v, is_null in zip(values, nulls)]
+    return values
+
+
+def columns_to_rows(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
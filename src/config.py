@@ -12,6 +12,20 @@ class Settings:
     # BigQuery
     BIGQUERY_PROJECT_ID = os.getenv("BIGQUERY_PROJECT_ID")
     BIGQUERY_DATASET = os.getenv("BIGQUERY_DATASET", "fitness_data")
+    BIGQUERY_MAX_CONCURRENCY = int(os.getenv("BIGQUERY_MAX_CONCURRENCY", 8))  # parallele Queries pro Worker
+    BIGQUERY_STREAM_PAGE_SIZE = int(os.getenv("BIGQUERY_STREAM_PAGE_SIZE", 1000))  # Zeilen pro Seite beim NDJSON-Streaming
+    # Grosse Ergebnisse ueber die Storage Read API laden (parallele Arrow-Streams);
+    # braucht google-cloud-bigquery-storage und pyarrow, sonst REST
+    BIGQUERY_STORAGE_READ = os.getenv("BIGQUERY_STORAGE_READ", "false").lower() == "true"
+    BIGQUERY_STORAGE_MIN_ROWS = int(os.getenv("BIGQUERY_STORAGE_MIN_ROWS", 20000))  # ab dieser Zeilenzahl
+    # Kostenbremse: BigQuery bricht jede Query ab, die mehr Bytes abrechnen wuerde (0 = unbegrenzt)
+    BIGQUERY_MAX_BYTES_BILLED = int(os.getenv("BIGQUERY_MAX_BYTES_BILLED", 0))
+    # Budget in Bytes pro Endpoint, z.B. "daily_metrics=1000000000,sessions=500000000";
+    # diese Queries werden vorher per Dry-Run geschaetzt und ueber Budget abgelehnt
+    BIGQUERY_BUDGETS = os.getenv("BIGQUERY_BUDGETS", "")
+    BIGQUERY_DRY_RUN_TTL = int(os.getenv("BIGQUERY_DRY_RUN_TTL", 3600))  # Schaetzung pro Query-Form, 1 Stunde
+    # Job-Statistiken (Cache-Hit, Bytes, Slot-ms, Zeit) als X-BigQuery-* Response-Header
+    BIGQUERY_STATS_HEADERS = os.getenv("BIGQUERY_STATS_HEADERS", "false").lower() == "true"
 
     # Caching
     CACHE_TTL_SESSIONS = int(os.getenv("CACHE_TTL_SESSIONS", 604800))  # 1 Woche
@@ -19,6 +33,49 @@ class Settings:
     CACHE_TTL_DETAILS = int(os.getenv("CACHE_TTL_DETAILS", 604800)) # 1 Woche
     CACHE_TTL_DAILY_ACTIVITY = int(os.getenv("CACHE_TTL_DAILY_ACTIVITY", 604800)) # 1 Woche
     CACHE_TTL_METRICS = int(os.getenv("CACHE_TTL_METRICS", 604800)) # 1 Woche
+    CACHE_TTL_MAPS = int(os.getenv("CACHE_TTL_MAPS", 2592000)) # 30 Tage, auch fuer Browser Cache-Control
+    # Stale-While-Revalidate: nach CACHE_TTL_* wird im Hintergrund aktualisiert,
+    # bis CACHE_HARD_TTL_* werden die alten Daten noch sofort ausgeliefert
+    CACHE_HARD_TTL_SESSIONS = int(os.getenv("CACHE_HARD_TTL_SESSIONS", CACHE_TTL_SESSIONS * 2))
+    CACHE_HARD_TTL_SUMMARY = int(os.getenv("CACHE_HARD_TTL_SUMMARY", CACHE_TTL_SUMMARY * 2))
+    CACHE_HARD_TTL_DAILY_ACTIVITY = int(os.getenv("CACHE_HARD_TTL_DAILY_ACTIVITY", CACHE_TTL_DAILY_ACTIVITY * 2))
+    CACHE_HARD_TTL_METRICS = int(os.getenv("CACHE_HARD_TTL_METRICS", CACHE_TTL_METRICS * 2))
+    # Datumsbereiche als Monats-Buckets cachen; laengere Bereiche als ein Eintrag
+    CACHE_BUCKET_MAX_MONTHS = int(os.getenv("CACHE_BUCKET_MAX_MONTHS", 36))
+    CACHE_TTL_OPEN_MONTH = int(os.getenv("CACHE_TTL_OPEN_MONTH", 300))  # 5 Minuten fuer den laufenden Monat
+    # Kompression fuer Session Details im Cache: zstd, lz4, zlib oder none
+    CACHE_DETAILS_COMPRESSION = os.getenv("CACHE_DETAILS_COMPRESSION", "zstd")
+    # Cache-Miss Coalescing ueber Worker/Replicas hinweg (Redis Lock)
+    CACHE_COALESCE_DISTRIBUTED = os.getenv("CACHE_COALESCE_DISTRIBUTED", "false").lower() == "true"
+    CACHE_LOCK_TTL_MS = int(os.getenv("CACHE_LOCK_TTL_MS", 30000))
+    # L1 Cache im Worker-Prozess vor Redis (Invalidierung via Pub/Sub)
+    CACHE_L1_ENABLED = os.getenv("CACHE_L1_ENABLED", "true").lower() == "true"
+    CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", 1024))
+    CACHE_L1_MAX_BYTES = int(os.getenv("CACHE_L1_MAX_BYTES", 64 * 1024 * 1024)) # 64 MB pro Worker
+    CACHE_L1_MAX_TTL = int(os.getenv("CACHE_L1_MAX_TTL", 300)) # 5 Minuten, hoechstens die Redis TTL
+    # Cache Warm-up: haeufigste Anfragen + Dashboard nach Deploy/flushdb neu laden
+    CACHE_WARM_ON_STARTUP = os.getenv("CACHE_WARM_ON_STARTUP", "false").lower() == "true"
+    CACHE_WARM_TOP_KEYS = int(os.getenv("CACHE_WARM_TOP_KEYS", 50))
+    CACHE_WARM_RECENT_SESSIONS = int(os.getenv("CACHE_WARM_RECENT_SESSIONS", 10)) # Details der letzten N Sessions
+    CACHE_WARM_CONCURRENCY = int(os.getenv("CACHE_WARM_CONCURRENCY", 2)) # parallele Queries beim Warm-up
+    CACHE_WARM_LOCK_TTL = int(os.getenv("CACHE_WARM_LOCK_TTL", 600)) # nur ein Worker pro Deploy
+    CACHE_WARM_TRACK_INTERVAL = int(os.getenv("CACHE_WARM_TRACK_INTERVAL", 60)) # Zugriffszaehler alle 60s nach Redis
+    CACHE_WARM_TRACK_MAX = int(os.getenv("CACHE_WARM_TRACK_MAX", 1000))
+
+    # Neue FIT-Daten erkennen (Tabellen-Metadaten alle N Sekunden, 0 = aus) und
+    # nur betroffene Keys invalidieren; dann koennen die CACHE_TTL_* sehr lang sein
+    INGEST_WATCH_INTERVAL = int(os.getenv("INGEST_WATCH_INTERVAL", 0))
+
+    # Token fuer POST /api/cache/invalidate und /api/cache/ingested (leer = deaktiviert)
+    CACHE_ADMIN_TOKEN = os.getenv("CACHE_ADMIN_TOKEN", "")
+
+    # Pagination
+    SESSIONS_PAGE_SIZE = int(os.getenv("SESSIONS_PAGE_SIZE", 10))
+    SESSIONS_MAX_PAGE_SIZE = int(os.getenv("SESSIONS_MAX_PAGE_SIZE", 100))
+    SESSIONS_MAX_BATCH_IDS = int(os.getenv("SESSIONS_MAX_BATCH_IDS", 50))  # ids pro Sammelabfrage
+
+    # Max. Teilanfragen pro POST /api/batch
+    BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", 20))
 
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", 30))
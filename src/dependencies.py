@@ -1,6 +1,7 @@
-from fastapi import Request
-from .config import settings
+from fastapi import Depends, Request
 from .bigquery_client import BigQueryClient
+from .async_bigquery_client import AsyncBigQueryClient
+from .cache import QueryCache
 
 # Initialize BigQuery Client (Singleton-ish)
 bq_client = BigQueryClient()
@@ -8,5 +9,16 @@ bq_client = BigQueryClient()
 def get_bq_client() -> BigQueryClient:
     return bq_client
 
+def get_async_bq_client(bq_client: BigQueryClient = Depends(get_bq_client)) -> AsyncBigQueryClient:
+    # Routers await this facade so BigQuery jobs run off the event loop
+    return AsyncBigQueryClient(bq_client)
+
 def get_redis(request: Request):
     return request.app.state.redis
+
+def get_local_cache(request: Request):
+    # Created in the app lifespan; absent when L1 is disabled
+    return getattr(request.app.state, "local_cache", None)
+
+def get_query_cache(redis=Depends(get_redis), local_cache=Depends(get_local_cache)) -> QueryCache:
+    return QueryCache(redis, local=local_cache)
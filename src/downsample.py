@@ -0,0 +1,135 @@
+"""Shape-preserving downsampling of column-wise time series.
+
+Both modes take `{field: values}` with a `timestamp` column in ascending order
+and return the same structure with at most `max_points` rows.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .columnar import KIND_FLOAT, KIND_INT
+
+NUMERIC_KINDS = (KIND_INT, KIND_FLOAT)
+
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+
+
+def _seconds(timestamps: List[datetime]) -> np.ndarray:
+    # Array arithmetic on the datetime objects, no Python loop per row; a column
+    # is either all aware or all naive
+    if not timestamps:
+        return np.empty(0, dtype=np.float64)
+    epoch = _EPOCH_UTC if timestamps[0].tzinfo else _EPOCH_NAIVE
+    return ((np.array(timestamps, dtype=object) - epoch) / timedelta(seconds=1)).astype(np.float64)
+
+
+def _as_float(values: List[Any]) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the visual shape."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket j covers [edges[j], edges[j + 1]); first and last point are kept as is
+    every = (n - 2) / (threshold - 2)
+    edges = np.floor(np.arange(threshold - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+    bounds = np.append(edges, n)
+    avg_x = np.add.reduceat(x, bounds[:-1]) / np.diff(bounds)
+    avg_y = np.add.reduceat(y, bounds[:-1]) / np.diff(bounds)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for j in range(threshold - 2):
+        start, end = edges[j], edges[j + 1]
+        # Area of the triangle (a, candidate, average of the next bucket)
+        area = np.abs(
+            (x[a] - avg_x[j + 1]) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y[j + 1] - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[j + 1] = a
+    return selected
+
+
+def downsample_lttb(
+    columns: Dict[str, List[Any]], kinds: Dict[str, int], max_points: int
+) -> Dict[str, List[Any]]:
+    """Keeps the union of the LTTB points of every numeric column.
+
+    Each metric gets an equal share of `max_points`, so peaks in heart rate and
+    in power both survive and rows stay aligned across columns. With more
+    metrics than the shares allow, the union is thinned evenly back down to
+    `max_points` rows, always keeping the first and last.
+    """
+    n = len(columns["timestamp"])
+    if n <= max_points:
+        return columns
+
+    x = _seconds(columns["timestamp"])
+    metrics = [name for name in columns if kinds[name] in NUMERIC_KINDS]
+    if not metrics:
+        indices = np.unique(np.linspace(0, n - 1, max_points).astype(np.int64))
+    else:
+        budget = max(3, max_points // len(metrics))
+        picked = [np.array([0, n - 1])]
+        for name in metrics:
+            y = _as_float(columns[name])
+            valid = np.flatnonzero(~np.isnan(y))
+            if len(valid):
+                picked.append(valid[lttb_indices(x[valid], y[valid], budget)])
+        indices = np.unique(np.concatenate(picked))
+        if len(indices) > max_points:
+            indices = indices[np.linspace(0, len(indices) - 1, max_points).astype(np.int64)]
+
+    return {name: [values[i] for i in indices.tolist()] for name, values in columns.items()}
+
+
+def downsample_mean(
+    columns: Dict[str, List[Any]], kinds: Dict[str, int], max_points: int
+) -> Dict[str, List[Any]]:
+    """Averages numeric columns over `max_points` equal time buckets.
+
+    Timestamps and non-numeric columns take the first record of each bucket;
+    empty buckets (pauses) produce no row.
+    """
+    n = len(columns["timestamp"])
+    if n <= max_points:
+        return columns
+
+    t = _seconds(columns["timestamp"])
+    width = (t[-1] - t[0]) / max_points or 1.0
+    buckets = np.minimum(((t - t[0]) / width).astype(np.int64), max_points - 1)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+
+    result: Dict[str, List[Any]] = {}
+    for name, values in columns.items():
+        kind = kinds[name]
+        if kind not in NUMERIC_KINDS:
+            result[name] = [values[i] for i in starts.tolist()]
+            continue
+        y = _as_float(values)
+        valid = ~np.isnan(y)
+        sums = np.add.reduceat(np.where(valid, y, 0.0), starts)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+        if kind == KIND_INT:
+            result[name] = [None if c == 0 else int(round(m)) for m, c in zip(means.tolist(), counts.tolist())]
+        else:
+            result[name] = [None if c == 0 else m for m, c in zip(means.tolist(), counts.tolist())]
+    return result
+
+
+DOWNSAMPLERS = {
+    "lttb": downsample_lttb,
+    "mean": downsample_mean,
+}
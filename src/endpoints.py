@@ -0,0 +1,100 @@
+"""Registry of cached endpoint loaders and their request statistics.
+
+A loader takes `(cache, bq_client, **params)` and returns the finished
+response. Routers call them with the parsed query parameters; cache warming
+replays them by name with the parameters recorded here, so there is one code
+path that knows how a cache key is built and filled.
+"""
+
+import functools
+import inspect
+import json
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, get_type_hints
+
+from pydantic import TypeAdapter
+
+Loader = Callable[..., Awaitable[Any]]
+
+# Untracked loaders by endpoint name
+ENDPOINTS: Dict[str, Loader] = {}
+# The same loaders counting their calls, for requests made on behalf of clients
+TRACKED_ENDPOINTS: Dict[str, Loader] = {}
+
+HITS_KEY = "cache:hits"
+
+
+class HitTracker:
+    """Counts requests per `(endpoint, params)` in memory and flushes them to a Redis sorted set.
+
+    Counting in process keeps the request path free of extra Redis calls.
+    """
+
+    def __init__(self):
+        self._pending: Counter = Counter()
+
+    def record(self, endpoint: str, params: Dict[str, Any]) -> None:
+        self._pending[json.dumps([endpoint, params], sort_keys=True, default=str)] += 1
+
+    async def flush(self, redis, max_tracked: int) -> int:
+        pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+        pipe = redis.pipeline(transaction=False)
+        for member, count in pending.items():
+            pipe.zincrby(HITS_KEY, count, member)
+        # Keep only the most requested entries
+        pipe.zremrangebyrank(HITS_KEY, 0, -(max_tracked + 1))
+        await pipe.execute()
+        return len(pending)
+
+    async def most_requested(self, redis, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+        members = await redis.zrevrange(HITS_KEY, 0, limit - 1)
+        recipes = []
+        for member in members:
+            endpoint, params = json.loads(member)
+            recipes.append((endpoint, params))
+        return recipes
+
+
+hit_tracker = HitTracker()
+
+
+def cached_endpoint(name: str) -> Callable[[Loader], Loader]:
+    """Registers a loader under `name`; calls through the returned function are counted."""
+
+    def register(func: Loader) -> Loader:
+        defaults = {
+            param.name: param.default
+            for param in inspect.signature(func).parameters.values()
+            if param.default is not inspect.Parameter.empty
+        }
+
+        @functools.wraps(func)
+        async def tracked(cache, bq_client, **params):
+            # Only non-default values, so equivalent requests share one entry
+            hit_tracker.record(name, {k: v for k, v in params.items() if v != defaults.get(k)})
+            return await func(cache, bq_client, **params)
+
+        ENDPOINTS[name] = func
+        TRACKED_ENDPOINTS[name] = tracked
+        return tracked
+
+    return register
+
+
+async def call_endpoint(
+    name: str, cache, bq_client, params: Dict[str, Any], *, tracked: bool = False
+) -> Any:
+    """Runs a registered loader with JSON params (dates as strings) coerced to its annotations.
+
+    With `tracked`, the call counts as a client request for cache warming.
+    """
+    func = ENDPOINTS[name]
+    # Annotated constraints (e.g. page size bounds) are enforced here as in the routes
+    hints = get_type_hints(func, include_extras=True)
+    coerced = {
+        key: TypeAdapter(hints[key]).validate_python(value) if key in hints else value
+        for key, value in params.items()
+    }
+    return await (TRACKED_ENDPOINTS if tracked else ENDPOINTS)[name](cache, bq_client, **coerced)
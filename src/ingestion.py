@@ -0,0 +1,91 @@
+"""Cache invalidation for newly ingested FIT data.
+
+Polls the `modified` time of the watched tables (a free metadata lookup).
+When a table changed, one small query lists the rows created since the
+stored watermark, and only the cache entries for their sports, days and
+session ids are invalidated. With this running, CACHE_TTL_* can be raised
+to very long values without serving outdated data.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .tags import invalidate, session_tag
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "ingest:state"
+LOCK_KEY = "ingest:lock"
+
+# Endpoints whose data is derived from each table
+SESSION_ENDPOINTS = ["sessions", "summary", "daily_activity", "weekly_activity", "monthly_activity"]
+METRICS_ENDPOINTS = ["daily_metrics", "metrics_summary"]
+
+
+def _decode(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+async def _new_rows(redis, bq_client, table: str, fetch_since) -> Optional[List[Dict[str, Any]]]:
+    """Rows created since the watermark, or None if the table did not change."""
+    modified = await bq_client.get_table_modified(table)
+    if modified is None:
+        return None
+    seen, watermark = map(_decode, await redis.hmget(STATE_KEY, [f"{table}:modified", f"{table}:watermark"]))
+    if seen == modified.isoformat():
+        return None
+    if watermark is None:
+        # First run: nothing to compare against, start watching from here
+        await redis.hset(STATE_KEY, mapping={f"{table}:modified": modified.isoformat(), f"{table}:watermark": modified.isoformat()})
+        return None
+
+    rows = await fetch_since(datetime.fromisoformat(watermark))
+    latest = max((row["created_at"] for row in rows if row.get("created_at")), default=None)
+    state = {f"{table}:modified": modified.isoformat()}
+    if latest is not None and latest.isoformat() > watermark:
+        state[f"{table}:watermark"] = latest.isoformat()
+    await redis.hset(STATE_KEY, mapping=state)
+    return rows
+
+
+async def invalidate_new_sessions(redis, rows: List[Dict[str, Any]]) -> int:
+    # Re-ingested sessions: everything cached for them
+    deleted = await invalidate(redis, tags=[session_tag(row["session_id"]) for row in rows]) if rows else 0
+    changes: Set[Tuple[Optional[str], Any]] = {(row.get("sport"), row.get("day")) for row in rows}
+    for sport, day in sorted(changes, key=str):
+        deleted += await invalidate(redis, sport=sport, day=day, endpoints=SESSION_ENDPOINTS)
+    return deleted
+
+
+async def invalidate_new_metrics(redis, rows: List[Dict[str, Any]]) -> int:
+    deleted = 0
+    for day in sorted({row["day"] for row in rows if row.get("day")}):
+        deleted += await invalidate(redis, day=day, endpoints=METRICS_ENDPOINTS)
+    return deleted
+
+
+async def check_for_new_data(redis, bq_client) -> int:
+    """One polling round; returns the number of cache keys invalidated."""
+    deleted = 0
+    rows = await _new_rows(redis, bq_client, "sessions", bq_client.get_sessions_created_since)
+    if rows:
+        deleted += await invalidate_new_sessions(redis, rows)
+    rows = await _new_rows(redis, bq_client, "metrics", bq_client.get_metrics_created_since)
+    if rows:
+        deleted += await invalidate_new_metrics(redis, rows)
+    if deleted:
+        logger.info("New FIT data: invalidated %d cache keys", deleted)
+    return deleted
+
+
+async def watch_ingestion(redis, bq_client, interval: int) -> None:
+    """Polls until cancelled; one worker per interval does the check."""
+    while True:
+        try:
+            if await redis.set(LOCK_KEY, b"1", nx=True, ex=interval):
+                await check_for_new_data(redis, bq_client)
+        except Exception:
+            logger.warning("Checking for new FIT data failed", exc_info=True)
+        await asyncio.sleep(interval)
@@ -0,0 +1,84 @@
+"""Statistics of finished BigQuery jobs.
+
+After a query's first result page has arrived, the job reports whether it
+was answered from BigQuery's result cache, the bytes it processed and
+billed, and the slot time it used. These are added to per-shape counters on
+/metrics. With BIGQUERY_STATS_HEADERS they are also summed per request and
+sent as `X-BigQuery-*` response headers.
+
+Per-request collection uses a context variable holding a list. The BigQuery
+executor threads run in a copy of the request's context and append to that
+list. The headers go out with the response start, so streamed NDJSON
+responses carry the stats of the job behind their first page (which is the
+whole export's job).
+"""
+
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from . import metrics
+
+STATS_HEADERS = [
+    "X-BigQuery-Jobs",
+    "X-BigQuery-Cache-Hits",
+    "X-BigQuery-Bytes-Processed",
+    "X-BigQuery-Bytes-Billed",
+    "X-BigQuery-Slot-Ms",
+    "X-BigQuery-Time-Ms",
+]
+
+# Jobs run on behalf of the current request, None outside of one
+collected_jobs: ContextVar[Optional[List[Dict[str, float]]]] = ContextVar("collected_jobs", default=None)
+
+
+def record_job(shape: str, query_job, wall_seconds: float) -> Dict[str, float]:
+    stats = {
+        "cache_hit": int(bool(query_job.cache_hit)),
+        "bytes_processed": int(query_job.total_bytes_processed or 0),
+        "bytes_billed": int(query_job.total_bytes_billed or 0),
+        "slot_ms": int(query_job.slot_millis or 0),
+        "wall_ms": wall_seconds * 1000,
+    }
+    metrics.bigquery_cache_hits.inc(stats["cache_hit"], shape=shape)
+    metrics.bigquery_bytes_processed.inc(stats["bytes_processed"], shape=shape)
+    metrics.bigquery_bytes_billed.inc(stats["bytes_billed"], shape=shape)
+    metrics.bigquery_slot_ms.inc(stats["slot_ms"], shape=shape)
+    metrics.bigquery_job_seconds.inc(wall_seconds, shape=shape)
+    jobs = collected_jobs.get()
+    if jobs is not None:
+        jobs.append(stats)
+    return stats
+
+
+class JobStatsMiddleware:
+    """Pure ASGI middleware adding the `X-BigQuery-*` headers; only installed when enabled."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        jobs: List[Dict[str, float]] = []
+        token = collected_jobs.set(jobs)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers += [(name.lower().encode(), value.encode()) for name, value in stats_headers(jobs).items()]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            collected_jobs.reset(token)
+
+
+def stats_headers(jobs: List[Dict[str, float]]) -> Dict[str, str]:
+    """Sums over the jobs of one request; empty when everything came from Redis."""
+    if not jobs:
+        return {}
+    totals = {name: sum(job[name] for job in jobs) for name in jobs[0]}
+    values = [len(jobs), totals["cache_hit"], totals["bytes_processed"], totals["bytes_billed"], totals["slot_ms"], round(totals["wall_ms"])]
+    return {header: str(int(value)) for header, value in zip(STATS_HEADERS, values)}
@@ -0,0 +1,135 @@
+"""Per-worker L1 cache in front of Redis.
+
+Holds serialized response bytes in an LRU bounded by entry count and total
+size. Entries live at most CACHE_L1_MAX_TTL seconds (never longer than the
+Redis TTL of the endpoint), and deletes anywhere are fanned out to every
+worker over Redis pub/sub, so `clear_cache.py` takes effect immediately.
+"""
+
+import asyncio
+import fnmatch
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class LocalCache:
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        max_ttl: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        self.clock = clock
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        ttl = min(ttl, self.max_ttl)
+        # One huge value must not flush the whole working set
+        if ttl <= 0 or len(value) > self.max_bytes // 4:
+            return
+        self._remove(key)
+        self._entries[key] = (self.clock() + ttl, value)
+        self.size += len(value)
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, pattern: str) -> int:
+        """Drops keys matching a Redis-style glob pattern; returns how many were dropped."""
+        if pattern == "*":
+            count = len(self._entries)
+            self.clear()
+            return count
+        # Exact keys first: JSON-style keys may contain glob characters
+        if self._remove(pattern):
+            return 1
+        if not any(c in pattern for c in "*?["):
+            return 0
+        matched = [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]
+        for key in matched:
+            self._remove(key)
+        return len(matched)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= len(entry[1])
+        return True
+
+
+def create_local_cache() -> Optional[LocalCache]:
+    if not settings.CACHE_L1_ENABLED:
+        return None
+    return LocalCache(
+        max_entries=settings.CACHE_L1_MAX_ENTRIES,
+        max_bytes=settings.CACHE_L1_MAX_BYTES,
+        max_ttl=settings.CACHE_L1_MAX_TTL,
+    )
+
+
+async def publish_invalidation(redis, *patterns: str) -> None:
+    """Tells every worker to drop L1 entries matching the given key patterns."""
+    for pattern in patterns:
+        await redis.publish(INVALIDATION_CHANNEL, pattern)
+
+
+async def listen_for_invalidations(redis, local_cache: LocalCache, retry_delay: float = 1.0) -> None:
+    """Applies invalidation messages until cancelled.
+
+    Messages published while disconnected are lost, so the whole L1 is
+    dropped whenever the subscription is (re-)established.
+    """
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            local_cache.clear()
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                pattern = message["data"]
+                if isinstance(pattern, bytes):
+                    pattern = pattern.decode()
+                local_cache.invalidate(pattern)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("L1 invalidation subscription lost, retrying", exc_info=True)
+            local_cache.clear()
+            await asyncio.sleep(retry_delay)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
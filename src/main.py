@@ -1,20 +1,53 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+import asyncio
 import redis.asyncio as redis
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from .config import settings
-from .routers import sessions, summary, details, daily_activity, weekly_activity, monthly_activity, daily_metrics
+from .async_bigquery_client import bq_executor
+from .local_cache import create_local_cache, listen_for_invalidations
+from . import metrics
+from .cache import QueryCache
+from .dependencies import bq_client
+from .async_bigquery_client import AsyncBigQueryClient
+from .warmup import flush_hit_counts, warm_on_startup
+from .ingestion import watch_ingestion
+from .query_cost import QueryOverBudget
+from .job_stats import STATS_HEADERS, JobStatsMiddleware
+from .routers import sessions, summary, details, daily_activity, weekly_activity, monthly_activity, daily_metrics, cache_admin, batch
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    redis_instance = redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+    # Raw bytes: cached values may be binary (columnar session details)
+    redis_instance = redis.from_url(settings.REDIS_URL, decode_responses=False)
     app.state.redis = redis_instance
+    app.state.local_cache = create_local_cache()
+    background = [asyncio.create_task(
+        flush_hit_counts(redis_instance, settings.CACHE_WARM_TRACK_INTERVAL)
+    )]
+    if app.state.local_cache is not None:
+        background.append(asyncio.create_task(
+            listen_for_invalidations(redis_instance, app.state.local_cache)
+        ))
+    if settings.CACHE_WARM_ON_STARTUP:
+        cache = QueryCache(redis_instance, local=app.state.local_cache)
+        background.append(asyncio.create_task(warm_on_startup(cache, AsyncBigQueryClient(bq_client))))
+    if settings.INGEST_WATCH_INTERVAL > 0:
+        background.append(asyncio.create_task(
+            watch_ingestion(redis_instance, AsyncBigQueryClient(bq_client), settings.INGEST_WATCH_INTERVAL)
+        ))
     yield
     # Shutdown
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
     await redis_instance.close()
+    bq_executor.shutdown(wait=False, cancel_futures=True)
 
 app = FastAPI(
     title="FIT Data Analysis API",
@@ -32,17 +65,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=STATS_HEADERS if settings.BIGQUERY_STATS_HEADERS else [],
 )
 
+if settings.BIGQUERY_STATS_HEADERS:
+    # Not installed otherwise, so cache hits pay nothing for it
+    app.add_middleware(JobStatsMiddleware)
+
 # Include Routers
+# details first: /api/sessions/details must not match /api/sessions/{session_id}
+app.include_router(details.router)
 app.include_router(sessions.router)
 app.include_router(summary.router)
-app.include_router(details.router)
 app.include_router(daily_activity.router)
 app.include_router(weekly_activity.router)
 app.include_router(monthly_activity.router)
 app.include_router(daily_metrics.router)
+app.include_router(cache_admin.router)
+app.include_router(batch.router)
+
+@app.exception_handler(QueryOverBudget)
+async def query_over_budget(request, exc: QueryOverBudget):
+    # The request asks for more data than this deployment lets one query scan
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    # Counters are per worker process; scrape each worker or sum them up
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
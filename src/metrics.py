@@ -0,0 +1,84 @@
+"""Process-local counters exposed in the Prometheus text format on /metrics."""
+
+import threading
+from typing import Dict, List, Tuple
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            labels = ",".join(f'{name}="{_escape(v)}"' for name, v in zip(self.labelnames, key))
+            lines.append(f"{self.name}{{{labels}}} {value:g}" if labels else f"{self.name} {value:g}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY: List[Counter] = []
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.collect()) + "\n"
+
+
+cache_lookups = Counter(
+    "cache_lookups_total",
+    "Cache lookups by result (hit, stale, miss)",
+    ("endpoint", "result"),
+)
+cache_refreshes = Counter(
+    "cache_background_refreshes_total",
+    "Background refreshes of stale cache entries by outcome",
+    ("endpoint", "outcome"),
+)
+bigquery_queries = Counter(
+    "bigquery_queries_total",
+    "BigQuery jobs started by query shape (see src/queries.py)",
+    ("shape",),
+)
+bigquery_cache_hits = Counter(
+    "bigquery_cache_hits_total",
+    "BigQuery jobs answered from BigQuery's own result cache by query shape",
+    ("shape",),
+)
+bigquery_bytes_processed = Counter(
+    "bigquery_bytes_processed_total",
+    "Bytes processed by BigQuery jobs by query shape",
+    ("shape",),
+)
+bigquery_bytes_billed = Counter(
+    "bigquery_bytes_billed_total",
+    "Bytes billed for BigQuery jobs by query shape",
+    ("shape",),
+)
+bigquery_slot_ms = Counter(
+    "bigquery_slot_milliseconds_total",
+    "Slot time used by BigQuery jobs by query shape",
+    ("shape",),
+)
+bigquery_job_seconds = Counter(
+    "bigquery_job_seconds_total",
+    "Wall time from job submission to the first result page by query shape",
+    ("shape",),
+)
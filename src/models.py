@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional, Generic, TypeVar, Literal
+from typing import Any, Dict, List, Optional, Generic, TypeVar, Literal
 from datetime import datetime, date
 
 class SessionSummary(BaseModel):
@@ -145,3 +145,40 @@ T = TypeVar('T')
 class ResponseWithSource(BaseModel, Generic[T]):
     data: T
     source: Literal["cache", "bigquery"]
+
+
+class PaginatedResponseWithSource(ResponseWithSource[T], Generic[T]):
+    # Opaque keyset cursor for the next page, None on the last page
+    next_cursor: Optional[str] = None
+    # Requested includes left out, e.g. map images over the query budget
+    omitted: Optional[List[str]] = None
+
+
+class CacheInvalidation(BaseModel):
+    # Explicit tags, e.g. "endpoint:sessions" or "sport:Running"
+    tags: List[str] = []
+    session_ids: List[str] = []
+    # Change based: keys that may contain data for this sport/day/endpoints
+    sport: Optional[str] = None
+    day: Optional[date] = None
+    endpoints: List[str] = []
+
+
+class CacheInvalidationResult(BaseModel):
+    deleted: int
+
+
+class BatchQuery(BaseModel):
+    # Registered endpoint name, e.g. "summary" or "daily_activity"
+    endpoint: str
+    # Query parameters as in the single request (dates as YYYY-MM-DD)
+    params: Dict[str, Any] = {}
+
+
+class BatchRequest(BaseModel):
+    queries: List[BatchQuery]
+
+
+class BatchResponse(BaseModel):
+    # One entry per query: the endpoint's response body or {"error": {...}}
+    results: List[Any]
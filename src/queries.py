@@ -0,0 +1,274 @@
+"""Canonical SQL text for every query BigQueryClient runs.
+
+Each query shape is one fixed, parameterized text. Filters are always
+present and always receive their parameter; NULL means "no filter"
+(`@sport IS NULL OR sport = @sport`), and LIMIT/OFFSET are parameters as
+well. The same logical query therefore always sends byte-identical SQL with
+the same parameter list, which is what BigQuery's result cache keys on (a
+repeat within 24h is a free cache hit), and the dry-run estimates in
+`query_cost` are shared per shape.
+
+Only identifiers are formatted into the text: the dataset, and for queries
+with a projection the selected columns, which the caller passes in a fixed
+order.
+"""
+
+import textwrap
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from google.cloud import bigquery
+
+# LIMIT takes no NULL: "no limit" is the largest INT64
+NO_LIMIT = 2**63 - 1
+
+# Query shapes by name; the name is also the budget key in BIGQUERY_BUDGETS
+TEMPLATES: Dict[str, "QueryTemplate"] = {}
+
+
+class QueryTemplate:
+    """Fixed SQL text with `{dataset}`/`{columns}` identifiers and typed `@params`.
+
+    `params` maps each parameter to its BigQuery type; `ARRAY<T>` declares an
+    array parameter.
+    """
+
+    def __init__(self, name: str, sql: str, **params: str):
+        self.name = name
+        self.sql = textwrap.dedent(sql).strip()
+        self.params = params
+
+    def render(self, dataset: str, columns: Sequence[str] = (), **values: Any) -> Tuple[str, List[Any]]:
+        """`(SQL, query parameters)`; parameters without a value are sent as NULL."""
+        unknown = set(values) - set(self.params)
+        if unknown:
+            raise TypeError(f"Unknown parameter(s) for query {self.name}: {', '.join(sorted(unknown))}")
+        query = self.sql.format(dataset=dataset, columns=", ".join(columns))
+        return query, [_parameter(name, type_, values.get(name)) for name, type_ in self.params.items()]
+
+
+def _parameter(name: str, type_: str, value: Any):
+    if type_.startswith("ARRAY<"):
+        return bigquery.ArrayQueryParameter(name, type_[6:-1], list(value or []))
+    return bigquery.ScalarQueryParameter(name, type_, value)
+
+
+def template(name: str, sql: str, **params: str) -> QueryTemplate:
+    TEMPLATES[name] = QueryTemplate(name, sql, **params)
+    return TEMPLATES[name]
+
+
+def limit_offset(limit: Optional[int], offset: Optional[int]) -> Dict[str, int]:
+    return {"limit": NO_LIMIT if limit is None else limit, "offset": offset or 0}
+
+
+DATE_RANGE = {"start_date": "DATE", "end_date": "DATE"}
+PAGE = {"limit": "INT64", "offset": "INT64"}
+
+template(
+    "sessions",
+    """
+    SELECT {columns}
+    FROM `{dataset}.sessions`
+    WHERE (@sport IS NULL OR sport = @sport)
+      AND (@start_date IS NULL OR DATE(start_time) >= @start_date)
+      AND (@end_date IS NULL OR DATE(start_time) <= @end_date)
+      AND (@min_distance IS NULL OR total_distance >= @min_distance)
+      AND (@max_distance IS NULL OR total_distance <= @max_distance)
+      AND (@after_start_time IS NULL
+           OR start_time < @after_start_time
+           OR (start_time = @after_start_time AND session_id < @after_session_id))
+    ORDER BY start_time DESC, session_id DESC
+    LIMIT @limit OFFSET @offset
+    """,
+    sport="STRING",
+    **DATE_RANGE,
+    min_distance="FLOAT64",
+    max_distance="FLOAT64",
+    after_start_time="TIMESTAMP",
+    after_session_id="STRING",
+    **PAGE,
+)
+
+template(
+    "session",
+    """
+    SELECT {columns}
+    FROM `{dataset}.sessions`
+    WHERE session_id = @session_id
+    """,
+    session_id="STRING",
+)
+
+template(
+    "sessions_by_ids",
+    """
+    SELECT {columns}
+    FROM `{dataset}.sessions`
+    WHERE session_id IN UNNEST(@session_ids)
+    """,
+    session_ids="ARRAY<STRING>",
+)
+
+template(
+    "session_map",
+    """
+    SELECT {columns}
+    FROM `{dataset}.sessions`
+    WHERE session_id = @session_id
+    """,
+    session_id="STRING",
+)
+
+template(
+    "sessions_created_since",
+    """
+    SELECT session_id, sport, DATE(start_time) AS day, created_at
+    FROM `{dataset}.sessions`
+    WHERE created_at > @since
+    """,
+    since="TIMESTAMP",
+)
+
+template(
+    "metrics_created_since",
+    """
+    SELECT DATE(timestamp) AS day, MAX(created_at) AS created_at
+    FROM `{dataset}.metrics`
+    WHERE created_at > @since
+    GROUP BY day
+    """,
+    since="TIMESTAMP",
+)
+
+template(
+    "summary",
+    """
+    SELECT
+        COUNT(*) as total_sessions,
+        SUM(total_distance) / 1000 as total_distance_km,
+        SUM(total_timer_time) / 3600 as total_duration_hours
+    FROM `{dataset}.sessions`
+    """,
+)
+
+template(
+    "session_details",
+    """
+    SELECT {columns}
+    FROM `{dataset}.details`
+    WHERE session_id = @session_id
+    ORDER BY timestamp ASC, record_id ASC
+    """,
+    session_id="STRING",
+)
+
+template(
+    "sessions_details",
+    """
+    SELECT session_id AS _session_id, {columns}
+    FROM `{dataset}.details`
+    WHERE session_id IN UNNEST(@session_ids)
+    ORDER BY session_id, timestamp ASC, record_id ASC
+    """,
+    session_ids="ARRAY<STRING>",
+)
+
+template(
+    "daily_activity",
+    """
+    SELECT
+        activity_date,
+        sport,
+        session_count,
+        total_distance_m,
+        total_elapsed_time
+    FROM `{dataset}.daily_activity_summary_mv`
+    WHERE (@start_date IS NULL OR activity_date >= @start_date)
+      AND (@end_date IS NULL OR activity_date <= @end_date)
+      AND (@sport IS NULL OR sport = @sport)
+    ORDER BY activity_date DESC, sport ASC
+    LIMIT @limit OFFSET @offset
+    """,
+    **DATE_RANGE,
+    sport="STRING",
+    **PAGE,
+)
+
+template(
+    "weekly_activity",
+    """
+    SELECT
+        week_start_date,
+        iso_year,
+        iso_week,
+        sport,
+        session_count,
+        total_distance_m,
+        total_elapsed_time
+    FROM `{dataset}.weekly_activity_summary_v`
+    WHERE (@start_date IS NULL OR week_start_date >= @start_date)
+      AND (@end_date IS NULL OR week_start_date <= @end_date)
+      AND (@sport IS NULL OR sport = @sport)
+    ORDER BY week_start_date DESC, sport ASC
+    LIMIT @limit OFFSET @offset
+    """,
+    **DATE_RANGE,
+    sport="STRING",
+    **PAGE,
+)
+
+template(
+    "monthly_activity",
+    """
+    SELECT
+        month_start_date,
+        year,
+        month,
+        sport,
+        session_count,
+        total_distance_m,
+        total_elapsed_time
+    FROM `{dataset}.monthly_activity_summary_v`
+    WHERE (@start_date IS NULL OR month_start_date >= @start_date)
+      AND (@end_date IS NULL OR month_start_date <= @end_date)
+      AND (@sport IS NULL OR sport = @sport)
+    ORDER BY month_start_date DESC, sport ASC
+    LIMIT @limit OFFSET @offset
+    """,
+    **DATE_RANGE,
+    sport="STRING",
+    **PAGE,
+)
+
+template(
+    "daily_metrics",
+    """
+    SELECT *
+    FROM `{dataset}.metrics`
+    WHERE (@start_date IS NULL OR DATE(timestamp) >= @start_date)
+      AND (@end_date IS NULL OR DATE(timestamp) <= @end_date)
+    ORDER BY timestamp DESC
+    """,
+    **DATE_RANGE,
+)
+
+template(
+    "metrics_summary",
+    """
+    SELECT
+        AVG(NULLIF(body_battery_avg, 0)) as avg_body_battery_avg,
+        AVG(COALESCE(NULLIF(pulse, 0), NULLIF(resting_heart_rate, 0))) as avg_pulse,
+        AVG(NULLIF(sleep_hours, 0)) as avg_sleep_hours,
+        AVG(NULLIF(stress_level_avg, 0)) as avg_stress_level_avg,
+        AVG(NULLIF(weight_kilograms, 0)) as avg_weight_kilograms,
+        MAX(body_battery_max) as max_body_battery,
+        MIN(NULLIF(body_battery_min, 0)) as min_body_battery,
+        MAX(stress_level_max) as max_stress_level,
+        MIN(NULLIF(stress_level_avg, 0)) as min_stress_level,
+        COUNT(*) as total_days_with_data
+    FROM `{dataset}.metrics`
+    WHERE (@start_date IS NULL OR DATE(timestamp) >= @start_date)
+      AND (@end_date IS NULL OR DATE(timestamp) <= @end_date)
+    """,
+    **DATE_RANGE,
+)
@@ -0,0 +1,98 @@
+"""Cost limits for BigQuery jobs.
+
+Every job carries `maximum_bytes_billed`, so BigQuery itself cancels a query
+that would bill more. Query shapes (see `queries.TEMPLATES`, named after
+their endpoints) listed in BIGQUERY_BUDGETS are additionally
+dry-run before they run (free, nothing is read): the estimate of bytes
+processed is cached per query text, and a query estimated over its endpoint's
+budget is refused before a job is started.
+
+Estimates are per query shape, not per parameter value: on the unpartitioned
+tables here the bytes scanned depend on the columns and tables a query reads,
+not on how many rows its filters keep.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryOverBudget(Exception):
+    """A query estimated (or billed) over the byte limit of its endpoint."""
+
+    def __init__(self, endpoint: str, estimated_bytes: Optional[int], limit: int):
+        self.endpoint = endpoint
+        self.estimated_bytes = estimated_bytes
+        self.limit = limit
+        scanned = "more" if estimated_bytes is None else f"~{format_bytes(estimated_bytes)}"
+        super().__init__(
+            f"Query for {endpoint} would process {scanned} than its limit of "
+            f"{format_bytes(limit)}; narrow the date range or filters"
+        )
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """`"daily_metrics=1000000000,sessions=500000000"` -> bytes per endpoint.
+
+    Malformed entries are logged and skipped, so a typo does not keep the
+    app from starting.
+    """
+    budgets = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        endpoint, _, limit = item.partition("=")
+        try:
+            budget = int(limit)
+        except ValueError:
+            budget = 0
+        if not endpoint.strip() or budget <= 0:
+            logger.warning("Ignoring BIGQUERY_BUDGETS entry %r: expected <endpoint>=<bytes>", item.strip())
+            continue
+        budgets[endpoint.strip()] = budget
+    return budgets
+
+
+BUDGETS = parse_budgets(settings.BIGQUERY_BUDGETS)
+
+
+def budget_for(endpoint: str) -> int:
+    """Byte budget of `endpoint`, 0 if it has none."""
+    return BUDGETS.get(endpoint, 0)
+
+
+class DryRunEstimates:
+    """Bytes-processed estimates by query text, kept for `ttl` seconds.
+
+    Shared by the BigQuery worker threads; two threads missing the same shape
+    at once both dry-run it, which costs nothing but a round-trip.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, shape: str, estimate: Callable[[], int]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(shape)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        value = estimate()
+        with self._lock:
+            self._entries[shape] = (value, now + self.ttl)
+        return value
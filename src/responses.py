@@ -0,0 +1,16 @@
+import json
+from typing import Any, Optional
+
+from fastapi.responses import Response
+
+
+def spliced_response(data: Optional[bytes], source: str, **extra: Any) -> Response:
+    """`ResponseWithSource` body built around already serialized `data`.
+
+    Cached JSON is written out as stored instead of being validated into
+    models and serialized again; `extra` adds further top-level fields.
+    """
+    body = b'{"data":' + (b"null" if data is None else data) + b',"source":"' + source.encode() + b'"'
+    for name, value in extra.items():
+        body += b',"' + name.encode() + b'":' + json.dumps(value, separators=(",", ":")).encode()
+    return Response(content=body + b"}", media_type="application/json")
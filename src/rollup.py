@@ -0,0 +1,131 @@
+"""Weekly and monthly activity summaries rolled up from cached daily rows.
+
+`weekly_activity_summary_v` and `monthly_activity_summary_v` are sums over
+the same rows as `daily_activity_summary_mv`. When the daily month buckets
+for a range are cached, the weekly/monthly rows are aggregated here with
+NumPy instead of querying the views; otherwise the views are queried.
+"""
+
+import json
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .buckets import bucket_key, month_end, month_starts
+from .models import MonthlyActivitySummary, WeeklyActivitySummary
+
+SUM_FIELDS = ("session_count", "total_distance_m", "total_elapsed_time")
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def week_starts(days: np.ndarray) -> np.ndarray:
+    """ISO week start (Monday) of each `datetime64[D]`; 1970-01-01 was a Thursday."""
+    offsets = days - _EPOCH
+    return days - (offsets.astype(np.int64) + 3) % 7
+
+
+def month_firsts(days: np.ndarray) -> np.ndarray:
+    return days.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def rollup(rows: List[Dict[str, Any]], period: str) -> List[Dict[str, Any]]:
+    """Sums daily rows per (`period` start, sport), ordered like the views.
+
+    `period` is "week" or "month". Sums over only NULL values stay NULL, as
+    in SQL. Returns dicts with `period_start`, `sport` and the summed fields.
+    """
+    if not rows:
+        return []
+    days = np.array([row["activity_date"] for row in rows], dtype="datetime64[D]")
+    starts = week_starts(days) if period == "week" else month_firsts(days)
+
+    # NULL sorts first, like ORDER BY sport ASC in BigQuery
+    names = sorted({row["sport"] for row in rows if row["sport"] is not None})
+    codes = {None: 0, **{name: i + 1 for i, name in enumerate(names)}}
+    sports = np.array([codes[row["sport"]] for row in rows], dtype=np.int64)
+    sport_names = [None] + names
+
+    group_keys = (starts - _EPOCH).astype(np.int64) * len(sport_names) + sports
+    unique_keys, groups = np.unique(group_keys, return_inverse=True)
+
+    sums = {}
+    for field in SUM_FIELDS:
+        values = np.array([np.nan if row[field] is None else row[field] for row in rows], dtype=np.float64)
+        present = ~np.isnan(values)
+        totals = np.bincount(groups, weights=np.where(present, values, 0.0), minlength=len(unique_keys))
+        counts = np.bincount(groups, weights=present, minlength=len(unique_keys))
+        sums[field] = (totals, counts)
+
+    period_days, sport_codes = np.divmod(unique_keys, len(sport_names))
+    # Newest period first, then sport ascending
+    order = np.lexsort((sport_codes, -period_days))
+
+    result = []
+    for i in order:
+        entry: Dict[str, Any] = {
+            "period_start": date(1970, 1, 1) + timedelta(days=int(period_days[i])),
+            "sport": sport_names[sport_codes[i]],
+        }
+        for field, (totals, counts) in sums.items():
+            entry[field] = None if counts[i] == 0 else float(totals[i])
+        if entry["session_count"] is not None:
+            entry["session_count"] = int(entry["session_count"])
+        result.append(entry)
+    return result
+
+
+def weekly_from_daily(rows: List[Dict[str, Any]]) -> List[WeeklyActivitySummary]:
+    summaries = []
+    for entry in rollup(rows, "week"):
+        start = entry.pop("period_start")
+        iso_year, iso_week, _ = start.isocalendar()
+        summaries.append(WeeklyActivitySummary(week_start_date=start, iso_year=iso_year, iso_week=iso_week, **entry))
+    return summaries
+
+
+def monthly_from_daily(rows: List[Dict[str, Any]]) -> List[MonthlyActivitySummary]:
+    summaries = []
+    for entry in rollup(rows, "month"):
+        start = entry.pop("period_start")
+        summaries.append(MonthlyActivitySummary(month_start_date=start, year=start.year, month=start.month, **entry))
+    return summaries
+
+
+async def cached_daily_rows(cache, first_day: date, last_day: date, sport: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+    """Daily rows from first_day to last_day if every month of it is cached, else None.
+
+    Days after today cannot have data yet, so their months are not required.
+    """
+    last_day = min(last_day, date.today())
+    if last_day < first_day:
+        return []
+    months = month_starts(first_day, last_day)
+    cached = await cache.peek([bucket_key("daily_activity", month, sport) for month in months])
+    if not all(raw is not None for raw in cached):
+        return None
+    first, last = first_day.isoformat(), last_day.isoformat()
+    return [
+        row
+        for raw in cached
+        for row in json.loads(raw)
+        if first <= row["activity_date"] <= last
+    ]
+
+
+async def fetch_weekly(bq_client, cache, first_day: date, last_day: date, sport: Optional[str]) -> List[WeeklyActivitySummary]:
+    """Weeks starting from first_day to last_day; the last one may run up to 6 days past it."""
+    rows = await cached_daily_rows(cache, first_day, last_day + timedelta(days=6), sport)
+    if rows is None:
+        return await bq_client.get_weekly_activity_summary(start_date=first_day, end_date=last_day, sport=sport)
+    # Weeks starting before first_day are not part of this range
+    return [week for week in weekly_from_daily(rows) if first_day <= week.week_start_date <= last_day]
+
+
+async def fetch_monthly(bq_client, cache, first_day: date, last_day: date, sport: Optional[str]) -> List[MonthlyActivitySummary]:
+    """Months starting from first_day to last_day (called with whole months)."""
+    rows = await cached_daily_rows(cache, first_day, month_end(last_day), sport)
+    if rows is None:
+        return await bq_client.get_monthly_activity_summary(start_date=first_day, end_date=last_day, sport=sport)
+    return [month for month in monthly_from_daily(rows) if first_day <= month.month_start_date <= last_day]
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response
+from fastapi_limiter.depends import RateLimiter
+
+from ..models import BatchRequest, BatchResponse
+from ..config import settings, rate_limiter
+from ..dependencies import get_async_bq_client, get_local_cache, get_redis
+from ..cache import QueryCache
+from ..batch import MGetBatcher, run_batch
+# Importing the routers registers their loaders
+from . import daily_activity, daily_metrics, details, monthly_activity, sessions, summary, weekly_activity  # noqa: F401
+
+router = APIRouter(
+    prefix="/api/batch",
+    tags=["batch"],
+)
+
+
+@router.post(
+    "",
+    response_model=BatchResponse,
+    dependencies=[Depends(RateLimiter(limiter=rate_limiter))],
+)
+async def batch(
+    request: BatchRequest,
+    redis=Depends(get_redis),
+    local_cache=Depends(get_local_cache),
+    bq_client=Depends(get_async_bq_client),
+):
+    """Runs several cached endpoints at once, e.g. everything a dashboard page needs.
+
+    Results come back in request order; a failing query yields
+    `{"error": {"status", "detail"}}` in its place without failing the others.
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="No queries")
+    if len(request.queries) > settings.BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_QUERIES} queries per batch",
+        )
+    cache = QueryCache(MGetBatcher(redis), local=local_cache)
+    body = await run_batch(cache, bq_client, request.queries)
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,52 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from ..models import CacheInvalidation, CacheInvalidationResult
+from ..config import settings
+from ..dependencies import get_async_bq_client, get_redis
+from ..ingestion import check_for_new_data
+from ..tags import invalidate, session_tag
+
+router = APIRouter(
+    prefix="/api/cache",
+    tags=["cache"],
+)
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not settings.CACHE_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Cache administration is disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.CACHE_ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.post(
+    "/invalidate",
+    response_model=CacheInvalidationResult,
+    dependencies=[Depends(require_admin_token)],
+)
+async def invalidate_cache(request: CacheInvalidation, redis=Depends(get_redis)):
+    tags = list(request.tags) + [session_tag(session_id) for session_id in request.session_ids]
+    if not tags and request.sport is None and request.day is None and not request.endpoints:
+        raise HTTPException(status_code=400, detail="Nothing to invalidate")
+    deleted = await invalidate(
+        redis,
+        tags=tags,
+        sport=request.sport,
+        day=request.day,
+        endpoints=request.endpoints,
+    )
+    return CacheInvalidationResult(deleted=deleted)
+
+
+@router.post(
+    "/ingested",
+    response_model=CacheInvalidationResult,
+    dependencies=[Depends(require_admin_token)],
+)
+async def data_ingested(redis=Depends(get_redis), bq_client=Depends(get_async_bq_client)):
+    """Hook for the ingestion pipeline: checks for new rows right away instead of waiting for the watcher."""
+    deleted = await check_for_new_data(redis, bq_client)
+    return CacheInvalidationResult(deleted=deleted)
@@ -3,11 +3,14 @@ from typing import List, Optional
 
 from fastapi import APIRouter, Depends, Query
 from fastapi_limiter.depends import RateLimiter
-import json
 
 from ..models import DailyActivitySummary, ResponseWithSource
 from ..config import settings, rate_limiter
-from ..dependencies import get_redis, get_bq_client
+from ..dependencies import get_query_cache, get_async_bq_client
+from ..responses import spliced_response
+from ..endpoints import cached_endpoint
+from ..tags import query_tags
+from ..buckets import get_or_fetch_months, use_buckets
 
 router = APIRouter(
     prefix="/api/daily-summary",
@@ -28,9 +31,46 @@ async def get_daily_activity_summary(
         None, description="End date (inclusive, format YYYY-MM-DD)"
     ),
     sport: Optional[str] = Query(None, description="Filter by sport"),
-    redis=Depends(get_redis),
-    bq_client=Depends(get_bq_client),
+    cache=Depends(get_query_cache),
+    bq_client=Depends(get_async_bq_client),
 ):
+    return await load_daily_activity_summary(
+        cache, bq_client, start_date=start_date, end_date=end_date, sport=sport
+    )
+
+
+@cached_endpoint("daily_activity")
+async def load_daily_activity_summary(
+    cache,
+    bq_client,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    sport: Optional[str] = None,
+):
+    ttl = getattr(settings, "CACHE_TTL_DAILY_ACTIVITY", settings.CACHE_TTL_SUMMARY)
+    hard_ttl = getattr(settings, "CACHE_HARD_TTL_DAILY_ACTIVITY", settings.CACHE_HARD_TTL_SUMMARY)
+
+    if use_buckets(start_date, end_date):
+        summaries, source = await get_or_fetch_months(
+            cache,
+            "daily_activity",
+            lambda first, last: bq_client.get_daily_activity_summary(
+                start_date=first,
+                end_date=last,
+                sport=sport,
+            ),
+            start_date=start_date,
+            end_date=end_date,
+            date_field="activity_date",
+            response_type=List[DailyActivitySummary],
+            ttl=ttl,
+            hard_ttl=hard_ttl,
+            endpoint="daily_activity",
+            sport=sport,
+            key_parts=(sport,),
+        )
+        return spliced_response(summaries, source)
+
     cache_key = (
         f"daily_activity:"  # base
         f"{start_date if start_date else 'none'}:"  # start
@@ -38,32 +78,19 @@ async def get_daily_activity_summary(
         f"{sport if sport else 'none'}"  # sport
     )
 
-    # Try Cache
-    cached_data = await redis.get(cache_key)
-    if cached_data:
-        data_list = json.loads(cached_data)
-        return ResponseWithSource(
-            data=[DailyActivitySummary(**item) for item in data_list],
-            source="cache"
-        )
-
-    # Cache Miss - query BigQuery
-    summaries = bq_client.get_daily_activity_summary(
-        start_date=start_date,
-        end_date=end_date,
-        sport=sport,
+    summaries, source = await cache.get_or_fetch_raw(
+        cache_key,
+        lambda: bq_client.get_daily_activity_summary(
+            start_date=start_date,
+            end_date=end_date,
+            sport=sport,
+        ),
+        response_type=List[DailyActivitySummary],
+        ttl=ttl,
+        hard_ttl=hard_ttl,
+        endpoint="daily_activity",
+        tags=query_tags(sport, start_date, end_date),
+        cache_empty=False,
     )
 
-    # Serialize and cache
-    if summaries:
-        summaries_json = [s.model_dump() for s in summaries]
-        await redis.set(
-            cache_key,
-            json.dumps(summaries_json, default=str),
-            ex=getattr(settings, "CACHE_TTL_DAILY_ACTIVITY", settings.CACHE_TTL_SUMMARY),
-        )
-
-    return ResponseWithSource(
-        data=summaries,
-        source="bigquery"
-    )
+    return spliced_response(summaries, source)
@@ -1,13 +1,17 @@
 from datetime import date, timedelta, datetime, timezone
-from typing import List, Optional
+from typing import AsyncIterator, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, Query
 from fastapi_limiter.depends import RateLimiter
-import json
 
 from ..models import DailyMetrics, MetricsSummary, ResponseWithSource
 from ..config import settings, rate_limiter
-from ..dependencies import get_redis, get_bq_client
+from ..dependencies import get_query_cache, get_async_bq_client
+from ..responses import spliced_response
+from ..endpoints import cached_endpoint
+from ..tags import query_tags
+from ..buckets import get_or_fetch_months, use_buckets
+from ..streaming import ndjson_response, wants_ndjson
 
 router = APIRouter(
     prefix="/api/daily-metrics",
@@ -27,32 +31,82 @@ async def get_daily_metrics(
     end_date: Optional[date] = Query(
         None, description="End date (inclusive, format YYYY-MM-DD)"
     ),
-    redis=Depends(get_redis),
-    bq_client=Depends(get_bq_client),
+    format: Literal["json", "ndjson"] = Query(
+        None, description="ndjson streams the rows line by line without caching"
+    ),
+    accept: Optional[str] = Header(None),
+    cache=Depends(get_query_cache),
+    bq_client=Depends(get_async_bq_client),
 ):
+    if wants_ndjson(format, accept):
+        pages = bq_client.stream(
+            "iter_daily_metrics",
+            start_date=start_date,
+            end_date=end_date,
+            page_size=settings.BIGQUERY_STREAM_PAGE_SIZE,
+        )
+        if start_date and end_date:
+            pages = _fill_gaps_desc(pages, start_date, end_date)
+        return await ndjson_response(pages)
+
+    return await load_daily_metrics(cache, bq_client, start_date=start_date, end_date=end_date)
+
+
+@cached_endpoint("daily_metrics")
+async def load_daily_metrics(
+    cache,
+    bq_client,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+):
+    if use_buckets(start_date, end_date):
+        # Months are gap-filled as a whole, trimming keeps exactly the requested days
+        metrics, source = await get_or_fetch_months(
+            cache,
+            "daily_metrics",
+            lambda first, last: _fetch_daily_metrics(bq_client, first, last),
+            start_date=start_date,
+            end_date=end_date,
+            date_field="timestamp",
+            response_type=List[DailyMetrics],
+            ttl=settings.CACHE_TTL_METRICS,
+            hard_ttl=settings.CACHE_HARD_TTL_METRICS,
+            endpoint="daily_metrics",
+        )
+        return spliced_response(metrics, source)
+
     cache_key = (
         f"daily_metrics:"  # base
         f"{start_date if start_date else 'none'}:"  # start
         f"{end_date if end_date else 'none'}"  # end
     )
 
-    # Try Cache
-    cached_data = await redis.get(cache_key)
-    if cached_data:
-        data_list = json.loads(cached_data)
-        return ResponseWithSource(
-            data=[DailyMetrics(**item) for item in data_list],
-            source="cache"
-        )
+    metrics, source = await cache.get_or_fetch_raw(
+        cache_key,
+        lambda: _fetch_daily_metrics(bq_client, start_date, end_date),
+        response_type=List[DailyMetrics],
+        ttl=settings.CACHE_TTL_METRICS,
+        hard_ttl=settings.CACHE_HARD_TTL_METRICS,
+        endpoint="daily_metrics",
+        tags=query_tags(start_date=start_date, end_date=end_date),
+        cache_empty=False,
+    )
 
-    # Cache Miss - query BigQuery
-    metrics = bq_client.get_daily_metrics(
+    return spliced_response(metrics, source)
+
+
+async def _fetch_daily_metrics(
+    bq_client, start_date: Optional[date], end_date: Optional[date]
+) -> List[DailyMetrics]:
+    metrics = await bq_client.get_daily_metrics(
         start_date=start_date,
         end_date=end_date,
     )
 
-    # Fill gaps if range is specified
+    # Fill gaps if range is specified; days after today have no data yet and
+    # get no placeholder (month buckets ask up to the end of the month)
     if start_date and end_date:
+        end_date = min(end_date, date.today())
         # Identify which dates have data
         existing_dates = {
             m.timestamp.date() if isinstance(m.timestamp, datetime) else m.timestamp 
@@ -64,29 +118,7 @@ async def get_daily_metrics(
         while current_date <= end_date:
             if current_date not in existing_dates:
                 # Create a placeholder entry with zeros
-                filled_metrics.append(DailyMetrics(
-                    file_hash="none",
-                    filename="none",
-                    timestamp=datetime(current_date.year, current_date.month, current_date.day, tzinfo=timezone.utc),
-                    body_battery_min=0,
-                    body_battery_max=0,
-                    body_battery_avg=0,
-                    pulse=0,
-                    sleep_hours=0,
-                    stress_level_max=0,
-                    stress_level_avg=0,
-                    time_awake=0,
-                    time_in_deep_sleep=0,
-                    time_in_light_sleep=0,
-                    time_in_rem_sleep=0,
-                    weight_kilograms=0,
-                    resting_heart_rate=0,
-                    max_heart_rate=0,
-                    min_heart_rate=0,
-                    avg_heart_rate=0,
-                    hrv_avg=0,
-                    created_at=datetime.now(timezone.utc)
-                ))
+                filled_metrics.append(_placeholder_metrics(current_date))
             current_date += timedelta(days=1)
         
         # Sort by timestamp DESC (to match existing behavior)
@@ -97,21 +129,57 @@ async def get_daily_metrics(
             reverse=True
         )
 
-    # Serialize and cache
-    if metrics:
-        metrics_json = [m.model_dump() for m in metrics]
-        await redis.set(
-            cache_key,
-            json.dumps(metrics_json, default=str),
-            ex=settings.CACHE_TTL_METRICS,
-        )
-
-    return ResponseWithSource(
-        data=metrics,
-        source="bigquery"
+    return metrics
+
+
+def _placeholder_metrics(day: date) -> DailyMetrics:
+    return DailyMetrics(
+        file_hash="none",
+        filename="none",
+        timestamp=datetime(day.year, day.month, day.day, tzinfo=timezone.utc),
+        body_battery_min=0,
+        body_battery_max=0,
+        body_battery_avg=0,
+        pulse=0,
+        sleep_hours=0,
+        stress_level_max=0,
+        stress_level_avg=0,
+        time_awake=0,
+        time_in_deep_sleep=0,
+        time_in_light_sleep=0,
+        time_in_rem_sleep=0,
+        weight_kilograms=0,
+        resting_heart_rate=0,
+        max_heart_rate=0,
+        min_heart_rate=0,
+        avg_heart_rate=0,
+        hrv_avg=0,
+        created_at=datetime.now(timezone.utc)
     )
 
 
+async def _fill_gaps_desc(
+    pages: AsyncIterator[List[DailyMetrics]], start_date: date, end_date: date
+) -> AsyncIterator[List[DailyMetrics]]:
+    """Same gap filling as _fetch_daily_metrics for rows arriving in timestamp DESC order."""
+    next_day = min(end_date, date.today())  # latest day not covered yet
+    async for page in pages:
+        filled: List[DailyMetrics] = []
+        for m in page:
+            day = m.timestamp.date() if isinstance(m.timestamp, datetime) else m.timestamp
+            while next_day > day and next_day >= start_date:
+                filled.append(_placeholder_metrics(next_day))
+                next_day -= timedelta(days=1)
+            filled.append(m)
+            next_day = min(next_day, day - timedelta(days=1))
+        yield filled
+    tail: List[DailyMetrics] = []
+    while next_day >= start_date:
+        tail.append(_placeholder_metrics(next_day))
+        next_day -= timedelta(days=1)
+    yield tail
+
+
 @router.get(
     "/summary",
     response_model=ResponseWithSource[MetricsSummary],
@@ -124,8 +192,18 @@ async def get_metrics_summary(
     end_date: Optional[date] = Query(
         None, description="End date (inclusive, format YYYY-MM-DD)"
     ),
-    redis=Depends(get_redis),
-    bq_client=Depends(get_bq_client),
+    cache=Depends(get_query_cache),
+    bq_client=Depends(get_async_bq_client),
+):
+    return await load_metrics_summary(cache, bq_client, start_date=start_date, end_date=end_date)
+
+
+@cached_endpoint("metrics_summary")
+async def load_metrics_summary(
+    cache,
+    bq_client,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
 ):
     cache_key = (
         f"daily_metrics_summary:"  # base
@@ -133,31 +211,17 @@ async def get_metrics_summary(
         f"{end_date if end_date else 'none'}"  # end
     )
 
-    # Try Cache
-    cached_data = await redis.get(cache_key)
-    if cached_data:
-        data_dict = json.loads(cached_data)
-        return ResponseWithSource(
-            data=MetricsSummary(**data_dict),
-            source="cache"
-        )
-
-    # Cache Miss - query BigQuery
-    summary = bq_client.get_metrics_summary(
-        start_date=start_date,
-        end_date=end_date,
+    summary, source = await cache.get_or_fetch_raw(
+        cache_key,
+        lambda: bq_client.get_metrics_summary(
+            start_date=start_date,
+            end_date=end_date,
+        ),
+        response_type=MetricsSummary,
+        ttl=settings.CACHE_TTL_METRICS,
+        hard_ttl=settings.CACHE_HARD_TTL_METRICS,
+        endpoint="metrics_summary",
+        tags=query_tags(start_date=start_date, end_date=end_date),
     )
 
-    # Serialize and cache
-    if summary:
-        summary_json = summary.model_dump()
-        await redis.set(
-            cache_key,
-            json.dumps(summary_json, default=str),
-            ex=settings.CACHE_TTL_METRICS,
-        )
-
-    return ResponseWithSource(
-        data=summary,
-        source="bigquery"
-    )
+    return spliced_response(summary, source)
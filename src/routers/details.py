@@ -1,74 +1,191 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from fastapi_limiter.depends import RateLimiter
 import json
-from typing import List
+from typing import Annotated, Any, Dict, List, Literal, Optional
+
+from pydantic import Field
 
 from ..models import SessionDetail, ResponseWithSource
 from ..config import settings, rate_limiter
-from ..dependencies import get_redis, get_bq_client
+from ..dependencies import get_query_cache, get_async_bq_client
+from ..columnar import KIND_FLOAT, KIND_TIMESTAMP, column_kinds, columns_to_rows, resolve_codec
+from ..downsample import DOWNSAMPLERS
+from ..responses import spliced_response
+from ..endpoints import cached_endpoint
+from ..tags import session_tag
+from .sessions import parse_ids
 
 router = APIRouter(
     prefix="/api/sessions",
     tags=["sessions"]
 )
 
-@router.get("/{session_id}/details", 
-            response_model=ResponseWithSource[List[SessionDetail]], 
+REQUIRED_FIELDS = {"session_id", "timestamp", "record_id", "file_hash"}
+
+DETAIL_KINDS = column_kinds(SessionDetail)
+
+_details_codec = resolve_codec(settings.CACHE_DETAILS_COMPRESSION)
+
+
+def select_fields(fields: Optional[str]) -> List[str]:
+    """Requested columns in model order; ID fields are always included, unknown names ignored."""
+    if not fields:
+        return list(DETAIL_KINDS)
+    requested = REQUIRED_FIELDS.union(f.strip() for f in fields.split(","))
+    return [name for name in DETAIL_KINDS if name in requested]
+
+
+def _isoformat(value) -> Optional[str]:
+    if value is None:
+        return None
+    # Same representation Pydantic uses for UTC datetimes
+    return value.isoformat().replace("+00:00", "Z")
+
+
+def serialize_rows(columns: Dict[str, List[Any]]) -> bytes:
+    """JSON array of records built straight from column data, without Pydantic models."""
+    columns = dict(columns)
+    for name, values in columns.items():
+        kind = DETAIL_KINDS[name]
+        if kind == KIND_TIMESTAMP:
+            columns[name] = [_isoformat(v) for v in values]
+        elif kind == KIND_FLOAT:
+            # NaN is not valid JSON
+            columns[name] = [None if v != v else v for v in values]
+    return json.dumps(columns_to_rows(columns), separators=(",", ":")).encode()
+
+
+# Must be registered before /{session_id} (see main.py)
+@router.get("/details",
+            response_model=ResponseWithSource[Dict[str, List[SessionDetail]]],
+            dependencies=[Depends(RateLimiter(limiter=rate_limiter))])
+async def get_sessions_details(
+    ids: str = Query(..., description="Comma separated session ids"),
+    fields: str = None, # Comma separated list of fields
+    max_points: Optional[int] = Query(
+        None, ge=10, le=100000, description="Downsample each series to at most this many points"
+    ),
+    downsample: Literal["lttb", "mean"] = Query(
+        "lttb", description="lttb keeps peaks per metric, mean averages fixed time buckets"
+    ),
+    cache = Depends(get_query_cache),
+    bq_client = Depends(get_async_bq_client)
+):
+    return await load_sessions_details(
+        cache, bq_client, ids=ids, fields=fields, max_points=max_points, downsample=downsample,
+    )
+
+
+@cached_endpoint("sessions_details")
+async def load_sessions_details(
+    cache,
+    bq_client,
+    ids: str,
+    fields: Optional[str] = None,
+    max_points: Annotated[Optional[int], Field(ge=10, le=100000)] = None,
+    downsample: Literal["lttb", "mean"] = "lttb",
+):
+    session_ids = parse_ids(ids)
+    selected = select_fields(fields)
+
+    # Same per-session hashes as the single-session endpoint
+    series, source = await cache.get_or_fetch_columns_many(
+        [f"session_details:{session_id}" for session_id in session_ids],
+        selected,
+        lambda missing: _fetch_series(bq_client, [session_ids[i] for i in missing], selected),
+        kinds=DETAIL_KINDS,
+        ttl=settings.CACHE_TTL_DETAILS,
+        codec=_details_codec,
+        endpoint="session_details",
+        tags=[[session_tag(session_id)] for session_id in session_ids],
+    )
+
+    parts = []
+    for session_id, columns in zip(session_ids, series):
+        if max_points is not None and columns["timestamp"]:
+            columns = DOWNSAMPLERS[downsample](columns, DETAIL_KINDS, max_points)
+        parts.append(json.dumps(session_id).encode() + b":" + serialize_rows(columns))
+    return spliced_response(b"{" + b",".join(parts) + b"}", source)
+
+
+async def _fetch_series(bq_client, session_ids: List[str], fields: List[str]) -> List[Dict[str, List[Any]]]:
+    by_session = await bq_client.get_sessions_details(session_ids, fields=fields)
+    return [by_session[session_id] for session_id in session_ids]
+
+
+@router.get("/{session_id}/details",
+            response_model=ResponseWithSource[List[SessionDetail]],
             dependencies=[Depends(RateLimiter(limiter=rate_limiter))])
 async def get_session_details(
     session_id: str,
     fields: str = None, # Comma separated list of fields
-    redis = Depends(get_redis),
-    bq_client = Depends(get_bq_client)
+    max_points: Optional[int] = Query(
+        None, ge=10, le=100000, description="Downsample the series to at most this many points"
+    ),
+    downsample: Literal["lttb", "mean"] = Query(
+        "lttb", description="lttb keeps peaks per metric, mean averages fixed time buckets"
+    ),
+    cache = Depends(get_query_cache),
+    bq_client = Depends(get_async_bq_client)
+):
+    return await load_session_details(
+        cache, bq_client, session_id=session_id, fields=fields,
+        max_points=max_points, downsample=downsample,
+    )
+
+
+@cached_endpoint("session_details")
+async def load_session_details(
+    cache,
+    bq_client,
+    session_id: str,
+    fields: Optional[str] = None,
+    max_points: Annotated[Optional[int], Field(ge=10, le=100000)] = None,
+    downsample: Literal["lttb", "mean"] = "lttb",
 ):
-    # Parse fields if provided
-    field_list = [f.strip() for f in fields.split(",")] if fields else None
-    
-    # Cache Key is ALWAYS by session_id (we cache the full response)
+    # Only the selected columns are read from the cache, fetched from
+    # BigQuery and serialized; unselected fields are omitted from the response
+    selected = select_fields(fields)
+
+    # One Redis hash per session, one field per column
     cache_key = f"session_details:{session_id}"
-    
-    # Helper to filter fields
-    def filter_fields(details: List[SessionDetail], selected: List[str]) -> List[SessionDetail]:
-        if not selected:
-            return details
-        
-        # Ensure ID fields are always present
-        required = {"session_id", "timestamp", "record_id", "file_hash"}
-        keep = required.union(set(selected))
-        
-        filtered = []
-        for d in details:
-            # Create a copy with only selected fields, others None
-            
-            d_dict = d.model_dump()
-            filtered_dict = {k: v for k, v in d_dict.items() if k in keep}
-            filtered.append(SessionDetail(**filtered_dict))
-            
-        return filtered
-
-    # Try Cache
-    cached_data = await redis.get(cache_key)
-    if cached_data:
-        data_list = json.loads(cached_data)
-        full_details = [SessionDetail(**item) for item in data_list]
-        return ResponseWithSource(
-            data=filter_fields(full_details, field_list),
-            source="cache"
-        )
-    
-    # Cache Miss - Get ALL details from BQ
-    full_details = bq_client.get_session_details(session_id)
-    
-    # Serialize and Cache FULL details
-    if full_details:
-        details_json = [d.model_dump() for d in full_details]
-        await redis.set(
-            cache_key, 
-            json.dumps(details_json, default=str), 
-            ex=settings.CACHE_TTL_DETAILS
+
+    async def load_columns():
+        return await cache.get_or_fetch_columns(
+            cache_key,
+            selected,
+            lambda missing: bq_client.get_session_details(session_id, fields=missing),
+            kinds=DETAIL_KINDS,
+            ttl=settings.CACHE_TTL_DETAILS,
+            codec=_details_codec,
+            endpoint="session_details",
+            tags=[session_tag(session_id)],
         )
-    
-    return ResponseWithSource(
-        data=filter_fields(full_details, field_list),
-        source="bigquery"
+
+    if max_points is None:
+        columns, source = await load_columns()
+        return spliced_response(serialize_rows(columns), source)
+
+    # Downsampled variants are cached as finished JSON next to the full series
+    series_source = "cache"
+
+    async def build_downsampled() -> Optional[bytes]:
+        nonlocal series_source
+        columns, series_source = await load_columns()
+        if not columns["timestamp"]:
+            return None
+        return serialize_rows(DOWNSAMPLERS[downsample](columns, DETAIL_KINDS, max_points))
+
+    data, source = await cache.get_or_fetch(
+        f"session_details_ds:{session_id}:{downsample}:{max_points}:{','.join(selected)}",
+        build_downsampled,
+        response_type=bytes,
+        ttl=settings.CACHE_TTL_DETAILS,
+        endpoint="session_details_downsampled",
+        tags=[session_tag(session_id)],
+        cache_empty=False,
+        encode=lambda data: data,
+        decode=lambda data: data,
     )
+    # A miss here may still have been served from the cached full series
+    return spliced_response(data or b"[]", source if source == "cache" else series_source)
@@ -1,126 +1,380 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Header, Query, HTTPException
+from fastapi.responses import Response
 from typing import Optional
 from fastapi_limiter.depends import RateLimiter
+import base64
+import binascii
+import hashlib
 import json
-from typing import List
-from datetime import date
+from typing import Annotated, List, Literal, Set, Tuple
+from datetime import date, datetime
 
-from ..models import SessionSummary, ResponseWithSource
+from pydantic import Field
+
+from ..models import SessionSummary, ResponseWithSource, PaginatedResponseWithSource
 from ..config import settings, rate_limiter
-from ..dependencies import get_redis, get_bq_client
+from ..dependencies import get_query_cache, get_async_bq_client
+from ..bigquery_client import SESSION_MAP_COLUMNS
+from ..responses import spliced_response
+from ..endpoints import cached_endpoint
+from ..tags import query_tags, session_tag
+from ..streaming import ndjson_response, wants_ndjson
+from ..query_cost import QueryOverBudget
 
 router = APIRouter(
     prefix="/api/sessions",
     tags=["sessions"]
 )
 
+
+def parse_include(include: Optional[str], allowed: Set[str]) -> List[str]:
+    if not include:
+        return []
+    include_list = sorted({name.strip() for name in include.split(",") if name.strip()})
+    unknown = [name for name in include_list if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include value(s): {', '.join(unknown)}"
+        )
+    return include_list
+
+
+def parse_ids(ids: str) -> List[str]:
+    """Unique ids in request order, at most SESSIONS_MAX_BATCH_IDS."""
+    parsed = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="No session ids given")
+    if len(parsed) > settings.SESSIONS_MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.SESSIONS_MAX_BATCH_IDS} session ids per request",
+        )
+    return parsed
+
+
+def require_range(start_date: Optional[date], end_date: Optional[date]) -> None:
+    if not start_date or not end_date:
+        raise HTTPException(
+            status_code=400, 
+            detail="start_date and end_date are required when using all=true"
+        )
+
+
+def encode_cursor(start_time: str, session_id: str) -> str:
+    payload = json.dumps([start_time, session_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        start_time, session_id = json.loads(payload)
+        # Cached pages serialize UTC as "Z", which fromisoformat only accepts from 3.11
+        return datetime.fromisoformat(start_time.replace("Z", "+00:00")), str(session_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_map(encoded: str) -> Optional[bytes]:
+    # Maps may be stored as plain base64 or as a data URI
+    if encoded.startswith("data:"):
+        encoded = encoded.split(",", 1)[-1]
+    try:
+        # Strict: stray characters are corrupt data, not something to skip
+        return base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def image_media_type(image: bytes) -> str:
+    if image.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if image.startswith(b"RIFF") and image[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/png"
+
 @router.get("", 
-            response_model=ResponseWithSource[List[SessionSummary]], 
+            response_model=PaginatedResponseWithSource[List[SessionSummary]], 
             dependencies=[Depends(RateLimiter(limiter=rate_limiter))])
 
 async def get_sessions(
-    page: int = Query(1, ge=1, description="Page number"),
+    page: int = Query(1, ge=1, description="Page number (offset pagination, prefer cursor)"),
+    cursor: str = Query(None, description="Opaque cursor from next_cursor of the previous page"),
+    page_size: int = Query(settings.SESSIONS_PAGE_SIZE, ge=1, le=settings.SESSIONS_MAX_PAGE_SIZE, description="Sessions per page"),
     all: bool = Query(False, description="Return all sessions without pagination (requires start_date and end_date)"),
     sport: str = Query(None, description="Filter by sport"),
     start_date: date = Query(None, description="Filter by start date (YYYY-MM-DD)"),
     end_date: date = Query(None, description="Filter by end date (YYYY-MM-DD)"),
     min_distance: float = Query(None, description="Filter by minimum distance in meters"),
     max_distance: float = Query(None, description="Filter by maximum distance in meters"),
-    redis = Depends(get_redis),
-    bq_client = Depends(get_bq_client)
+    include: str = Query(None, description="Comma separated extras to include: map_preview"),
+    format: Literal["json", "ndjson"] = Query(None, description="ndjson streams all=true results line by line"),
+    accept: Optional[str] = Header(None),
+    cache = Depends(get_query_cache),
+    bq_client = Depends(get_async_bq_client)
 ):
-    if all:
-        if not start_date or not end_date:
+    if wants_ndjson(format, accept):
+        if not all:
             raise HTTPException(
-                status_code=400, 
-                detail="start_date and end_date are required when using all=true"
+                status_code=400,
+                detail="ndjson is only available with all=true"
             )
+        require_range(start_date, end_date)
+        # Full exports are streamed page by page straight from BigQuery;
+        # memory stays bounded by the page size and nothing is cached
+        return await ndjson_response(bq_client.stream(
+            "iter_recent_sessions",
+            page_size=settings.BIGQUERY_STREAM_PAGE_SIZE,
+            limit=None,
+            sport=sport,
+            start_date=start_date,
+            end_date=end_date,
+            min_distance=min_distance,
+            max_distance=max_distance,
+            include=parse_include(include, allowed={"map_preview"}),
+        ))
+    
+    return await load_sessions(
+        cache, bq_client, page=page, cursor=cursor, page_size=page_size, all=all,
+        sport=sport, start_date=start_date, end_date=end_date,
+        min_distance=min_distance, max_distance=max_distance, include=include,
+    )
+
+
+@cached_endpoint("sessions")
+async def load_sessions(
+    cache,
+    bq_client,
+    page: Annotated[int, Field(ge=1)] = 1,
+    cursor: Optional[str] = None,
+    page_size: Annotated[int, Field(ge=1, le=settings.SESSIONS_MAX_PAGE_SIZE)] = settings.SESSIONS_PAGE_SIZE,
+    all: bool = False,
+    sport: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    min_distance: Optional[float] = None,
+    max_distance: Optional[float] = None,
+    include: Optional[str] = None,
+):
+    if all:
+        require_range(start_date, end_date)
         limit = None
         offset = 0
+        after = None
+    elif cursor:
+        # Keyset pagination: page N costs the same as page 1
+        limit = page_size
+        offset = 0
+        after = decode_cursor(cursor)
     else:
-        limit = 10
+        limit = page_size
         offset = (page - 1) * limit
+        after = None
+    
+    include_list = parse_include(include, allowed={"map_preview"})
     
     # Generate cache key based on all parameters
     cache_params = {
         "all": all,
-        "page": page if not all else None,
+        "page": page if not all and not cursor else None,
         "sport": sport,
         "start_date": str(start_date) if start_date else None,
         "end_date": str(end_date) if end_date else None,
         "min_distance": min_distance,
-        "max_distance": max_distance
+        "max_distance": max_distance,
     }
-    cache_key = f"sessions_list_{json.dumps(cache_params, sort_keys=True)}"
+    if cursor and not all:
+        cache_params["cursor"] = cursor
+    if page_size != settings.SESSIONS_PAGE_SIZE:
+        cache_params["page_size"] = page_size
+
+    def cache_key(include: List[str]) -> str:
+        return f"sessions_list_{json.dumps({**cache_params, 'include': include or None}, sort_keys=True)}"
     
-    # Try Cache
-    cached_data = await redis.get(cache_key)
-    if cached_data:
-        data_list = json.loads(cached_data)
-        return ResponseWithSource(
-            data=[SessionSummary(**item) for item in data_list],
-            source="cache"
+    def query_page(include: List[str]):
+        return bq_client.get_recent_sessions(
+            limit=limit, 
+            offset=offset,
+            sport=sport,
+            start_date=start_date,
+            end_date=end_date,
+            min_distance=min_distance,
+            max_distance=max_distance,
+            include=include,
+            after=after
+        )
+
+    async def fetch_page(include: List[str]) -> List[SessionSummary]:
+        page_sessions = await query_page(include)
+        await write_through_sessions(cache, page_sessions)
+        return page_sessions
+
+    def load_page(include: List[str]):
+        return cache.get_or_fetch_raw(
+            cache_key(include),
+            lambda: fetch_page(include),
+            response_type=List[SessionSummary],
+            ttl=settings.CACHE_TTL_SESSIONS,
+            hard_ttl=settings.CACHE_HARD_TTL_SESSIONS,
+            endpoint="sessions",
+            tags=query_tags(sport, start_date, end_date),
         )
+
+    extra = {}
+    try:
+        sessions, source = await load_page(include_list)
+    except QueryOverBudget:
+        if not include_list:
+            raise
+        # Map images are most of the bytes a list query reads: over the
+        # budget the page is served without them (the fields stay null). It is
+        # the plain page, cached as such; the include key stays empty so the
+        # maps are tried again once the query fits the budget.
+        sessions, source = await load_page([])
+        extra["omitted"] = include_list
     
-    # Cache Miss
-    sessions = bq_client.get_recent_sessions(
-        limit=limit, 
-        offset=offset,
-        sport=sport,
-        start_date=start_date,
-        end_date=end_date,
-        min_distance=min_distance,
-        max_distance=max_distance
-    )
+    # A full page may have more behind it; the cursor points after its last row
+    next_cursor = None
+    if limit is not None:
+        # Plain JSON decode of a single page, no model validation
+        rows = json.loads(sessions)
+        if len(rows) == limit and rows[-1]["start_time"] is not None:
+            next_cursor = encode_cursor(rows[-1]["start_time"], rows[-1]["session_id"])
     
-    # Serialize and Cache
-    sessions_json = [s.model_dump() for s in sessions]
-    await redis.set(
-        cache_key, 
-        json.dumps(sessions_json, default=str), 
-        ex=settings.CACHE_TTL_SESSIONS
+    return spliced_response(sessions, source, next_cursor=next_cursor, **extra)
+
+
+async def write_through_sessions(cache, sessions: List[SessionSummary]) -> None:
+    """Stores listed sessions under their session_detail_{id} keys, so by-ids lookups are cache hits.
+
+    Map images are left out: the plain entry (`include=`) never includes them.
+    """
+    no_maps = {column: None for column in SESSION_MAP_COLUMNS.values()}
+    await cache.store_many(
+        {f"session_detail_{s.session_id}": s.model_copy(update=no_maps) for s in sessions},
+        response_type=SessionSummary,
+        ttl=settings.CACHE_TTL_SESSIONS,
+        hard_ttl=settings.CACHE_HARD_TTL_SESSIONS,
+        endpoint="session",
+        tags={f"session_detail_{s.session_id}": [session_tag(s.session_id)] for s in sessions},
     )
-    
-    return ResponseWithSource(
-        data=sessions,
-        source="bigquery"
+
+
+@router.get("/by-ids",
+            response_model=ResponseWithSource[List[SessionSummary]],
+            dependencies=[Depends(RateLimiter(limiter=rate_limiter))])
+async def get_sessions_by_ids(
+    ids: str = Query(..., description="Comma separated session ids"),
+    cache = Depends(get_query_cache),
+    bq_client = Depends(get_async_bq_client)
+):
+    return await load_sessions_by_ids(cache, bq_client, ids=ids)
+
+
+@cached_endpoint("sessions_by_ids")
+async def load_sessions_by_ids(cache, bq_client, ids: str):
+    """Sessions in request order from the per-session entries; unknown ids are left out."""
+    session_ids = parse_ids(ids)
+
+    async def fetch_missing(indexes: List[int]) -> List[Optional[SessionSummary]]:
+        found = await bq_client.get_sessions_by_ids([session_ids[i] for i in indexes])
+        by_id = {session.session_id: session for session in found}
+        return [by_id.get(session_ids[i]) for i in indexes]
+
+    # Same entries (and stale-while-revalidate envelope) as GET /{session_id}?include=
+    sessions, source = await cache.get_or_fetch_buckets(
+        [f"session_detail_{session_id}" for session_id in session_ids],
+        fetch_missing,
+        response_type=SessionSummary,
+        ttl=settings.CACHE_TTL_SESSIONS,
+        hard_ttl=settings.CACHE_HARD_TTL_SESSIONS,
+        endpoint="session",
+        tags=[[session_tag(session_id)] for session_id in session_ids],
     )
 
+    return spliced_response(b"[" + b",".join(s for s in sessions if s is not None) + b"]", source)
+
 
 @router.get("/{session_id}",
             response_model=ResponseWithSource[SessionSummary],
             dependencies=[Depends(RateLimiter(limiter=rate_limiter))])
 async def get_session_by_id(
     session_id: str,
-    redis = Depends(get_redis),
-    bq_client = Depends(get_bq_client)
+    include: str = Query(
+        None, description="Comma separated maps to include: map_preview, map_large (default both, empty for none)"
+    ),
+    cache = Depends(get_query_cache),
+    bq_client = Depends(get_async_bq_client)
 ):
+    return await load_session(cache, bq_client, session_id=session_id, include=include)
+
+
+@cached_endpoint("session")
+async def load_session(cache, bq_client, session_id: str, include: Optional[str] = None):
+    # A single session comes with its maps unless asked otherwise; the
+    # map-less entry (include=) is the one lists and by-ids share
+    if include is None:
+        include_list = sorted(SESSION_MAP_COLUMNS)
+    else:
+        include_list = parse_include(include, allowed=set(SESSION_MAP_COLUMNS))
     cache_key = f"session_detail_{session_id}"
+    if include_list:
+        cache_key += f":{','.join(include_list)}"
     
-    # Try Cache
-    cached_data = await redis.get(cache_key)
-    if cached_data:
-        data = json.loads(cached_data)
-        return ResponseWithSource(
-            data=SessionSummary(**data),
-            source="cache"
-        )
-    
-    # Cache Miss
-    session = bq_client.get_session_by_id(session_id)
+    session, source = await cache.get_or_fetch_raw(
+        cache_key,
+        lambda: bq_client.get_session_by_id(session_id, include=include_list),
+        response_type=SessionSummary,
+        ttl=settings.CACHE_TTL_SESSIONS,
+        hard_ttl=settings.CACHE_HARD_TTL_SESSIONS,
+        endpoint="session",
+        tags=[session_tag(session_id)],
+    )
     
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    # Serialize and Cache
-    session_json = session.model_dump()
-    await redis.set(
-        cache_key,
-        json.dumps(session_json, default=str),
-        ex=settings.CACHE_TTL_SESSIONS
-    )
-    
-    return ResponseWithSource(
-        data=session,
-        source="bigquery"
+    return spliced_response(session, source)
+
+
+@router.get("/{session_id}/map/{size}",
+            response_class=Response,
+            responses={200: {"content": {"image/png": {}}}},
+            dependencies=[Depends(RateLimiter(limiter=rate_limiter))])
+async def get_session_map(
+    session_id: str,
+    size: Literal["mini", "large"],
+    if_none_match: Optional[str] = Header(None),
+    cache = Depends(get_query_cache),
+    bq_client = Depends(get_async_bq_client)
+):
+    column = "map_preview" if size == "mini" else "map_large"
+
+    async def fetch_image() -> Optional[bytes]:
+        encoded = await bq_client.get_session_map(session_id, column)
+        return decode_map(encoded) if encoded else None
+
+    # Decoded once and cached as raw bytes, separate from the session JSON
+    image, _ = await cache.get_or_fetch(
+        f"session_map:{size}:{session_id}",
+        fetch_image,
+        response_type=bytes,
+        ttl=settings.CACHE_TTL_MAPS,
+        endpoint="session_map",
+        tags=[session_tag(session_id)],
+        encode=lambda data: data,
+        decode=lambda data: data,
     )
+
+    if image is None:
+        raise HTTPException(status_code=404, detail="Map not found")
+
+    etag = f'"{hashlib.md5(image).hexdigest()}"'
+    headers = {
+        "Cache-Control": f"public, max-age={settings.CACHE_TTL_MAPS}",
+        "ETag": etag,
+    }
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=image, media_type=image_media_type(image), headers=headers)
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends
 from fastapi_limiter.depends import RateLimiter
-import json
 
 from ..models import GlobalSummary, ResponseWithSource
 from ..config import settings, rate_limiter
-from ..dependencies import get_redis, get_bq_client
+from ..dependencies import get_query_cache, get_async_bq_client
+from ..responses import spliced_response
+from ..endpoints import cached_endpoint
+from ..tags import query_tags
 
 router = APIRouter(
     prefix="/api/summary",
@@ -16,30 +18,24 @@ router = APIRouter(
             dependencies=[Depends(RateLimiter(limiter=rate_limiter))])
 
 async def get_summary(
-    redis = Depends(get_redis),
-    bq_client = Depends(get_bq_client)
+    cache = Depends(get_query_cache),
+    bq_client = Depends(get_async_bq_client)
 ):
+    return await load_summary(cache, bq_client)
+
+
+@cached_endpoint("summary")
+async def load_summary(cache, bq_client):
     cache_key = "global_summary"
     
-    # Try Cache
-    cached_data = await redis.get(cache_key)
-    if cached_data:
-        return ResponseWithSource(
-            data=GlobalSummary(**json.loads(cached_data)),
-            source="cache"
-        )
-    
-    # Cache Miss
-    summary = bq_client.get_global_summary()
-    
-    # Cache
-    await redis.set(
-        cache_key, 
-        json.dumps(summary.model_dump(), default=str), 
-        ex=settings.CACHE_TTL_SUMMARY
+    summary, source = await cache.get_or_fetch_raw(
+        cache_key,
+        lambda: bq_client.get_global_summary(),
+        response_type=GlobalSummary,
+        ttl=settings.CACHE_TTL_SUMMARY,
+        hard_ttl=settings.CACHE_HARD_TTL_SUMMARY,
+        endpoint="summary",
+        tags=query_tags(),
     )
     
-    return ResponseWithSource(
-        data=summary,
-        source="bigquery"
-    )
+    return spliced_response(summary, source)
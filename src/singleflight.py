@@ -0,0 +1,89 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+Loader = Callable[[], Awaitable[Any]]
+
+# Deletes the lock only if we still own it (the TTL may have handed it to someone else)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key within this process.
+
+    The first caller starts `load()`; everyone arriving while it is in flight
+    awaits the same task instead of issuing a second BigQuery job.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, load: Loader) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(load())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        # shield: a disconnecting caller must not cancel the query for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+
+class RedisSingleFlight:
+    """Coalesces cache misses across workers and replicas with a Redis lock.
+
+    The lock holder runs `load()` (which is expected to write the cache); the
+    others poll `reload()` until the value shows up, and only run `load()`
+    themselves if the holder disappears or `wait_timeout` passes.
+    """
+
+    def __init__(
+        self,
+        redis,
+        lock_ttl_ms: int = 30000,
+        poll_interval: float = 0.05,
+        wait_timeout: float = 30.0,
+    ):
+        self.redis = redis
+        self.lock_ttl_ms = lock_ttl_ms
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+
+    async def do(self, key: str, load: Loader, reload: Callable[[], Awaitable[Optional[Any]]]) -> Any:
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+
+        if await self.redis.set(lock_key, token, nx=True, px=self.lock_ttl_ms):
+            try:
+                return await load()
+            finally:
+                await self.redis.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            # Check the lock before reading so a release in between is not missed
+            lock_held = await self.redis.exists(lock_key)
+            value = await reload()
+            if value is not None:
+                return value
+            if not lock_held:
+                # Holder finished without caching (e.g. empty result) or crashed
+                break
+        return await load()
+
+
+# Shared per-process instance; entries only live while a query is in flight
+single_flight = SingleFlight()
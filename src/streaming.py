@@ -0,0 +1,40 @@
+from typing import AsyncIterator, Iterable, List, Optional
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(format: Optional[str], accept: Optional[str]) -> bool:
+    """NDJSON is selected by `format=ndjson` or an `Accept: application/x-ndjson` header."""
+    if format is not None:
+        return format == "ndjson"
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+
+async def ndjson_lines(pages: AsyncIterator[Iterable[BaseModel]]) -> AsyncIterator[bytes]:
+    # One JSON document per line; a whole page is written at once
+    async for page in pages:
+        chunk = b"".join(item.model_dump_json().encode() + b"\n" for item in page)
+        if chunk:
+            yield chunk
+
+
+async def _prepend(first: List[BaseModel], pages: AsyncIterator[List[BaseModel]]) -> AsyncIterator[List[BaseModel]]:
+    yield first
+    async for page in pages:
+        yield page
+
+
+async def ndjson_response(pages: AsyncIterator[List[BaseModel]]) -> StreamingResponse:
+    """Streams result pages as they arrive; nothing is buffered or cached.
+
+    The first page is awaited before the response starts, so a query that is
+    refused up front (e.g. over its cost budget) still gets an error status.
+    """
+    try:
+        first = await pages.__anext__()
+    except StopAsyncIteration:
+        first = []
+    return StreamingResponse(ndjson_lines(_prepend(first, pages)), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,199 @@
+"""Tag sets for targeted cache invalidation.
+
+Every cache key is added to Redis sets named `tag:<tag>` for the dimensions
+its data depends on: endpoint, sport filter, the months its date range
+covers, and session id. Invalidation reads the member keys of the affected
+tags and UNLINKs exactly those, without scanning the keyspace.
+
+Members are not removed when their key expires, so invalidation also prunes
+the tag sets it reads: deleted keys and keys that no longer exist are
+SREM'ed, which keeps busy tags (`sport:any`, the running month) from growing.
+
+Queries without a sport filter or date bound carry `sport:any` / `month:any`,
+so a change for one sport and day also evicts everything that aggregates
+across sports or over open ranges.
+"""
+
+from datetime import date, timedelta
+from typing import Iterable, List, Optional, Sequence, Set
+
+from .local_cache import INVALIDATION_CHANNEL
+
+TAG_PREFIX = "tag:"
+ANY = "any"
+
+# Ranges over more months than this are tagged as unbounded
+MAX_MONTH_TAGS = 24
+
+UNLINK_BATCH = 500
+
+
+def endpoint_tag(name: str) -> str:
+    return f"endpoint:{name}"
+
+
+def session_tag(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def sport_tag(sport: Optional[str]) -> str:
+    return f"sport:{sport or ANY}"
+
+
+def month_tag(day: date) -> str:
+    return f"month:{day:%Y-%m}"
+
+
+def month_tags(start_date: Optional[date], end_date: Optional[date]) -> List[str]:
+    if start_date is None or end_date is None or end_date < start_date:
+        return [f"month:{ANY}"]
+    months = (end_date.year - start_date.year) * 12 + end_date.month - start_date.month + 1
+    if months > MAX_MONTH_TAGS:
+        return [f"month:{ANY}"]
+    tags = []
+    year, month = start_date.year, start_date.month
+    for _ in range(months):
+        tags.append(f"month:{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return tags
+
+
+def query_tags(
+    sport: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> List[str]:
+    """Tags for a query filtered (or not) by sport and date range."""
+    return [sport_tag(sport)] + month_tags(start_date, end_date)
+
+
+def register_tags(pipe, cache_key: str, tags: Iterable[str], ttl: int) -> None:
+    """Queues SADD/EXPIRE commands adding `cache_key` to its tag sets on a pipeline.
+
+    `ttl` is the expiry of `cache_key`. A tag set must not expire before any
+    of its members, so its expiry is set when missing and moved up to this
+    member's; it never outlives its longest-lived member.
+    """
+    for tag in tags:
+        pipe.sadd(TAG_PREFIX + tag, cache_key)
+        pipe.expire(TAG_PREFIX + tag, ttl, nx=True)
+        pipe.expire(TAG_PREFIX + tag, ttl, gt=True)
+
+
+async def tagged_keys(redis, tags: Sequence[str]) -> Set[bytes]:
+    """Keys in any of the given tags."""
+    if not tags:
+        return set()
+    return set(await redis.sunion([TAG_PREFIX + tag for tag in tags]))
+
+
+async def keys_for_change(
+    redis,
+    *,
+    sport: Optional[str] = None,
+    day: Optional[date] = None,
+    endpoints: Sequence[str] = (),
+) -> Set[bytes]:
+    """Keys whose data may change when rows for `sport` on `day` are added.
+
+    Each given dimension narrows the result; one that is not given matches all.
+    """
+    groups = change_tag_groups(sport=sport, day=day, endpoints=endpoints)
+    if not groups:
+        return set()
+    keys = await tagged_keys(redis, groups[0])
+    for group in groups[1:]:
+        if not keys:
+            break
+        keys &= await tagged_keys(redis, group)
+    return keys
+
+
+def change_tag_groups(
+    *,
+    sport: Optional[str] = None,
+    day: Optional[date] = None,
+    endpoints: Sequence[str] = (),
+) -> List[List[str]]:
+    """Tag groups of `keys_for_change`: a key must be in one tag of every group."""
+    groups = []
+    if sport is not None:
+        groups.append([sport_tag(sport), sport_tag(None)])
+    if day is not None:
+        # Weekly buckets starting in the previous month also contain this day
+        week_start = day - timedelta(days=day.weekday())
+        groups.append(sorted({month_tag(day), month_tag(week_start)}) + [f"month:{ANY}"])
+    if endpoints:
+        groups.append([endpoint_tag(name) for name in endpoints])
+    return groups
+
+
+async def unlink_keys(redis, keys: Iterable) -> int:
+    """UNLINKs the keys in pipelined batches and tells every worker to drop its L1 copies."""
+    keys = list(keys)
+    if not keys:
+        return 0
+    pipe = redis.pipeline(transaction=False)
+    for start in range(0, len(keys), UNLINK_BATCH):
+        pipe.unlink(*keys[start:start + UNLINK_BATCH])
+    for key in keys:
+        pipe.publish(INVALIDATION_CHANNEL, key)
+    results = await pipe.execute()
+    return sum(results[: -len(keys)])
+
+
+async def prune_tags(redis, tags: Sequence[str]) -> int:
+    """SREMs the members of the given tag sets whose keys no longer exist.
+
+    Returns the number of members removed.
+    """
+    names = [TAG_PREFIX + tag for tag in tags]
+    if not names:
+        return 0
+    pipe = redis.pipeline(transaction=False)
+    for name in names:
+        pipe.smembers(name)
+    members = await pipe.execute()
+    keys = list(set().union(*members))
+    if not keys:
+        return 0
+    pipe = redis.pipeline(transaction=False)
+    for key in keys:
+        pipe.exists(key)
+    dead = {key for key, exists in zip(keys, await pipe.execute()) if not exists}
+    if not dead:
+        return 0
+    pipe = redis.pipeline(transaction=False)
+    removed = 0
+    for name, keys in zip(names, members):
+        stale = [key for key in keys if key in dead]
+        if stale:
+            pipe.srem(name, *stale)
+            removed += len(stale)
+    await pipe.execute()
+    return removed
+
+
+async def invalidate(
+    redis,
+    *,
+    tags: Sequence[str] = (),
+    sport: Optional[str] = None,
+    day: Optional[date] = None,
+    endpoints: Sequence[str] = (),
+) -> int:
+    """Deletes every key in `tags` plus the keys affected by a change (see `keys_for_change`).
+
+    Returns the number of keys deleted. Explicit tag sets are dropped too, the
+    tag sets read for the change are pruned (see `prune_tags`).
+    """
+    keys = await tagged_keys(redis, tags)
+    groups = change_tag_groups(sport=sport, day=day, endpoints=endpoints)
+    if groups:
+        keys |= await keys_for_change(redis, sport=sport, day=day, endpoints=endpoints)
+    deleted = await unlink_keys(redis, keys)
+    if tags:
+        await redis.unlink(*[TAG_PREFIX + tag for tag in tags])
+    if groups:
+        await prune_tags(redis, sorted({tag for group in groups for tag in group}))
+    return deleted
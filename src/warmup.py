@@ -0,0 +1,109 @@
+"""Cache pre-warming.
+
+Replays the most requested endpoint calls (as counted by the hit tracker)
+plus a fixed dashboard set, so a deploy or a flushed Redis does not turn
+every first page load into a BigQuery query.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import settings
+from .endpoints import call_endpoint, hit_tracker
+# Importing the routers registers their loaders
+from .routers import daily_activity, daily_metrics, details, monthly_activity, sessions, summary, weekly_activity  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+Recipe = Tuple[str, Dict[str, Any]]
+
+WARMUP_LOCK_KEY = "warmup:lock"
+
+
+def dashboard_recipes(today: Optional[date] = None) -> List[Recipe]:
+    """What a dashboard load requests: first sessions page, summaries, this month and common ranges."""
+    today = today or date.today()
+    month_start = today.replace(day=1)
+    this_month = {"start_date": month_start.isoformat(), "end_date": today.isoformat()}
+    recipes: List[Recipe] = [
+        ("summary", {}),
+        ("sessions", {}),
+        ("daily_activity", dict(this_month)),
+        ("weekly_activity", dict(this_month)),
+        ("monthly_activity", dict(this_month)),
+    ]
+    for days in (7, 30, 90):
+        last_days = {"start_date": (today - timedelta(days=days - 1)).isoformat(), "end_date": today.isoformat()}
+        recipes.append(("metrics_summary", last_days))
+        recipes.append(("daily_metrics", dict(last_days)))
+    return recipes
+
+
+async def recent_session_recipes(bq_client, count: int) -> List[Recipe]:
+    if count <= 0:
+        return []
+    recent = await bq_client.get_recent_sessions(limit=count)
+    recipes: List[Recipe] = []
+    for session in recent:
+        recipes.append(("session", {"session_id": session.session_id}))
+        recipes.append(("session_details", {"session_id": session.session_id}))
+    return recipes
+
+
+async def warm_cache(
+    cache,
+    bq_client,
+    *,
+    top: int = settings.CACHE_WARM_TOP_KEYS,
+    recent_sessions: int = settings.CACHE_WARM_RECENT_SESSIONS,
+    concurrency: int = settings.CACHE_WARM_CONCURRENCY,
+) -> Tuple[int, int]:
+    """Fills the cache for the given recipes; returns `(warmed, failed)`.
+
+    At most `concurrency` loaders run at once so warming leaves BigQuery
+    quota and executor threads for live traffic. Entries that are already
+    cached cost one Redis read.
+    """
+    recipes = dashboard_recipes()
+    recipes += await hit_tracker.most_requested(cache.redis, top)
+    recipes += await recent_session_recipes(bq_client, recent_sessions)
+
+    unique: Dict[str, Recipe] = {}
+    for name, params in recipes:
+        unique.setdefault(json.dumps([name, params], sort_keys=True), (name, params))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm(name: str, params: Dict[str, Any]) -> bool:
+        async with semaphore:
+            try:
+                await call_endpoint(name, cache, bq_client, params)
+                return True
+            except Exception as e:
+                logger.warning("Warming %s %s failed: %s", name, params, e)
+                return False
+
+    results = await asyncio.gather(*(warm(name, params) for name, params in unique.values()))
+    warmed = sum(results)
+    return warmed, len(results) - warmed
+
+
+async def warm_on_startup(cache, bq_client) -> None:
+    # Only one worker per deploy does the warming
+    if not await cache.redis.set(WARMUP_LOCK_KEY, b"1", nx=True, ex=settings.CACHE_WARM_LOCK_TTL):
+        return
+    warmed, failed = await warm_cache(cache, bq_client)
+    logger.info("Cache warm-up finished: %d warmed, %d failed", warmed, failed)
+
+
+async def flush_hit_counts(redis, interval: float) -> None:
+    """Periodically moves in-process request counts to Redis until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await hit_tracker.flush(redis, settings.CACHE_WARM_TRACK_MAX)
+        except Exception:
+            logger.warning("Flushing request counts failed", exc_info=True)
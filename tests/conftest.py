@@ -1,3 +1,8 @@
+import os
+
+# Keep the in-memory rate limiter out of the way when the suite grows
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "10000")
+
 import pytest
 from httpx import AsyncClient, ASGITransport
 from src.main import app
@@ -20,6 +25,14 @@ def mock_redis():
     mock.get.return_value = None
     # Mocking evalsha for Rate Limiter
     mock.evalsha.return_value = 0
+    # Multi-key reads (cache miss for every key)
+    mock.mget.side_effect = lambda keys: [None] * len(keys)
+    # Per-column hash reads (cache miss for every requested field)
+    mock.hmget.side_effect = lambda key, fields: [None] * len(fields)
+    # Pipelines are built synchronously and only awaited on execute()
+    pipeline = MagicMock()
+    pipeline.execute = AsyncMock(return_value=[])
+    mock.pipeline = MagicMock(return_value=pipeline)
     return mock
 
 
@@ -1,8 +1,18 @@
 import pytest
 from unittest.mock import MagicMock
-from src.models import SessionSummary, GlobalSummary, SessionDetail, DailyActivitySummary
-from datetime import datetime, date
+from src.models import SessionSummary, GlobalSummary, SessionDetail, DailyActivitySummary, DailyMetrics
+from datetime import datetime, date, timedelta
+import base64
+from typing import List
+from pydantic import TypeAdapter
 import json
+from src.cache import wrap_stale
+from src.config import settings
+from src.columnar import encode_column
+from src.routers.details import DETAIL_KINDS
+from src.query_cost import QueryOverBudget
+from src.async_bigquery_client import AsyncBigQueryClient
+from src.routers.daily_metrics import _fetch_daily_metrics
 
 @pytest.mark.asyncio
 async def test_health(client):
@@ -46,7 +56,7 @@ async def test_get_sessions_no_cache(client, mock_bq_client, mock_redis):
     # Verify Interactions
     mock_bq_client.get_recent_sessions.assert_called_once()  # Should hit DB
     # The cache key is now a JSON string of parameters
-    expected_cache_params = {"all": False, "page": 1, "sport": None, "start_date": None, "end_date": None, "min_distance": None, "max_distance": None}
+    expected_cache_params = {"all": False, "page": 1, "sport": None, "start_date": None, "end_date": None, "min_distance": None, "max_distance": None, "include": None}
     expected_cache_key = f"sessions_list_{json.dumps(expected_cache_params, sort_keys=True)}"
     mock_redis.get.assert_called_with(expected_cache_key)     # Should check cache
     mock_redis.set.assert_called_once()                    # Should set cache
@@ -82,7 +92,7 @@ async def test_get_sessions_cached(client, mock_bq_client, mock_redis):
     
     # Verify Interactions
     mock_bq_client.get_recent_sessions.assert_not_called() # Should NOT hit DB
-    expected_cache_params = {"all": False, "page": 1, "sport": None, "start_date": None, "end_date": None, "min_distance": None, "max_distance": None}
+    expected_cache_params = {"all": False, "page": 1, "sport": None, "start_date": None, "end_date": None, "min_distance": None, "max_distance": None, "include": None}
     expected_cache_key = f"sessions_list_{json.dumps(expected_cache_params, sort_keys=True)}"
     mock_redis.get.assert_called_with(expected_cache_key)
 
@@ -124,9 +134,11 @@ async def test_get_sessions_pagination(client, mock_bq_client, mock_redis):
         start_date=None, 
         end_date=None,
         min_distance=None,
-        max_distance=None
+        max_distance=None,
+        include=[],
+        after=None
     )
-    expected_cache_params = {"all": False, "page": 2, "sport": None, "start_date": None, "end_date": None, "min_distance": None, "max_distance": None}
+    expected_cache_params = {"all": False, "page": 2, "sport": None, "start_date": None, "end_date": None, "min_distance": None, "max_distance": None, "include": None}
     expected_cache_key = f"sessions_list_{json.dumps(expected_cache_params, sort_keys=True)}"
     mock_redis.get.assert_called_with(expected_cache_key)
 
@@ -164,7 +176,9 @@ async def test_get_sessions_filtered(client, mock_bq_client, mock_redis):
         start_date=date(2023, 1, 1), 
         end_date=None,
         min_distance=5000.0,
-        max_distance=None
+        max_distance=None,
+        include=[],
+        after=None
     )
     
     expected_cache_params = {
@@ -174,7 +188,8 @@ async def test_get_sessions_filtered(client, mock_bq_client, mock_redis):
         "start_date": "2023-01-01", 
         "end_date": None, 
         "min_distance": 5000.0, 
-        "max_distance": None
+        "max_distance": None,
+        "include": None
     }
     expected_cache_key = f"sessions_list_{json.dumps(expected_cache_params, sort_keys=True)}"
     mock_redis.get.assert_called_with(expected_cache_key)
@@ -198,6 +213,11 @@ async def test_get_summary(client, mock_bq_client, mock_redis):
     assert res_json["source"] == "bigquery"
     mock_bq_client.get_global_summary.assert_called_once()
 
+def details_to_columns(details, fields=None):
+    # BigQueryClient.get_session_details returns the series column-wise
+    names = [f for f in SessionDetail.model_fields if fields is None or f in fields]
+    return {name: [getattr(d, name) for d in details] for name in names}
+
 @pytest.mark.asyncio
 async def test_get_session_details(client, mock_bq_client, mock_redis):
     session_id = "test_session_1"
@@ -219,7 +239,7 @@ async def test_get_session_details(client, mock_bq_client, mock_redis):
             power=210
         )
     ]
-    mock_bq_client.get_session_details.return_value = mock_details
+    mock_bq_client.get_session_details.return_value = details_to_columns(mock_details)
     
     response = await client.get(f"/api/sessions/{session_id}/details")
     
@@ -229,15 +249,16 @@ async def test_get_session_details(client, mock_bq_client, mock_redis):
     assert len(data) == 2
     assert data[0]["record_id"] == "rec1"
     assert data[1]["record_id"] == "rec2"
+    assert data[0]["timestamp"] == "2023-01-01T10:00:00"
     assert res_json["source"] == "bigquery"
     
-    mock_bq_client.get_session_details.assert_called_with(session_id)
-    mock_redis.get.assert_called_with(f"session_details:{session_id}")
+    all_fields = list(SessionDetail.model_fields)
+    mock_bq_client.get_session_details.assert_called_with(session_id, fields=all_fields)
+    mock_redis.hmget.assert_called_with(f"session_details:{session_id}", all_fields)
 
 @pytest.mark.asyncio
 async def test_get_session_details_with_fields(client, mock_bq_client, mock_redis):
     session_id = "test_session_1"
-    # The mock returns full objects, API filters them
     mock_details = [
         SessionDetail(
             session_id=session_id,
@@ -245,10 +266,11 @@ async def test_get_session_details_with_fields(client, mock_bq_client, mock_redi
             record_id="rec1",
             timestamp=datetime(2023, 1, 1, 10, 0, 0),
             heart_rate=140,
-            power=200 # This should be filtered out
+            power=200
         )
     ]
-    mock_bq_client.get_session_details.return_value = mock_details
+    selected = ["session_id", "file_hash", "record_id", "timestamp", "heart_rate"]
+    mock_bq_client.get_session_details.return_value = details_to_columns(mock_details, selected)
     
     fields_param = "heart_rate"
     response = await client.get(f"/api/sessions/{session_id}/details?fields={fields_param}")
@@ -258,15 +280,92 @@ async def test_get_session_details_with_fields(client, mock_bq_client, mock_redi
     data = res_json["data"]
     assert len(data) == 1
     assert data[0]["heart_rate"] == 140
-    # Power should not be in the response (or None if default, but we filtered)
-    assert data[0]["power"] is None
+    # Unselected fields are never read nor serialized
+    assert "power" not in data[0]
     assert res_json["source"] == "bigquery"
     
-    # Check that client was called without specific fields (always full fetch)
-    mock_bq_client.get_session_details.assert_called_with(session_id)
+    # Projection is pushed down to BigQuery
+    mock_bq_client.get_session_details.assert_called_with(session_id, fields=selected)
     
-    # Check cache key is the FULL one
-    mock_redis.get.assert_called_with(f"session_details:{session_id}")
+    # Only the selected columns are read from the per-session hash
+    mock_redis.hmget.assert_called_with(f"session_details:{session_id}", selected)
+
+
+@pytest.mark.asyncio
+async def test_get_session_details_fetches_only_missing_columns(client, mock_bq_client, mock_redis):
+    session_id = "test_session_1"
+    details = [
+        SessionDetail(
+            session_id=session_id,
+            file_hash="hash123",
+            record_id="rec1",
+            timestamp=datetime(2023, 1, 1, 10, 0, 0),
+            heart_rate=140,
+            power=200
+        )
+    ]
+    cached = details_to_columns(details, ["session_id", "file_hash", "record_id", "timestamp", "heart_rate"])
+    blobs = {name: encode_column(DETAIL_KINDS[name], values) for name, values in cached.items()}
+    mock_redis.hmget.side_effect = lambda key, fields: [blobs.get(f) for f in fields]
+    mock_bq_client.get_session_details.return_value = details_to_columns(details, ["power"])
+
+    response = await client.get(f"/api/sessions/{session_id}/details?fields=heart_rate,power")
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data == [{
+        "session_id": session_id,
+        "file_hash": "hash123",
+        "record_id": "rec1",
+        "timestamp": "2023-01-01T10:00:00",
+        "heart_rate": 140,
+        "power": 200,
+    }]
+    mock_bq_client.get_session_details.assert_called_once_with(session_id, fields=["power"])
+
+
+@pytest.mark.asyncio
+async def test_get_sessions_details_batches_reads_and_misses(client, mock_bq_client, mock_redis):
+    def detail(session_id, heart_rate):
+        return SessionDetail(
+            session_id=session_id,
+            file_hash="hash123",
+            record_id="rec1",
+            timestamp=datetime(2023, 1, 1, 10, 0, 0),
+            heart_rate=heart_rate,
+        )
+
+    selected = ["session_id", "file_hash", "record_id", "timestamp", "heart_rate"]
+    cached = details_to_columns([detail("a", 120)], selected)
+    blobs = [encode_column(DETAIL_KINDS[name], cached[name]) for name in selected]
+    pipeline = mock_redis.pipeline.return_value
+    # One pipelined HMGET per session, then the write-back
+    pipeline.execute.side_effect = [[blobs, [None] * len(selected), [None] * len(selected)], []]
+    mock_bq_client.get_sessions_details.return_value = {
+        "b": details_to_columns([detail("b", 150)], selected),
+        "c": {name: [] for name in selected},
+    }
+
+    response = await client.get("/api/sessions/details?ids=a,b,c,a&fields=heart_rate")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["source"] == "bigquery"
+    assert list(body["data"]) == ["a", "b", "c"]
+    assert body["data"]["a"][0]["heart_rate"] == 120
+    assert body["data"]["b"][0]["heart_rate"] == 150
+    assert body["data"]["c"] == []
+    mock_bq_client.get_sessions_details.assert_called_once_with(["b", "c"], fields=selected)
+    # Only the session with records is written back
+    pipeline.hset.assert_called_once()
+    assert pipeline.hset.call_args.args[0] == "session_details:b"
+
+
+@pytest.mark.asyncio
+async def test_get_sessions_details_caps_ids(client):
+    ids = ",".join(f"s{i}" for i in range(1000))
+    response = await client.get(f"/api/sessions/details?ids={ids}")
+    assert response.status_code == 400
 
 
 @pytest.mark.asyncio
@@ -295,9 +394,9 @@ async def test_get_daily_summary_no_cache(client, mock_bq_client, mock_redis):
     assert res_json["source"] == "bigquery"
 
     mock_bq_client.get_daily_activity_summary.assert_called_once()
-    # Cache miss path should check the composed key
-    mock_redis.get.assert_called_with("daily_activity:2023-01-01:2023-01-31:Running")
-    mock_redis.set.assert_called_once()
+    # Cache miss path should check the month bucket and store it
+    mock_redis.mget.assert_called_with(["daily_activity:month:2023-01:Running"])
+    mock_redis.pipeline.return_value.set.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -312,7 +411,7 @@ async def test_get_daily_summary_cached(client, mock_bq_client, mock_redis):
         }
     ]
 
-    mock_redis.get.return_value = json.dumps(cached_data)
+    mock_redis.mget.side_effect = lambda keys: [json.dumps(cached_data)]
 
     response = await client.get("/api/daily-summary?start_date=2023-01-01&end_date=2023-01-31&sport=Cycling")
 
@@ -326,5 +425,329 @@ async def test_get_daily_summary_cached(client, mock_bq_client, mock_redis):
 
     # Should not hit BigQuery when cached
     mock_bq_client.get_daily_activity_summary.assert_not_called()
-    mock_redis.get.assert_called_with("daily_activity:2023-01-01:2023-01-31:Cycling")
+    mock_redis.mget.assert_called_with(["daily_activity:month:2023-01:Cycling"])
+
+
+
+@pytest.mark.asyncio
+async def test_get_sessions_include_map_preview(client, mock_bq_client, mock_redis):
+    mock_bq_client.get_recent_sessions.return_value = []
+
+    response = await client.get("/api/sessions?include=map_preview")
+
+    assert response.status_code == 200
+    assert mock_bq_client.get_recent_sessions.call_args.kwargs["include"] == ["map_preview"]
+    cache_key = mock_redis.get.call_args.args[0]
+    assert '"include": ["map_preview"]' in cache_key
+
+
+@pytest.mark.asyncio
+async def test_get_sessions_rejects_unknown_include(client, mock_bq_client):
+    response = await client.get("/api/sessions?include=map_large")
+
+    assert response.status_code == 400
+    mock_bq_client.get_recent_sessions.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_session_map(client, mock_bq_client, mock_redis):
+    png = b"\x89PNG\r\n\x1a\nimage-bytes"
+    mock_bq_client.get_session_map.return_value = base64.b64encode(png).decode()
+
+    response = await client.get("/api/sessions/s1/map/large")
+
+    assert response.status_code == 200
+    assert response.content == png
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    mock_bq_client.get_session_map.assert_called_once_with("s1", "map_large")
+    mock_redis.get.assert_called_with("session_map:large:s1")
+    assert mock_redis.set.call_args.args[1] == png
+
+    # Conditional request with the returned ETag
+    mock_redis.get.return_value = png
+    response = await client.get(
+        "/api/sessions/s1/map/large", headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert response.status_code == 304
+    mock_bq_client.get_session_map.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_session_map_corrupt_base64_is_not_found(client, mock_bq_client, mock_redis):
+    mock_bq_client.get_session_map.return_value = "iVBORw0KGgo*not-base64*"
+
+    response = await client.get("/api/sessions/s1/map/mini")
+
+    assert response.status_code == 404
+    mock_redis.set.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_session_includes_maps_by_default(client, mock_bq_client, mock_redis):
+    session = make_session("s1", datetime(2023, 1, 9, 10, 0, 0))
+    mock_bq_client.get_session_by_id.return_value = session.model_copy(
+        update={"map_mini_preview_base64": "mini", "map_large_base64": "large"}
+    )
+
+    response = await client.get("/api/sessions/s1")
+
+    assert response.status_code == 200
+    assert response.json()["data"]["map_large_base64"] == "large"
+    mock_bq_client.get_session_by_id.assert_called_once_with("s1", include=["map_large", "map_preview"])
+    mock_redis.get.assert_called_with("session_detail_s1:map_large,map_preview")
+
+    mock_bq_client.get_session_by_id.return_value = session
+    response = await client.get("/api/sessions/s1?include=")
+
+    assert response.status_code == 200
+    mock_bq_client.get_session_by_id.assert_called_with("s1", include=[])
+    mock_redis.get.assert_called_with("session_detail_s1")
+
+
+@pytest.mark.asyncio
+async def test_get_session_map_not_found(client, mock_bq_client, mock_redis):
+    mock_bq_client.get_session_map.return_value = None
+
+    response = await client.get("/api/sessions/s1/map/mini")
+
+    assert response.status_code == 404
+    mock_redis.set.assert_not_called()
+
+
+def make_session(session_id, start_time):
+    return SessionSummary(
+        file_hash=f"hash_{session_id}",
+        filename=f"{session_id}.fit",
+        session_id=session_id,
+        created_at=start_time,
+        start_time=start_time,
+        sport="Running",
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_sessions_cursor_pagination(client, mock_bq_client, mock_redis):
+    first_page = [make_session(str(i), datetime(2023, 1, 10 - i, 10, 0, 0)) for i in range(2)]
+    mock_bq_client.get_recent_sessions.return_value = first_page
 
+    response = await client.get("/api/sessions?page_size=2")
+
+    assert response.status_code == 200
+    next_cursor = response.json()["next_cursor"]
+    assert next_cursor
+
+    mock_bq_client.get_recent_sessions.return_value = [make_session("2", datetime(2023, 1, 5, 10, 0, 0))]
+    response = await client.get(f"/api/sessions?page_size=2&cursor={next_cursor}")
+
+    assert response.status_code == 200
+    res_json = response.json()
+    assert res_json["data"][0]["session_id"] == "2"
+    # Short page: nothing after it
+    assert res_json["next_cursor"] is None
+    kwargs = mock_bq_client.get_recent_sessions.call_args.kwargs
+    assert kwargs["limit"] == 2
+    assert kwargs["offset"] == 0
+    assert kwargs["after"] == (datetime(2023, 1, 9, 10, 0, 0), "1")
+    cache_key = mock_redis.get.call_args.args[0]
+    assert f'"cursor": "{next_cursor}"' in cache_key
+    assert '"page": null' in cache_key
+
+
+@pytest.mark.asyncio
+async def test_get_sessions_invalid_cursor(client, mock_bq_client):
+    response = await client.get("/api/sessions?cursor=not-a-cursor")
+
+    assert response.status_code == 400
+    mock_bq_client.get_recent_sessions.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_sessions_all_ndjson_streams_pages(client, mock_bq_client, mock_redis):
+    pages = [
+        [make_session("0", datetime(2023, 1, 9, 10, 0, 0)), make_session("1", datetime(2023, 1, 8, 10, 0, 0))],
+        [make_session("2", datetime(2023, 1, 7, 10, 0, 0))],
+    ]
+    mock_bq_client.iter_recent_sessions.return_value = iter(pages)
+
+    response = await client.get(
+        "/api/sessions?all=true&start_date=2023-01-01&end_date=2023-01-31",
+        headers={"Accept": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert [json.loads(line)["session_id"] for line in lines] == ["0", "1", "2"]
+    kwargs = mock_bq_client.iter_recent_sessions.call_args.kwargs
+    assert kwargs["limit"] is None
+    assert kwargs["start_date"] == date(2023, 1, 1)
+    mock_bq_client.get_recent_sessions.assert_not_called()
+    mock_redis.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_sessions_ndjson_requires_all(client, mock_bq_client):
+    response = await client.get("/api/sessions?format=ndjson")
+
+    assert response.status_code == 400
+    mock_bq_client.iter_recent_sessions.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_daily_metrics_ndjson_fills_gaps(client, mock_bq_client, mock_redis):
+    def metrics(day):
+        return DailyMetrics(
+            file_hash=f"hash_{day}",
+            filename=f"{day}.fit",
+            timestamp=datetime(2023, 1, day, 6, 0, 0),
+            created_at=datetime(2023, 1, day, 6, 0, 0),
+        )
+    mock_bq_client.iter_daily_metrics.return_value = iter([[metrics(4)], [metrics(2)]])
+
+    response = await client.get(
+        "/api/daily-metrics?start_date=2023-01-01&end_date=2023-01-05&format=ndjson"
+    )
+
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["timestamp"][:10] for row in rows] == [
+        "2023-01-05", "2023-01-04", "2023-01-03", "2023-01-02", "2023-01-01"
+    ]
+    assert [row["file_hash"] for row in rows] == ["none", "hash_4", "none", "hash_2", "none"]
+    mock_redis.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_daily_metrics_gaps_are_filled_up_to_today(mock_bq_client):
+    today = date.today()
+    mock_bq_client.get_daily_metrics.return_value = []
+
+    metrics = await _fetch_daily_metrics(
+        AsyncBigQueryClient(mock_bq_client), today - timedelta(days=2), today + timedelta(days=3)
+    )
+
+    assert [m.timestamp.date() for m in metrics] == [today, today - timedelta(days=1), today - timedelta(days=2)]
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_body_is_spliced_from_cached_bytes(client, mock_bq_client, mock_redis):
+    sessions = [make_session(str(i), datetime(2023, 1, 10 - i, 10, 0, 0)) for i in range(2)]
+    cached = TypeAdapter(List[SessionSummary]).dump_json(sessions)
+    mock_redis.get.return_value = cached
+
+    response = await client.get("/api/sessions?page_size=2")
+
+    assert response.status_code == 200
+    assert response.content.startswith(b'{"data":' + cached + b',"source":"cache"')
+    next_cursor = response.json()["next_cursor"]
+
+    mock_redis.get.return_value = None
+    mock_bq_client.get_recent_sessions.return_value = []
+    await client.get(f"/api/sessions?page_size=2&cursor={next_cursor}")
+    kwargs = mock_bq_client.get_recent_sessions.call_args.kwargs
+    assert kwargs["after"] == (datetime(2023, 1, 9, 10, 0, 0), "1")
+
+
+@pytest.mark.asyncio
+async def test_get_sessions_by_ids(client, mock_bq_client, mock_redis):
+    cached = make_session("a", datetime(2023, 1, 1, 10, 0, 0))
+    stored = {"session_detail_a": wrap_stale(cached.model_dump_json().encode(), 60)}
+    mock_redis.mget.side_effect = lambda keys: [stored.get(key) for key in keys]
+    mock_bq_client.get_sessions_by_ids.return_value = [make_session("b", datetime(2023, 1, 2, 10, 0, 0))]
+
+    response = await client.get("/api/sessions/by-ids?ids=b,a,unknown")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["source"] == "bigquery"
+    assert [s["session_id"] for s in body["data"]] == ["b", "a"]
+    mock_redis.mget.assert_called_once_with(["session_detail_b", "session_detail_a", "session_detail_unknown"])
+    mock_bq_client.get_sessions_by_ids.assert_called_once_with(["b", "unknown"])
+    # Found sessions are back-filled as individual entries, unknown ids are not cached
+    pipeline = mock_redis.pipeline.return_value
+    assert [call.args[0] for call in pipeline.set.call_args_list] == ["session_detail_b"]
+
+
+@pytest.mark.asyncio
+async def test_sessions_list_writes_through_session_entries(client, mock_bq_client, mock_redis):
+    session = make_session("s1", datetime(2023, 1, 1, 10, 0, 0))
+    session.map_mini_preview_base64 = "mini"
+    mock_bq_client.get_recent_sessions.return_value = [session]
+
+    response = await client.get("/api/sessions?include=map_preview")
+
+    assert response.status_code == 200
+    pipeline = mock_redis.pipeline.return_value
+    pipeline.set.assert_called_once()
+    key, value = pipeline.set.call_args.args
+    assert key == "session_detail_s1"
+    assert b'"map_mini_preview_base64":null' in value
+    assert pipeline.set.call_args.kwargs["ex"] == settings.CACHE_HARD_TTL_SESSIONS
+
+
+@pytest.mark.asyncio
+async def test_over_budget_query_is_rejected(client, mock_bq_client):
+    mock_bq_client.get_metrics_summary.side_effect = QueryOverBudget("metrics_summary", 5 * 1024**3, 1024**3)
+
+    response = await client.get("/api/daily-metrics/summary")
+
+    assert response.status_code == 400
+    assert "~5.0 GiB" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_sessions_over_budget_drop_map_images(client, mock_bq_client, mock_redis):
+    session = make_session("1", datetime(2023, 1, 9, 10, 0, 0))
+    mock_bq_client.get_recent_sessions.side_effect = [QueryOverBudget("sessions", 2000, 1000), [session]]
+
+    response = await client.get(
+        "/api/sessions?all=true&start_date=2023-01-01&end_date=2023-01-31&include=map_preview"
+    )
+
+    assert response.status_code == 200
+    assert [s["session_id"] for s in response.json()["data"]] == ["1"]
+    assert response.json()["omitted"] == ["map_preview"]
+    includes = [call.kwargs["include"] for call in mock_bq_client.get_recent_sessions.call_args_list]
+    assert includes == [["map_preview"], []]
+    # Stored as the plain page only, never under the include key
+    stored = [call.args[0] for call in mock_redis.set.call_args_list if call.args[0].startswith("sessions_list_")]
+    assert stored == ['sessions_list_{"all": true, "end_date": "2023-01-31", "include": null, '
+                      '"max_distance": null, "min_distance": null, "page": null, "sport": null, '
+                      '"start_date": "2023-01-01"}']
+
+
+def run_job(result):
+    from src.job_stats import record_job
+
+    def run(*args, **kwargs):
+        # Runs on the BigQuery executor thread, like BigQueryClient._run
+        record_job("summary", MagicMock(cache_hit=True, total_bytes_processed=2048, total_bytes_billed=0, slot_millis=0), 0.25)
+        return result
+    return run
+
+
+@pytest.mark.asyncio
+async def test_bigquery_stats_headers(client, mock_bq_client):
+    from httpx import ASGITransport, AsyncClient
+    from src.job_stats import JobStatsMiddleware
+    from src.main import app
+
+    mock_bq_client.get_global_summary.side_effect = run_job(
+        GlobalSummary(total_sessions=1, total_distance_km=1.0, total_duration_hours=1.0, last_updated=datetime(2023, 1, 1))
+    )
+    mock_bq_client.iter_daily_metrics.side_effect = run_job(iter([]))
+
+    async with AsyncClient(transport=ASGITransport(app=JobStatsMiddleware(app)), base_url="http://test") as stats_client:
+        response = await stats_client.get("/api/summary")
+        streamed = await stats_client.get("/api/daily-metrics?format=ndjson")
+
+    assert response.headers["X-BigQuery-Jobs"] == "1"
+    assert response.headers["X-BigQuery-Cache-Hits"] == "1"
+    assert response.headers["X-BigQuery-Bytes-Processed"] == "2048"
+    assert response.headers["X-BigQuery-Time-Ms"] == "250"
+    assert streamed.headers["X-BigQuery-Jobs"] == "1"
+
+    # Not installed unless BIGQUERY_STATS_HEADERS is set
+    response = await client.get("/api/summary")
+    assert "X-BigQuery-Jobs" not in response.headers
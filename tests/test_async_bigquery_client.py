@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.async_bigquery_client import AsyncBigQueryClient
+from src.models import GlobalSummary
+from datetime import datetime
+
+
+class SlowClient:
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def get_global_summary(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return "done"
+
+
+@pytest.mark.asyncio
+async def test_calls_run_concurrently_up_to_cap():
+    client = SlowClient(delay=0.1)
+    executor = ThreadPoolExecutor(max_workers=2)
+    async_client = AsyncBigQueryClient(client, executor=executor)
+
+    results = await asyncio.gather(*(async_client.get_global_summary() for _ in range(4)))
+
+    assert results == ["done"] * 4
+    assert client.peak == 2
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_during_query():
+    client = SlowClient(delay=0.2)
+    async_client = AsyncBigQueryClient(client, executor=ThreadPoolExecutor(max_workers=1))
+
+    query = asyncio.create_task(async_client.get_global_summary())
+    started = time.perf_counter()
+    await asyncio.sleep(0.01)
+    assert time.perf_counter() - started < 0.1
+    assert not query.done()
+    assert await query == "done"
+
+
+@pytest.mark.asyncio
+async def test_get_summary_awaits_facade(client, mock_bq_client):
+    mock_bq_client.get_global_summary.return_value = GlobalSummary(
+        total_sessions=1,
+        total_distance_km=1.0,
+        total_duration_hours=1.0,
+        last_updated=datetime(2023, 1, 1, 12, 0, 0)
+    )
+
+    response = await client.get("/api/summary")
+
+    assert response.status_code == 200
+    assert response.json()["source"] == "bigquery"
+    mock_bq_client.get_global_summary.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_stream_pulls_pages_on_executor():
+    threads = set()
+
+    class PagedClient:
+        def iter_pages(self, count):
+            for i in range(count):
+                threads.add(threading.current_thread().name)
+                yield [i]
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bq-test")
+    async_client = AsyncBigQueryClient(PagedClient(), executor=executor)
+
+    pages = [page async for page in async_client.stream("iter_pages", 3)]
+
+    assert pages == [[0], [1], [2]]
+    assert all(name.startswith("bq-test") for name in threads)
+    executor.shutdown()
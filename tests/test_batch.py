@@ -0,0 +1,77 @@
+import json
+from datetime import datetime
+
+import pytest
+from google.api_core.exceptions import BadRequest
+
+from src.models import GlobalSummary
+
+SUMMARY = {"total_sessions": 3, "total_distance_km": 42.0, "total_duration_hours": 4.5, "last_updated": "2024-03-01T00:00:00Z"}
+MARCH = [{"activity_date": "2024-03-02", "sport": "Running", "session_count": 1, "total_distance_m": 5000.0, "total_elapsed_time": 1800.0}]
+
+
+@pytest.mark.asyncio
+async def test_batch_reads_all_cached_entries_with_one_mget(client, mock_bq_client, mock_redis):
+    cached = {
+        "global_summary": json.dumps(SUMMARY),
+        "daily_activity:month:2024-03:Running": json.dumps(MARCH),
+    }
+    mock_redis.mget.side_effect = lambda keys: [cached.get(key) for key in keys]
+
+    response = await client.post("/api/batch", json={"queries": [
+        {"endpoint": "summary"},
+        {"endpoint": "daily_activity", "params": {"start_date": "2024-03-01", "end_date": "2024-03-31", "sport": "Running"}},
+    ]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0] == {"data": SUMMARY, "source": "cache"}
+    assert results[1] == {"data": MARCH, "source": "cache"}
+    mock_redis.mget.assert_called_once()
+    assert set(mock_redis.mget.call_args.args[0]) == set(cached)
+    mock_redis.get.assert_not_called()
+    mock_bq_client.get_global_summary.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_errors_per_query(client, mock_bq_client, mock_redis):
+    mock_bq_client.get_global_summary.return_value = GlobalSummary(
+        total_sessions=1, total_distance_km=1.0, total_duration_hours=1.0, last_updated=datetime(2024, 3, 1)
+    )
+    mock_bq_client.get_session_by_id.return_value = None
+
+    response = await client.post("/api/batch", json={"queries": [
+        {"endpoint": "summary"},
+        {"endpoint": "session", "params": {"session_id": "missing"}},
+        {"endpoint": "nope"},
+        {"endpoint": "sessions", "params": {"page_size": 100000}},
+    ]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["source"] == "bigquery"
+    assert results[1] == {"error": {"status": 404, "detail": "Session not found"}}
+    assert results[2]["error"]["status"] == 404
+    assert results[3]["error"]["status"] == 422
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_bigquery_errors_per_query(client, mock_bq_client, mock_redis):
+    mock_bq_client.get_global_summary.side_effect = BadRequest("Syntax error: Unexpected end of script")
+    mock_bq_client.get_session_by_id.return_value = None
+
+    response = await client.post("/api/batch", json={"queries": [
+        {"endpoint": "summary"},
+        {"endpoint": "session", "params": {"session_id": "missing"}},
+    ]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0] == {"error": {"status": 502, "detail": "BigQuery error: Syntax error: Unexpected end of script"}}
+    assert results[1]["error"]["status"] == 404
+
+
+@pytest.mark.asyncio
+async def test_batch_size_is_capped(client):
+    response = await client.post("/api/batch", json={"queries": [{"endpoint": "summary"}] * 1000})
+    assert response.status_code == 400
@@ -0,0 +1,237 @@
+from datetime import date, datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from google.api_core.exceptions import BadRequest
+from google.cloud.bigquery.table import Row
+
+from src import bigquery_client, metrics, query_cost
+from src.bigquery_client import BigQueryClient, create_storage_client, result_columns, result_pages, result_records
+from src.config import settings
+from src.job_stats import collected_jobs
+from src.query_cost import DryRunEstimates, QueryOverBudget, parse_budgets
+
+
+class FakeReadClient:
+    """Storage Read API stand-in: serves the rows in `streams` chunks, or fails like a disabled API."""
+
+    def __init__(self, streams=2, fail=False):
+        self.streams = streams
+        self.fail = fail
+        self.reads = 0
+
+    def read(self, results):
+        self.reads += 1
+        if self.fail:
+            raise PermissionError("bigquerystorage.googleapis.com is disabled")
+        size = -(-len(results.rows) // self.streams) or 1
+        return [results.rows[i:i + size] for i in range(0, len(results.rows), size)]
+
+
+class FakeTable:
+    def __init__(self, names, rows):
+        self.names = names
+        self.rows = rows
+
+    def to_pylist(self):
+        return [dict(zip(self.names, row.values())) for row in self.rows]
+
+    def column(self, name):
+        return MagicMock(to_pylist=MagicMock(return_value=[row[name] for row in self.rows]))
+
+
+class FakeResults:
+    """RowIterator stand-in; the Arrow methods return table-like objects over the same rows."""
+
+    def __init__(self, names, rows):
+        self.names = names
+        self.rows = [Row(values, {name: i for i, name in enumerate(names)}) for values in rows]
+        self.total_rows = len(self.rows)
+        self.rest_downloads = 0
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def to_arrow(self, bqstorage_client=None, create_bqstorage_client=True):
+        if bqstorage_client is not None:
+            streams = bqstorage_client.read(self)
+            return FakeTable(self.names, [row for stream in streams for row in stream])
+        self.rest_downloads += 1
+        return FakeTable(self.names, self.rows)
+
+    def to_arrow_iterable(self, bqstorage_client=None):
+        if bqstorage_client is not None:
+            for stream in bqstorage_client.read(self):
+                yield FakeTable(self.names, stream)
+            return
+        self.rest_downloads += 1
+        yield FakeTable(self.names, self.rows)
+
+
+def make_client(results) -> BigQueryClient:
+    client = BigQueryClient.__new__(BigQueryClient)
+    client.project_id, client.dataset_id = "p", "d"
+    client.client = MagicMock()
+    client.storage_client = None
+    client.estimates = DryRunEstimates(ttl=60)
+    client.client.query.return_value.result.return_value = results
+    return client
+
+
+DETAIL_NAMES = ["_session_id", "session_id", "timestamp", "heart_rate"]
+T0 = datetime(2024, 3, 1, 10, 0, tzinfo=timezone.utc)
+DETAIL_ROWS = [("a", "a", T0, 120), ("a", "a", T0, 121), ("b", "b", T0, 150)]
+
+
+def test_row_and_arrow_paths_agree(monkeypatch):
+    monkeypatch.setattr(bigquery_client, "pyarrow", None)
+    by_rows = result_records(FakeResults(DETAIL_NAMES, DETAIL_ROWS)), result_columns(FakeResults(DETAIL_NAMES, DETAIL_ROWS), DETAIL_NAMES)
+    monkeypatch.setattr(bigquery_client, "pyarrow", object())
+    by_arrow = result_records(FakeResults(DETAIL_NAMES, DETAIL_ROWS)), result_columns(FakeResults(DETAIL_NAMES, DETAIL_ROWS), DETAIL_NAMES)
+
+    assert by_rows == by_arrow
+    assert by_rows[1]["heart_rate"] == [120, 121, 150]
+
+
+def test_sessions_details_split_by_session(monkeypatch):
+    monkeypatch.setattr(bigquery_client, "pyarrow", None)
+    client = make_client(FakeResults(DETAIL_NAMES, DETAIL_ROWS))
+
+    series = client.get_sessions_details(["a", "b", "c"], fields=["session_id", "timestamp", "heart_rate"])
+
+    assert series["a"]["heart_rate"] == [120, 121]
+    assert series["b"] == {"session_id": ["b"], "timestamp": [T0], "heart_rate": [150]}
+    assert series["c"] == {"session_id": [], "timestamp": [], "heart_rate": []}
+
+
+def test_activity_rows_validated_in_bulk(monkeypatch):
+    monkeypatch.setattr(bigquery_client, "pyarrow", None)
+    names = ["activity_date", "sport", "session_count", "total_distance_m", "total_elapsed_time"]
+    client = make_client(FakeResults(names, [(date(2024, 3, 1), "Running", 2, 10000.0, None)]))
+
+    summaries = client.get_daily_activity_summary(start_date=date(2024, 3, 1))
+
+    assert summaries[0].activity_date == date(2024, 3, 1)
+    assert summaries[0].session_count == 2
+    assert summaries[0].total_elapsed_time is None
+
+
+def test_large_results_use_storage_read_api(monkeypatch):
+    monkeypatch.setattr(bigquery_client, "pyarrow", object())
+    monkeypatch.setattr(settings, "BIGQUERY_STORAGE_MIN_ROWS", 3)
+    storage = FakeReadClient(streams=2)
+    results = FakeResults(DETAIL_NAMES, DETAIL_ROWS)
+
+    columns = result_columns(results, DETAIL_NAMES, storage)
+    pages = list(result_pages(results, storage))
+
+    assert columns["heart_rate"] == [120, 121, 150]
+    assert [len(page) for page in pages] == [2, 1]
+    assert storage.reads == 2
+    assert results.rest_downloads == 0
+
+
+def test_small_results_and_failures_use_rest(monkeypatch):
+    monkeypatch.setattr(bigquery_client, "pyarrow", object())
+    monkeypatch.setattr(settings, "BIGQUERY_STORAGE_MIN_ROWS", 3)
+    small = FakeResults(DETAIL_NAMES, DETAIL_ROWS[:2])
+    storage = FakeReadClient()
+
+    assert len(result_records(small, storage)) == 2
+    assert storage.reads == 0
+
+    broken = FakeReadClient(fail=True)
+    results = FakeResults(DETAIL_NAMES, DETAIL_ROWS)
+    assert len(result_records(results, broken)) == 3
+    assert [len(page) for page in result_pages(results, broken)] == [3]
+    assert broken.reads == 2
+    assert results.rest_downloads == 2
+
+
+def test_storage_client_is_optional(monkeypatch):
+    monkeypatch.setattr(settings, "BIGQUERY_STORAGE_READ", False)
+    assert create_storage_client() is None
+    monkeypatch.setattr(settings, "BIGQUERY_STORAGE_READ", True)
+    monkeypatch.setattr(bigquery_client, "bigquery_storage", None)
+    assert create_storage_client() is None
+
+
+def test_every_job_carries_the_byte_limit(monkeypatch):
+    monkeypatch.setattr(settings, "BIGQUERY_MAX_BYTES_BILLED", 10**9)
+    client = make_client(None)
+    # get_global_summary reads the first row with next()
+    client.client.query.return_value.result.side_effect = lambda **kwargs: iter(FakeResults(
+        ["total_sessions", "total_distance_km", "total_duration_hours"], [(3, 12.5, 1.5)]
+    ))
+
+    assert client.get_global_summary().total_sessions == 3
+    job_config = client.client.query.call_args.kwargs["job_config"]
+    assert job_config.maximum_bytes_billed == 10**9
+    assert not job_config.dry_run
+
+
+def test_budget_rejects_before_running_and_caches_the_estimate(monkeypatch):
+    monkeypatch.setitem(query_cost.BUDGETS, "daily_activity", 1000)
+    client = make_client(FakeResults([], []))
+    jobs = []
+
+    def query(sql, job_config):
+        jobs.append(job_config)
+        return MagicMock(total_bytes_processed=5000)
+
+    client.client.query.side_effect = query
+
+    for _ in range(2):
+        with pytest.raises(QueryOverBudget) as exc:
+            client.get_daily_activity_summary(sport="Running")
+    assert exc.value.estimated_bytes == 5000
+    # One dry run for the shape, no real job
+    assert [job.dry_run for job in jobs] == [True]
+
+    # Other endpoints have no budget and are not dry-run
+    client.client.query.side_effect = None
+    client.get_weekly_activity_summary()
+    assert len(jobs) == 1
+
+
+def test_billing_limit_cancellation_is_reported_as_over_budget(monkeypatch):
+    monkeypatch.setattr(settings, "BIGQUERY_MAX_BYTES_BILLED", 1000)
+    client = make_client(None)
+    client.client.query.return_value.result.side_effect = BadRequest(
+        "Query exceeded limit for bytes billed", errors=[{"reason": "bytesBilledLimitExceeded"}]
+    )
+
+    with pytest.raises(QueryOverBudget) as exc:
+        client.get_daily_metrics()
+    assert exc.value.limit == 1000
+
+
+def test_parse_budgets(caplog):
+    assert parse_budgets("") == {}
+    assert parse_budgets("daily_metrics=100, sessions=5") == {"daily_metrics": 100, "sessions": 5}
+
+    with caplog.at_level("WARNING", logger="src.query_cost"):
+        assert parse_budgets("sessions=1GB,summary,=5,daily_metrics=100") == {"daily_metrics": 100}
+    assert "'sessions=1GB'" in caplog.text
+    assert "'summary'" in caplog.text
+
+
+def test_job_statistics_are_recorded_per_shape(monkeypatch):
+    monkeypatch.setattr(bigquery_client, "pyarrow", None)
+    client = make_client(FakeResults(["week_start_date"], []))
+    job = client.client.query.return_value
+    job.cache_hit, job.total_bytes_processed, job.total_bytes_billed, job.slot_millis = False, 1000, 10485760, 42
+    billed_before = metrics.bigquery_bytes_billed.value(shape="weekly_activity")
+    jobs = []
+    token = collected_jobs.set(jobs)
+    try:
+        client.get_weekly_activity_summary()
+        job.cache_hit, job.total_bytes_billed, job.slot_millis = True, 0, 0
+        client.get_weekly_activity_summary()
+    finally:
+        collected_jobs.reset(token)
+
+    assert [(j["cache_hit"], j["bytes_billed"], j["slot_ms"]) for j in jobs] == [(0, 10485760, 42), (1, 0, 0)]
+    assert metrics.bigquery_bytes_billed.value(shape="weekly_activity") - billed_before == 10485760
+    assert client.client.query.call_args.kwargs["job_config"].use_query_cache is True
+    assert 'bigquery_slot_milliseconds_total{shape="weekly_activity"}' in metrics.render()
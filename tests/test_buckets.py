@@ -0,0 +1,90 @@
+import json
+from datetime import date, timedelta
+from typing import List
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.buckets import get_or_fetch_months, month_starts, use_buckets
+from src.cache import QueryCache
+from src.config import settings
+from src.models import DailyActivitySummary
+from tests.test_tags import FakeRedis
+
+
+def test_month_starts():
+    assert month_starts(date(2023, 12, 20), date(2024, 2, 1)) == [
+        date(2023, 12, 1), date(2024, 1, 1), date(2024, 2, 1)
+    ]
+    assert not use_buckets(None, date(2024, 2, 1))
+    assert not use_buckets(date(2000, 1, 1), date(2024, 2, 1))
+
+
+def day(d: date, sport="Running") -> DailyActivitySummary:
+    return DailyActivitySummary(activity_date=d, sport=sport, session_count=1)
+
+
+async def load(cache, fetch, start_date, end_date):
+    return await get_or_fetch_months(
+        cache,
+        "daily_activity",
+        fetch,
+        start_date=start_date,
+        end_date=end_date,
+        date_field="activity_date",
+        response_type=List[DailyActivitySummary],
+        ttl=60,
+        hard_ttl=120,
+        endpoint="daily_activity",
+        key_parts=(None,),
+    )
+
+
+@pytest.mark.asyncio
+async def test_sliding_ranges_share_month_buckets():
+    redis = FakeRedis()
+    cache = QueryCache(redis)
+    fetch = AsyncMock(return_value=[day(date(2024, 3, 20)), day(date(2024, 3, 2)), day(date(2024, 2, 15))])
+
+    raw, source = await load(cache, fetch, date(2024, 2, 10), date(2024, 3, 5))
+
+    assert source == "bigquery"
+    fetch.assert_called_once_with(date(2024, 2, 1), date(2024, 3, 31))
+    assert [row["activity_date"] for row in json.loads(raw)] == ["2024-03-02", "2024-02-15"]
+    assert {"daily_activity:month:2024-02:none", "daily_activity:month:2024-03:none"} <= set(redis.values)
+
+    # A window shifted by a few days is answered from the same months
+    raw, source = await load(cache, fetch, date(2024, 2, 16), date(2024, 3, 31))
+
+    assert source == "cache"
+    assert fetch.call_count == 1
+    assert [row["activity_date"] for row in json.loads(raw)] == ["2024-03-20", "2024-03-02"]
+
+
+@pytest.mark.asyncio
+async def test_only_missing_months_are_fetched():
+    redis = FakeRedis()
+    cache = QueryCache(redis)
+    await load(cache, AsyncMock(return_value=[day(date(2024, 1, 5))]), date(2024, 1, 1), date(2024, 1, 31))
+    fetch = AsyncMock(return_value=[day(date(2024, 2, 3))])
+
+    raw, source = await load(cache, fetch, date(2024, 1, 1), date(2024, 2, 29))
+
+    assert source == "bigquery"
+    fetch.assert_called_once_with(date(2024, 2, 1), date(2024, 2, 29))
+    assert [row["activity_date"] for row in json.loads(raw)] == ["2024-02-03", "2024-01-05"]
+
+
+@pytest.mark.asyncio
+async def test_running_month_is_cached_briefly(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_TTL_OPEN_MONTH", 30)
+    redis = FakeRedis()
+    cache = QueryCache(redis)
+    today = date.today()
+    last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+    fetch = AsyncMock(return_value=[day(today), day(last_month)])
+
+    await load(cache, fetch, last_month, today)
+
+    assert redis.expiry[f"daily_activity:month:{last_month:%Y-%m}:none"] == 120
+    assert redis.expiry[f"daily_activity:month:{today:%Y-%m}:none"] == 30
@@ -0,0 +1,109 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.cache import QueryCache, STALE_MARKER, unwrap_stale, wrap_stale
+from src.metrics import cache_lookups, cache_refreshes
+
+
+def test_unwrap_legacy_value_is_fresh():
+    raw, fresh_for = unwrap_stale(b'{"a":1}')
+
+    assert raw == b'{"a":1}'
+    assert fresh_for == float("inf")
+
+
+def test_wrap_roundtrip():
+    raw, fresh_for = unwrap_stale(wrap_stale(b"[]", 60))
+
+    assert raw == b"[]"
+    assert 59 < fresh_for <= 60
+
+
+@pytest.mark.asyncio
+async def test_miss_stores_soft_deadline_with_hard_ttl(mock_redis):
+    cache = QueryCache(mock_redis)
+
+    raw, source = await cache.get_or_fetch_raw(
+        "swr_miss", AsyncMock(return_value=[1]), response_type=list, ttl=60, hard_ttl=600
+    )
+
+    assert (raw, source) == (b"[1]", "bigquery")
+    stored = mock_redis.set.call_args.args[1]
+    assert stored.startswith(STALE_MARKER)
+    assert mock_redis.set.call_args.kwargs == {"ex": 600}
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_and_refreshed_in_background(mock_redis):
+    expired = wrap_stale(b"[1]", -1)
+    mock_redis.get.return_value = expired
+    mock_redis.set.return_value = True
+    started = asyncio.Event()
+
+    async def fetch():
+        started.set()
+        return [2]
+
+    stale_before = cache_lookups.value(endpoint="swr_test", result="stale")
+    cache = QueryCache(mock_redis)
+
+    raw, source = await cache.get_or_fetch_raw(
+        "swr_stale", fetch, response_type=list, ttl=60, hard_ttl=600, endpoint="swr_test"
+    )
+
+    assert (raw, source) == (b"[1]", "cache")
+    await asyncio.wait_for(started.wait(), 1)
+    await asyncio.sleep(0)
+    lock_call, write_call = mock_redis.set.call_args_list
+    assert lock_call.args[0] == "refresh:swr_stale"
+    assert lock_call.kwargs["nx"] is True
+    assert unwrap_stale(write_call.args[1])[0] == b"[2]"
+    assert cache_lookups.value(endpoint="swr_test", result="stale") == stale_before + 1
+    assert cache_refreshes.value(endpoint="swr_test", outcome="ok") >= 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_skipped_when_another_worker_holds_lock(mock_redis):
+    mock_redis.get.return_value = wrap_stale(b"[1]", -1)
+    mock_redis.set.return_value = None
+    fetch = AsyncMock(return_value=[2])
+
+    raw, _ = await QueryCache(mock_redis).get_or_fetch_raw(
+        "swr_locked", fetch, response_type=list, ttl=60, hard_ttl=600
+    )
+    await asyncio.sleep(0)
+
+    assert raw == b"[1]"
+    fetch.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client, mock_redis):
+    mock_redis.get.return_value = b'{"total_sessions":1}'
+    await client.get("/api/summary")
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'cache_lookups_total{endpoint="summary",result="hit"}' in response.text
+
+
+@pytest.mark.asyncio
+async def test_column_lookups_are_counted(mock_redis):
+    from src.columnar import KIND_INT, encode_column
+
+    kinds = {"heart_rate": KIND_INT}
+    fetch = AsyncMock(return_value={"heart_rate": [120, 121]})
+    hits = cache_lookups.value(endpoint="columns_test", result="hit")
+    misses = cache_lookups.value(endpoint="columns_test", result="miss")
+    cache = QueryCache(mock_redis)
+
+    await cache.get_or_fetch_columns("cols", ["heart_rate"], fetch, kinds=kinds, ttl=60, endpoint="columns_test")
+    mock_redis.hmget.side_effect = lambda key, fields: [encode_column(KIND_INT, [120, 121])]
+    columns, source = await cache.get_or_fetch_columns("cols", ["heart_rate"], fetch, kinds=kinds, ttl=60, endpoint="columns_test")
+
+    assert (columns, source) == ({"heart_rate": [120, 121]}, "cache")
+    assert cache_lookups.value(endpoint="columns_test", result="miss") == misses + 1
+    assert cache_lookups.value(endpoint="columns_test", result="hit") == hits + 1
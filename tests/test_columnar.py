@@ -0,0 +1,127 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.columnar import (
+    CODEC_NONE,
+    CODEC_ZLIB,
+    columns_to_rows,
+    decode_column,
+    encode_column,
+    resolve_codec,
+)
+from src import columnar
+from src.config import settings
+from src.models import SessionDetail
+from src.routers.details import DETAIL_KINDS
+
+
+def make_details(n, tz=timezone.utc):
+    start = datetime(2023, 1, 1, 10, 0, 0, tzinfo=tz)
+    rng = random.Random(42)
+    details = []
+    for i in range(n):
+        details.append(SessionDetail(
+            session_id="session_1",
+            file_hash="hash123",
+            record_id=f"hash123_{i}",
+            timestamp=start + timedelta(seconds=i),
+            position_lat=47.0 + rng.random() / 100,
+            position_long=8.0 + rng.random() / 100,
+            altitude=400.0 + i * 0.1,
+            distance=i * 7.5,
+            heart_rate=None if i % 50 == 0 else 120 + rng.randint(0, 40),
+            power=rng.randint(150, 300),
+            speed=7.5,
+            temperature=18,
+        ))
+    return details
+
+
+def detail_columns(details):
+    return {name: [getattr(d, name) for d in details] for name in SessionDetail.model_fields}
+
+
+def encode_details(details, codec=CODEC_ZLIB):
+    return {name: encode_column(DETAIL_KINDS[name], values, codec) for name, values in detail_columns(details).items()}
+
+
+@pytest.mark.parametrize("codec", [CODEC_NONE, CODEC_ZLIB])
+def test_roundtrip_preserves_values(codec):
+    details = make_details(200)
+
+    blobs = encode_details(details, codec)
+    rows = columns_to_rows({name: decode_column(blob) for name, blob in blobs.items()})
+
+    assert [SessionDetail(**row) for row in rows] == details
+
+
+def test_roundtrip_naive_timestamps():
+    details = make_details(3, tz=None)
+
+    timestamps = decode_column(encode_details(details)["timestamp"])
+
+    assert timestamps[2] == datetime(2023, 1, 1, 10, 0, 2)
+    assert timestamps[2].tzinfo is None
+
+
+def test_encoding_is_much_smaller_than_json():
+    details = make_details(10000)
+    as_json = json.dumps([d.model_dump() for d in details], default=str).encode()
+
+    blobs = encode_details(details, CODEC_ZLIB)
+
+    assert sum(len(blob) for blob in blobs.values()) * 10 < len(as_json)
+
+
+def test_empty_series_roundtrip():
+    blobs = encode_details([])
+
+    assert columns_to_rows({name: decode_column(blob) for name, blob in blobs.items()}) == []
+
+
+def test_unavailable_codec_falls_back_with_warning(monkeypatch, caplog):
+    monkeypatch.setattr(columnar, "zstandard", None)
+
+    with caplog.at_level("WARNING", logger="src.columnar"):
+        assert resolve_codec("zstd") == CODEC_ZLIB
+        assert resolve_codec("brotli") == CODEC_ZLIB
+
+    assert "zstandard" in caplog.text
+    assert "brotli" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_get_session_details_cached_columns(client, mock_bq_client, mock_redis):
+    columns = detail_columns(make_details(3))
+    blobs = {name: encode_column(DETAIL_KINDS[name], values) for name, values in columns.items()}
+    mock_redis.hmget.side_effect = lambda key, fields: [blobs[f] for f in fields]
+
+    response = await client.get("/api/sessions/session_1/details?fields=power")
+
+    assert response.status_code == 200
+    res_json = response.json()
+    assert res_json["source"] == "cache"
+    assert [d["record_id"] for d in res_json["data"]] == ["hash123_0", "hash123_1", "hash123_2"]
+    assert res_json["data"][0]["timestamp"] == "2023-01-01T10:00:00Z"
+    assert res_json["data"][0]["power"] is not None
+    assert "altitude" not in res_json["data"][0]
+    mock_bq_client.get_session_details.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_session_details_caches_columns(client, mock_bq_client, mock_redis):
+    columns = detail_columns(make_details(3))
+    mock_bq_client.get_session_details.return_value = columns
+
+    response = await client.get("/api/sessions/session_1/details")
+
+    assert response.status_code == 200
+    pipeline = mock_redis.pipeline.return_value
+    mapping = pipeline.hset.call_args.kwargs["mapping"]
+    assert set(mapping) == set(SessionDetail.model_fields)
+    assert decode_column(mapping["heart_rate"]) == columns["heart_rate"]
+    pipeline.expire.assert_any_call("session_details:session_1", settings.CACHE_TTL_DETAILS)
+    pipeline.sadd.assert_any_call("tag:session:session_1", "session_details:session_1")
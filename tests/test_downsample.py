@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from src.downsample import NUMERIC_KINDS, downsample_lttb, downsample_mean, lttb_indices
+from src.routers.details import DETAIL_KINDS
+
+
+def make_columns(n):
+    start = datetime(2023, 1, 1, 10, 0, 0, tzinfo=timezone.utc)
+    return {
+        "session_id": ["s1"] * n,
+        "file_hash": ["hash123"] * n,
+        "record_id": [f"rec{i}" for i in range(n)],
+        "timestamp": [start + timedelta(seconds=i) for i in range(n)],
+        "heart_rate": [None if i % 10 == 0 else 120 + (i % 7) for i in range(n)],
+        "power": [1000 if i == n // 2 else 200 for i in range(n)],
+    }
+
+
+def test_lttb_keeps_endpoints_and_spike():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[437] = 50.0
+
+    indices = lttb_indices(x, y, 20)
+
+    assert len(indices) == 20
+    assert indices[0] == 0 and indices[-1] == 999
+    assert 437 in indices
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_returns_everything_below_threshold():
+    x = np.arange(5, dtype=np.float64)
+    assert lttb_indices(x, x, 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_downsample_lttb_rows_stay_aligned():
+    columns = make_columns(5000)
+
+    result = downsample_lttb(columns, DETAIL_KINDS, 200)
+
+    assert len(result["timestamp"]) <= 200
+    assert 1000 in result["power"]
+    for ts, record_id in zip(result["timestamp"], result["record_id"]):
+        assert columns["record_id"][columns["timestamp"].index(ts)] == record_id
+
+
+def test_downsample_lttb_never_exceeds_max_points():
+    n = 2000
+    columns = make_columns(n)
+    numeric = [name for name, kind in DETAIL_KINDS.items() if kind in NUMERIC_KINDS]
+    for i, name in enumerate(numeric):
+        columns.setdefault(name, [float((j * (i + 3)) % 97) for j in range(n)])
+
+    result = downsample_lttb(columns, DETAIL_KINDS, 10)
+
+    assert len(numeric) > 3
+    assert len(result["timestamp"]) <= 10
+    assert result["timestamp"][0] == columns["timestamp"][0]
+    assert result["timestamp"][-1] == columns["timestamp"][-1]
+
+
+def test_downsample_mean_averages_buckets():
+    columns = make_columns(1000)
+
+    result = downsample_mean(columns, DETAIL_KINDS, 100)
+
+    assert len(result["timestamp"]) == 100
+    assert result["timestamp"][0] == columns["timestamp"][0]
+    assert all(isinstance(v, int) for v in result["heart_rate"])
+    assert max(result["power"]) > 200
+
+
+@pytest.mark.asyncio
+async def test_get_session_details_downsampled(client, mock_bq_client, mock_redis):
+    columns = make_columns(3000)
+    mock_bq_client.get_session_details.return_value = columns
+
+    response = await client.get(
+        "/api/sessions/s1/details?fields=heart_rate,power&max_points=100"
+    )
+
+    assert response.status_code == 200
+    res_json = response.json()
+    assert res_json["source"] == "bigquery"
+    assert 0 < len(res_json["data"]) <= 100
+    assert res_json["data"][0]["record_id"] == "rec0"
+    mock_redis.get.assert_called_with(
+        "session_details_ds:s1:lttb:100:session_id,file_hash,record_id,timestamp,heart_rate,power"
+    )
+    mock_redis.set.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_session_details_downsampled_cached(client, mock_bq_client, mock_redis):
+    mock_redis.get.return_value = b'[{"record_id":"rec0"}]'
+
+    response = await client.get("/api/sessions/s1/details?max_points=100&downsample=mean")
+
+    assert response.status_code == 200
+    assert response.json() == {"data": [{"record_id": "rec0"}], "source": "cache"}
+    mock_bq_client.get_session_details.assert_not_called()
+    mock_redis.hmget.assert_not_called()
@@ -0,0 +1,86 @@
+from datetime import date, datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.ingestion import STATE_KEY, check_for_new_data
+from src.tags import query_tags
+from tests.test_tags import FakeRedis, cache
+
+MODIFIED = datetime(2024, 3, 15, 12, 0, tzinfo=timezone.utc)
+WATERMARK = datetime(2024, 3, 15, 8, 0, tzinfo=timezone.utc)
+
+
+class IngestRedis(FakeRedis):
+    def __init__(self):
+        super().__init__()
+        self.hashes = {}
+
+    async def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+
+def make_bq_client(modified=MODIFIED, sessions=(), metrics=()):
+    bq_client = MagicMock()
+    bq_client.get_table_modified = AsyncMock(return_value=modified)
+    bq_client.get_sessions_created_since = AsyncMock(return_value=list(sessions))
+    bq_client.get_metrics_created_since = AsyncMock(return_value=list(metrics))
+    return bq_client
+
+
+@pytest.mark.asyncio
+async def test_first_run_only_sets_watermark():
+    redis = IngestRedis()
+    bq_client = make_bq_client()
+
+    assert await check_for_new_data(redis, bq_client) == 0
+
+    bq_client.get_sessions_created_since.assert_not_called()
+    assert redis.hashes[STATE_KEY]["sessions:watermark"] == MODIFIED.isoformat()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_tables_are_not_queried():
+    redis = IngestRedis()
+    redis.hashes[STATE_KEY] = {
+        f"{table}:{field}": MODIFIED.isoformat().encode()
+        for table in ("sessions", "metrics") for field in ("modified", "watermark")
+    }
+    bq_client = make_bq_client()
+
+    assert await check_for_new_data(redis, bq_client) == 0
+
+    bq_client.get_sessions_created_since.assert_not_called()
+    bq_client.get_metrics_created_since.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_new_rows_invalidate_only_affected_keys():
+    redis = IngestRedis()
+    redis.hashes[STATE_KEY] = {
+        f"{table}:{field}": WATERMARK.isoformat()
+        for table in ("sessions", "metrics") for field in ("modified", "watermark")
+    }
+    march = (date(2024, 3, 1), date(2024, 3, 31))
+    await cache(redis, "running_march", ["endpoint:daily_activity"] + query_tags("Running", *march))
+    await cache(redis, "cycling_march", ["endpoint:daily_activity"] + query_tags("Cycling", *march))
+    await cache(redis, "summary", ["endpoint:summary"] + query_tags())
+    await cache(redis, "metrics_march", ["endpoint:daily_metrics"] + query_tags(None, *march))
+    await cache(redis, "session_detail_s1", ["session:s1"])
+    created = datetime(2024, 3, 15, 11, 0, tzinfo=timezone.utc)
+    bq_client = make_bq_client(
+        sessions=[{"session_id": "s1", "sport": "Running", "day": date(2024, 3, 15), "created_at": created}],
+    )
+
+    deleted = await check_for_new_data(redis, bq_client)
+
+    assert deleted == 3
+    assert set(redis.values) == {"cycling_march", "metrics_march"}
+    bq_client.get_sessions_created_since.assert_called_once_with(WATERMARK)
+    assert redis.hashes[STATE_KEY]["sessions:watermark"] == created.isoformat()
+    assert redis.hashes[STATE_KEY]["sessions:modified"] == MODIFIED.isoformat()
+    # Metrics table changed but brought no new rows: watermark stays
+    assert redis.hashes[STATE_KEY]["metrics:watermark"] == WATERMARK.isoformat()
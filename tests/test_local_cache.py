@@ -0,0 +1,123 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.cache import QueryCache
+from src.local_cache import INVALIDATION_CHANNEL, LocalCache, listen_for_invalidations
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(**kwargs):
+    options = dict(max_entries=3, max_bytes=1000, max_ttl=60)
+    options.update(kwargs)
+    return LocalCache(**options)
+
+
+def test_evicts_least_recently_used_entry():
+    cache = make_cache()
+    for key in ("a", "b", "c"):
+        cache.set(key, b"x", ttl=60)
+    cache.get("a")
+
+    cache.set("d", b"x", ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"x"
+    assert len(cache) == 3
+
+
+def test_total_size_is_bounded():
+    cache = make_cache(max_entries=100, max_bytes=1000)
+    for i in range(5):
+        cache.set(str(i), b"x" * 240, ttl=60)
+
+    assert cache.size <= 1000
+    assert cache.get("0") is None and cache.get("4") is not None
+    # Too large for the budget: not stored at all
+    cache.set("big", b"x" * 600, ttl=60)
+    assert cache.get("big") is None
+
+
+def test_ttl_is_capped_by_max_ttl():
+    clock = FakeClock()
+    cache = make_cache(max_ttl=60, clock=clock)
+    cache.set("short", b"1", ttl=10)
+    cache.set("long", b"2", ttl=604800)
+
+    clock.now = 30
+    assert cache.get("short") is None
+    assert cache.get("long") == b"2"
+    clock.now = 61
+    assert cache.get("long") is None
+    assert cache.size == 0
+
+
+def test_invalidate_pattern():
+    cache = make_cache(max_entries=10)
+    for key in ("session_details_ds:s1:lttb", "session_details_ds:s2:lttb", "global_summary"):
+        cache.set(key, b"x", ttl=60)
+
+    assert cache.invalidate("session_details_ds:s1:*") == 1
+    assert cache.invalidate("global_summary") == 1
+    assert cache.get("session_details_ds:s2:lttb") == b"x"
+    assert cache.invalidate("*") == 1
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_query_cache_serves_repeated_hits_from_l1(mock_redis):
+    mock_redis.get.return_value = b'{"total_sessions":1}'
+    cache = QueryCache(mock_redis, local=make_cache())
+    fetch = AsyncMock()
+
+    for _ in range(3):
+        raw, source = await cache.get_or_fetch_raw("global_summary", fetch, response_type=dict, ttl=60)
+
+    assert (raw, source) == (b'{"total_sessions":1}', "cache")
+    assert mock_redis.get.await_count == 1
+    fetch.assert_not_called()
+
+
+class FakePubSub:
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.subscribed = []
+
+    async def subscribe(self, channel):
+        self.subscribed.append(channel)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_listener_applies_published_invalidations():
+    local = make_cache(max_entries=10)
+    pubsub = FakePubSub()
+    redis = AsyncMock()
+    redis.pubsub = lambda: pubsub
+
+    task = asyncio.create_task(listen_for_invalidations(redis, local))
+    await asyncio.sleep(0)
+    local.set("sessions_list_a", b"x", ttl=60)
+    local.set("global_summary", b"y", ttl=60)
+    await pubsub.queue.put({"type": "subscribe", "data": 1})
+    await pubsub.queue.put({"type": "message", "data": b"sessions_list_*"})
+    await asyncio.sleep(0.01)
+    task.cancel()
+
+    assert pubsub.subscribed == [INVALIDATION_CHANNEL]
+    assert local.get("sessions_list_a") is None
+    assert local.get("global_summary") == b"y"
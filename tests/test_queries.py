@@ -0,0 +1,56 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from src.bigquery_client import BigQueryClient
+from src.queries import NO_LIMIT, TEMPLATES
+from tests.test_bigquery_client import FakeResults, make_client
+
+NAMES = ["activity_date", "sport", "session_count", "total_distance_m", "total_elapsed_time"]
+
+
+def sent(client: BigQueryClient):
+    query, config = client.client.query.call_args.args[0], client.client.query.call_args.kwargs["job_config"]
+    return query, [(p.name, p.type_, p.value) for p in config.query_parameters]
+
+
+def test_every_parameter_is_always_sent():
+    for name, template in TEMPLATES.items():
+        query, parameters = template.render("p.d", ["a", "b"])
+        assert [p.name for p in parameters] == list(template.params), name
+        for param in template.params:
+            assert f"@{param}" in query, name
+
+
+def test_equivalent_calls_send_identical_queries():
+    client = make_client(FakeResults(NAMES, []))
+
+    client.get_daily_activity_summary(start_date=date(2024, 3, 1), limit=10)
+    first = sent(client)
+    client.get_daily_activity_summary(start_date=date(2024, 3, 1), limit=10, offset=0)
+    assert sent(client) == first
+
+    # Other values, same text: only the parameters differ
+    client.get_daily_activity_summary(sport="Running")
+    query, parameters = sent(client)
+    assert query == first[0]
+    assert ("sport", "STRING", "Running") in parameters
+    assert ("limit", "INT64", NO_LIMIT) in parameters
+    assert ("start_date", "DATE", None) in parameters
+
+
+def test_sessions_cursor_and_filters_share_one_text():
+    client = make_client(FakeResults([], []))
+
+    client.get_recent_sessions(limit=10)
+    plain = sent(client)[0]
+    client.get_recent_sessions(limit=20, sport="Running", min_distance=5000.0, after=(datetime(2024, 3, 1, tzinfo=timezone.utc), "s1"))
+    assert sent(client)[0] == plain
+    # Map images change the projection, which is a different shape
+    client.get_recent_sessions(limit=10, include=["map_preview"])
+    assert sent(client)[0] != plain
+
+
+def test_unknown_parameter_is_rejected():
+    with pytest.raises(TypeError):
+        TEMPLATES["daily_metrics"].render("p.d", sport="Running")
@@ -0,0 +1,84 @@
+from datetime import date
+from typing import List
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.buckets import bucket_key
+from src.cache import QueryCache
+from src.models import DailyActivitySummary
+from src.rollup import fetch_monthly, fetch_weekly, monthly_from_daily, weekly_from_daily
+from tests.test_tags import FakeRedis
+
+DAILY = [
+    {"activity_date": "2024-03-31", "sport": "Running", "session_count": 1, "total_distance_m": 5000.0, "total_elapsed_time": 1800.0},
+    {"activity_date": "2024-03-26", "sport": "Running", "session_count": 2, "total_distance_m": 12000.0, "total_elapsed_time": None},
+    {"activity_date": "2024-03-26", "sport": "Cycling", "session_count": 1, "total_distance_m": 30000.0, "total_elapsed_time": 3600.0},
+    {"activity_date": "2024-03-25", "sport": None, "session_count": 1, "total_distance_m": None, "total_elapsed_time": 600.0},
+    {"activity_date": "2024-02-29", "sport": "Running", "session_count": 1, "total_distance_m": 8000.0, "total_elapsed_time": 2400.0},
+]
+
+
+def test_weekly_rollup_matches_view_shape():
+    weeks = weekly_from_daily(DAILY)
+
+    assert [(w.week_start_date, w.sport) for w in weeks] == [
+        (date(2024, 3, 25), None),
+        (date(2024, 3, 25), "Cycling"),
+        (date(2024, 3, 25), "Running"),
+        (date(2024, 2, 26), "Running"),
+    ]
+    running = weeks[2]
+    assert (running.iso_year, running.iso_week) == (2024, 13)
+    assert running.session_count == 3
+    assert running.total_distance_m == 17000.0
+    assert running.total_elapsed_time == 1800.0
+    # Only NULLs summed stay NULL
+    assert weeks[0].total_distance_m is None
+
+
+def test_monthly_rollup():
+    months = monthly_from_daily(DAILY)
+
+    assert [(m.month_start_date, m.sport, m.session_count) for m in months] == [
+        (date(2024, 3, 1), None, 1),
+        (date(2024, 3, 1), "Cycling", 1),
+        (date(2024, 3, 1), "Running", 3),
+        (date(2024, 2, 1), "Running", 1),
+    ]
+    assert (months[3].year, months[3].month) == (2024, 2)
+
+
+async def cache_daily(redis, month, rows):
+    cache = QueryCache(redis)
+    await cache.get_or_fetch_buckets(
+        [bucket_key("daily_activity", month, None)],
+        AsyncMock(return_value=[[DailyActivitySummary(**row) for row in rows]]),
+        response_type=List[DailyActivitySummary],
+        ttl=60,
+    )
+
+
+@pytest.mark.asyncio
+async def test_weekly_uses_cached_daily_buckets():
+    redis = FakeRedis()
+    await cache_daily(redis, date(2024, 3, 1), [row for row in DAILY if row["activity_date"] >= "2024-03"])
+    await cache_daily(redis, date(2024, 4, 1), [])
+    bq_client = MagicMock()
+
+    weeks = await fetch_weekly(bq_client, QueryCache(redis), date(2024, 3, 1), date(2024, 3, 31), None)
+
+    bq_client.get_weekly_activity_summary.assert_not_called()
+    assert {w.week_start_date for w in weeks} == {date(2024, 3, 25)}
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_view_without_daily_data():
+    bq_client = MagicMock()
+    bq_client.get_monthly_activity_summary = AsyncMock(return_value=[])
+
+    await fetch_monthly(bq_client, QueryCache(FakeRedis()), date(2024, 3, 1), date(2024, 3, 31), "Running")
+
+    bq_client.get_monthly_activity_summary.assert_called_once_with(
+        start_date=date(2024, 3, 1), end_date=date(2024, 3, 31), sport="Running"
+    )
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.models import GlobalSummary
+from src.singleflight import RedisSingleFlight, SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_call():
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    flight = SingleFlight()
+    results = await asyncio.gather(*(flight.do("key", load) for _ in range(5)))
+
+    assert results == [1] * 5
+    assert calls == 1
+    assert not flight.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors_and_forgets_key():
+    async def load():
+        raise ValueError("boom")
+
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        await flight.do("key", load)
+    assert not flight.in_flight("key")
+
+
+@pytest.mark.asyncio
+async def test_redis_single_flight_waiter_reads_cache():
+    redis = AsyncMock()
+    redis.set.return_value = False  # someone else holds the lock
+    redis.exists.return_value = 1
+    reload = AsyncMock(side_effect=[None, "cached"])
+    load = AsyncMock(return_value="loaded")
+
+    flight = RedisSingleFlight(redis, poll_interval=0)
+    result = await flight.do("global_summary", load, reload)
+
+    assert result == "cached"
+    load.assert_not_called()
+    redis.set.assert_called_once()
+    assert redis.set.call_args.args[0] == "lock:global_summary"
+
+
+@pytest.mark.asyncio
+async def test_redis_single_flight_holder_loads_and_releases():
+    redis = AsyncMock()
+    redis.set.return_value = True
+    load = AsyncMock(return_value="loaded")
+
+    flight = RedisSingleFlight(redis)
+    result = await flight.do("global_summary", load, AsyncMock())
+
+    assert result == "loaded"
+    redis.eval.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_issue_one_query(client, mock_bq_client, mock_redis):
+    def slow_summary():
+        time.sleep(0.1)
+        return GlobalSummary(
+            total_sessions=1,
+            total_distance_km=1.0,
+            total_duration_hours=1.0,
+            last_updated=datetime(2023, 1, 1, 12, 0, 0)
+        )
+
+    mock_bq_client.get_global_summary.side_effect = slow_summary
+
+    responses = await asyncio.gather(*(client.get("/api/summary") for _ in range(3)))
+
+    assert [r.status_code for r in responses] == [200] * 3
+    assert all(r.json()["source"] == "bigquery" for r in responses)
+    mock_bq_client.get_global_summary.assert_called_once()
+    mock_redis.set.assert_called_once()
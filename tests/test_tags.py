@@ -0,0 +1,170 @@
+from datetime import date
+
+import pytest
+
+from src.config import settings
+from src.models import DailyActivitySummary
+from src.tags import invalidate, keys_for_change, month_tags, query_tags, register_tags
+
+
+class FakeRedis:
+    """Just enough of the Redis set/pipeline API for tag bookkeeping."""
+
+    def __init__(self):
+        self.sets = {}
+        self.values = {}
+        self.expiry = {}
+        self.published = []
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    async def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    async def sunion(self, keys):
+        return set().union(*(self.sets.get(key, set()) for key in keys))
+
+    async def unlink(self, *keys):
+        count = 0
+        for key in keys:
+            count += int(self.values.pop(key, None) is not None or self.sets.pop(key, None) is not None)
+        return count
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self):
+        results = []
+        for name, args, kwargs in self.commands:
+            if name == "sadd":
+                self.redis.sets.setdefault(args[0], set()).add(args[1])
+                results.append(1)
+            elif name == "set":
+                self.redis.values[args[0]] = args[1]
+                self.redis.expiry[args[0]] = kwargs.get("ex")
+                results.append(True)
+            elif name == "smembers":
+                results.append(set(self.redis.sets.get(args[0], set())))
+            elif name == "exists":
+                results.append(int(args[0] in self.redis.values))
+            elif name == "srem":
+                members = self.redis.sets.get(args[0], set())
+                results.append(len(members & set(args[1:])))
+                members.difference_update(args[1:])
+            elif name == "unlink":
+                results.append(await self.redis.unlink(*args))
+            elif name == "publish":
+                self.redis.published.append(args[1])
+                results.append(0)
+            else:
+                results.append(True)
+        return results
+
+
+async def cache(redis, key, tags):
+    redis.values[key] = b"cached"
+    pipe = redis.pipeline()
+    register_tags(pipe, key, tags, ttl=60)
+    await pipe.execute()
+
+
+def test_month_tags():
+    assert month_tags(date(2023, 11, 20), date(2024, 2, 1)) == [
+        "month:2023-11", "month:2023-12", "month:2024-01", "month:2024-02"
+    ]
+    assert month_tags(None, date(2024, 2, 1)) == ["month:any"]
+    assert month_tags(date(2000, 1, 1), date(2024, 2, 1)) == ["month:any"]
+
+
+@pytest.mark.asyncio
+async def test_change_only_evicts_affected_entries():
+    redis = FakeRedis()
+    await cache(redis, "running_march", ["endpoint:daily_activity"] + query_tags("Running", date(2024, 3, 1), date(2024, 3, 31)))
+    await cache(redis, "all_time", ["endpoint:summary"] + query_tags())
+    await cache(redis, "cycling_march", ["endpoint:daily_activity"] + query_tags("Cycling", date(2024, 3, 1), date(2024, 3, 31)))
+    await cache(redis, "running_january", ["endpoint:daily_activity"] + query_tags("Running", date(2024, 1, 1), date(2024, 1, 31)))
+
+    assert await keys_for_change(redis, sport="Running", day=date(2024, 3, 15)) == {"running_march", "all_time"}
+    assert await keys_for_change(
+        redis, sport="Running", day=date(2024, 3, 15), endpoints=["daily_activity"]
+    ) == {"running_march"}
+
+    deleted = await invalidate(redis, sport="Running", day=date(2024, 3, 15))
+
+    assert deleted == 2
+    assert set(redis.values) == {"cycling_march", "running_january"}
+    assert sorted(redis.published) == ["all_time", "running_march"]
+
+
+@pytest.mark.asyncio
+async def test_invalidate_prunes_dead_members():
+    redis = FakeRedis()
+    await cache(redis, "running_march", query_tags("Running", date(2024, 3, 1), date(2024, 3, 31)))
+    await cache(redis, "all_time", query_tags())
+    await cache(redis, "cycling_all_time", query_tags("Cycling"))
+    del redis.values["cycling_all_time"]  # expired
+
+    await invalidate(redis, sport="Running", day=date(2024, 3, 15))
+
+    assert redis.sets["tag:sport:Running"] == set()
+    assert redis.sets["tag:sport:any"] == set()
+    assert redis.sets["tag:month:any"] == set()
+    # Tags not read by this change are left alone
+    assert redis.sets["tag:sport:Cycling"] == {"cycling_all_time"}
+
+
+@pytest.mark.asyncio
+async def test_invalidate_explicit_tag_drops_tag_set():
+    redis = FakeRedis()
+    await cache(redis, "session_detail_s1", ["session:s1"])
+
+    assert await invalidate(redis, tags=["session:s1"]) == 1
+    assert "tag:session:s1" not in redis.sets
+
+
+@pytest.mark.asyncio
+async def test_routes_register_query_tags(client, mock_bq_client, mock_redis):
+    mock_bq_client.get_daily_activity_summary.return_value = [
+        DailyActivitySummary(activity_date=date(2024, 3, 1), sport="Running")
+    ]
+
+    await client.get("/api/daily-summary?start_date=2024-02-20&end_date=2024-03-10&sport=Running")
+
+    tags = {call.args[0] for call in mock_redis.pipeline.return_value.sadd.call_args_list}
+    assert tags == {"tag:endpoint:daily_activity", "tag:sport:Running", "tag:month:2024-02", "tag:month:2024-03"}
+
+
+@pytest.mark.asyncio
+async def test_invalidate_endpoint_requires_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_ADMIN_TOKEN", "")
+    response = await client.post("/api/cache/invalidate", json={"tags": ["sport:Running"]})
+    assert response.status_code == 403
+
+    monkeypatch.setattr(settings, "CACHE_ADMIN_TOKEN", "secret")
+    response = await client.post(
+        "/api/cache/invalidate", json={"tags": ["sport:Running"]}, headers={"X-Admin-Token": "wrong"}
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_invalidate_endpoint(client, mock_redis, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_ADMIN_TOKEN", "secret")
+    mock_redis.sunion.return_value = {b"session_detail_s1"}
+    mock_redis.pipeline.return_value.execute.return_value = [1, 0]
+
+    response = await client.post(
+        "/api/cache/invalidate", json={"session_ids": ["s1"]}, headers={"X-Admin-Token": "secret"}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"deleted": 1}
+    mock_redis.sunion.assert_called_once_with(["tag:session:s1"])
+    mock_redis.pipeline.return_value.unlink.assert_called_once_with(b"session_detail_s1")
@@ -0,0 +1,92 @@
+import asyncio
+import json
+from datetime import date, datetime
+
+import pytest
+
+from src.async_bigquery_client import AsyncBigQueryClient
+from src.cache import QueryCache
+from src.endpoints import HITS_KEY, call_endpoint, hit_tracker
+from src.models import GlobalSummary
+from src.warmup import dashboard_recipes, warm_cache
+
+
+@pytest.fixture(autouse=True)
+def reset_hit_tracker():
+    hit_tracker._pending.clear()
+    yield
+    hit_tracker._pending.clear()
+
+
+@pytest.mark.asyncio
+async def test_requests_are_counted_and_flushed(client, mock_bq_client, mock_redis):
+    mock_bq_client.get_daily_activity_summary.return_value = []
+
+    for _ in range(2):
+        await client.get("/api/daily-summary?start_date=2023-01-01&sport=Running")
+    flushed = await hit_tracker.flush(mock_redis, max_tracked=100)
+
+    assert flushed == 1
+    pipeline = mock_redis.pipeline.return_value
+    key, count, member = pipeline.zincrby.call_args.args
+    assert (key, count) == (HITS_KEY, 2)
+    assert json.loads(member) == ["daily_activity", {"sport": "Running", "start_date": "2023-01-01"}]
+    pipeline.zremrangebyrank.assert_called_once_with(HITS_KEY, 0, -101)
+
+
+@pytest.mark.asyncio
+async def test_call_endpoint_coerces_recorded_params(mock_redis, mock_bq_client):
+    mock_bq_client.get_weekly_activity_summary.return_value = []
+
+    await call_endpoint(
+        "weekly_activity", QueryCache(mock_redis), AsyncBigQueryClient(mock_bq_client),
+        {"start_date": "2023-01-01"},
+    )
+
+    kwargs = mock_bq_client.get_weekly_activity_summary.call_args.kwargs
+    assert kwargs["start_date"] == date(2023, 1, 1)
+    # Replays are not counted as requests
+    assert not hit_tracker._pending
+
+
+def test_dashboard_recipes_cover_current_month():
+    recipes = dashboard_recipes(today=date(2024, 3, 15))
+
+    assert ("summary", {}) in recipes
+    assert ("monthly_activity", {"start_date": "2024-03-01", "end_date": "2024-03-15"}) in recipes
+    assert ("metrics_summary", {"start_date": "2024-03-09", "end_date": "2024-03-15"}) in recipes
+
+
+@pytest.mark.asyncio
+async def test_warm_cache_replays_popular_calls_with_bounded_concurrency(mock_redis):
+    mock_redis.zrevrange.return_value = [
+        json.dumps(["summary", {}]).encode(),
+        json.dumps(["daily_activity", {"sport": "Running"}]).encode(),
+    ]
+    active = peak = 0
+
+    class Client:
+        def __getattr__(self, name):
+            async def query(*args, **kwargs):
+                nonlocal active, peak
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+                if name == "get_global_summary":
+                    return GlobalSummary(total_sessions=1, total_distance_km=1.0, total_duration_hours=1.0,
+                                         last_updated=datetime(2023, 1, 1))
+                if name == "get_recent_sessions":
+                    return []
+                if name == "get_metrics_summary":
+                    raise RuntimeError("quota exceeded")
+                return []
+            return query
+
+    warmed, failed = await warm_cache(QueryCache(mock_redis), Client(), top=10, recent_sessions=5, concurrency=2)
+
+    # summary is both a dashboard and a popular call: warmed once
+    assert warmed + failed == len(dashboard_recipes()) + 1
+    assert failed == 3
+    assert peak <= 2
+    mock_redis.zrevrange.assert_called_once_with(HITS_KEY, 0, 9)
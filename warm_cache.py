@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Cache Warm-up Script for FIT API
+
+Replays the most requested API calls (tracked in Redis by the running API),
+the standard dashboard requests and the details of the most recent sessions.
+
+Usage:
+    python warm_cache.py                       # Warm with defaults from .env
+    python warm_cache.py --top 100             # Replay the 100 most requested calls
+    python warm_cache.py --recent-sessions 20  # Also warm details of the last 20 sessions
+    python warm_cache.py --concurrency 4       # Max. parallel BigQuery queries
+"""
+
+import asyncio
+import argparse
+import redis.asyncio as redis
+from src.config import settings
+from src.cache import QueryCache
+from src.bigquery_client import BigQueryClient
+from src.async_bigquery_client import AsyncBigQueryClient
+from src.warmup import warm_cache
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Pre-warm Redis cache for FIT API")
+    parser.add_argument("--top", type=int, default=settings.CACHE_WARM_TOP_KEYS, help="Number of most requested calls to replay")
+    parser.add_argument("--recent-sessions", type=int, default=settings.CACHE_WARM_RECENT_SESSIONS, help="Warm details of the N most recent sessions")
+    parser.add_argument("--concurrency", type=int, default=settings.CACHE_WARM_CONCURRENCY, help="Max. parallel BigQuery queries")
+
+    args = parser.parse_args()
+
+    # Same connection settings as the API (binary values)
+    redis_client = redis.from_url(settings.REDIS_URL, decode_responses=False)
+    try:
+        await redis_client.ping()
+    except Exception:
+        print(f"❌ Error: Could not connect to Redis at {settings.REDIS_URL}")
+        print("   Make sure Redis is running (e.g., via Docker: docker-compose up -d)")
+        await redis_client.aclose()
+        return
+
+    try:
+        warmed, failed = await warm_cache(
+            QueryCache(redis_client),
+            AsyncBigQueryClient(BigQueryClient()),
+            top=args.top,
+            recent_sessions=args.recent_sessions,
+            concurrency=args.concurrency,
+        )
+        print(f"✅ Warmed {warmed} cache entries")
+        if failed:
+            print(f"⚠️  {failed} entries could not be warmed (see log)")
+    finally:
+        await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())